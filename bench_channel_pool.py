@@ -0,0 +1,95 @@
+"""Measure per-round status latency of fresh per-call channels against the soldier channel pool.
+
+Starts an in-process commander which answers `status` immediately, then lets M soldier threads
+send one status update per round, the same way soldier.py does after every missile.
+
+    python bench_channel_pool.py [no_of_soldiers] [no_of_rounds]
+"""
+
+from concurrent import futures
+from threading import Thread, Barrier
+import statistics
+import sys
+import time
+import grpc
+import missiledefence_pb2
+import missiledefence_pb2_grpc
+import soldier
+
+bench_port = "50150"
+
+
+class StatusOnlyCommander(missiledefence_pb2_grpc.CommanderServicer):
+
+    def status(self, request, context):
+        return missiledefence_pb2.CommanderStatus(new_commander_id=-1)
+
+
+def fresh_channel_status(sid):
+    # What Soldier.status used to do: a new connection for every status update
+    with grpc.insecure_channel(soldier.commander_url) as channel:
+        stub = missiledefence_pb2_grpc.CommanderStub(channel)
+        return stub.status(missiledefence_pb2.WasHit(soldier_id=sid, is_alive=True, position=[1, 1]))
+
+
+def pooled_status(sid):
+    stub = soldier.get_channel_pool().stub()
+    return stub.status(missiledefence_pb2.WasHit(soldier_id=sid, is_alive=True, position=[1, 1]))
+
+
+# Every soldier sends one status per round, a round ends when the last soldier got its reply
+def measure_rounds(send_status, no_of_soldiers, no_of_rounds):
+    round_times = []
+    barrier = Barrier(no_of_soldiers + 1)
+
+    def soldier_thread(sid):
+        for r in range(no_of_rounds):
+            barrier.wait()
+            send_status(sid)
+            barrier.wait()
+
+    threads = [Thread(target=soldier_thread, args=(i+1,)) for i in range(no_of_soldiers)]
+    for thread in threads:
+        thread.start()
+    for r in range(no_of_rounds):
+        barrier.wait()
+        round_start = time.perf_counter()
+        barrier.wait()
+        round_times.append(time.perf_counter() - round_start)
+    for thread in threads:
+        thread.join()
+    return round_times
+
+
+def report(name, round_times):
+    round_times = sorted(round_times)
+    p95 = round_times[int(0.95 * (len(round_times) - 1))]
+    print(f"{name:>8}: mean {statistics.mean(round_times)*1000:8.2f} ms   "
+          f"median {statistics.median(round_times)*1000:8.2f} ms   p95 {p95*1000:8.2f} ms")
+    return statistics.mean(round_times)
+
+
+def main():
+    no_of_soldiers = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    no_of_rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=16))
+    missiledefence_pb2_grpc.add_CommanderServicer_to_server(StatusOnlyCommander(), server)
+    server.add_insecure_port("[::]:" + bench_port)
+    server.start()
+    soldier.commander_url = "localhost:" + bench_port
+
+    try:
+        print(f"Per-round status latency, {no_of_soldiers} soldiers, {no_of_rounds} rounds")
+        # Warm up the pool (connection setup is paid once per process)
+        measure_rounds(pooled_status, no_of_soldiers, 1)
+        fresh = report("fresh", measure_rounds(fresh_channel_status, no_of_soldiers, no_of_rounds))
+        pooled = report("pooled", measure_rounds(pooled_status, no_of_soldiers, no_of_rounds))
+        print(f"Pooled channels cut the mean round latency by {(1 - pooled / fresh) * 100:.1f}%")
+    finally:
+        soldier.get_channel_pool().close()
+        server.stop(None)
+
+
+if __name__ == "__main__":
+    main()
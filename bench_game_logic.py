@@ -0,0 +1,233 @@
+"""Microbenchmarks of the hot game-logic functions across grid sizes, soldier densities and missile radii.
+
+Benchmarks Commander.take_shelter, Soldier.move_soldier, Commander.print_layout, Commander.form_message
+(full snapshot and delta), the soldier side decoding of a snapshot (soldier.update_layout) and the evacuation
+planner (evacuation.plan_evacuation) for all soldiers of the war zone.
+Every case is built from a fixed seed, timed with timeit over several repeats (the minimum is the stable
+number, the median shows the noise), and its peak allocation per call is measured with tracemalloc.
+The commander and soldiers log at INFO as in a live war, into a handler which drops the records, so the work done
+for the log messages (e.g. rendering the layout in print_layout) is part of the numbers.
+
+    python bench_game_logic.py                          # run and print the results
+    python bench_game_logic.py --save baseline.json     # ... and save them as a baseline
+    python bench_game_logic.py --compare baseline.json  # ... and flag regressions against a baseline (exit status 1)
+"""
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import timeit
+import tracemalloc
+import numpy as np
+import missiledefence_pb2
+import commander
+import evacuation
+import soldier
+from commander import Commander
+from soldier import Soldier
+
+default_sizes = [10, 100, 1000]
+default_densities = [0.01, 0.1, 0.5]
+radii = {"M1": 1, "M2": 2, "M3": 3, "M4": 4}
+
+
+# Commander (soldier 1) in the middle of an NxN war zone where `density` of the cells are occupied
+def make_commander(size, density, seed=0):
+    rng = np.random.default_rng(seed)
+    center = size // 2
+    no_of_soldiers = max(1, int(density * size * size))
+
+    # Soldier 1 is the commander in the center, the others are spread randomly over the remaining cells
+    cells = np.delete(np.arange(size * size), (center - 1) * size + (center - 1))
+    cells = rng.choice(cells, no_of_soldiers - 1, replace=False)
+
+    cmd = Commander()
+    cmd.war_zone_size = size
+    cmd.no_of_soldiers = no_of_soldiers
+    cmd.layout = np.zeros((size, size), dtype=commander.layout_dtype)
+    cmd.layout.flat[cells] = np.arange(2, no_of_soldiers + 1)
+    cmd.sid = 1
+    cmd.position = [center, center]
+    cmd.speed = 4
+    cmd.layout[center - 1, center - 1] = 1
+    return cmd
+
+
+# Log at INFO without writing anything, print_layout and take_shelter skip their messages when INFO is off
+def enable_logging():
+    for module_logger in (commander.logger, soldier.logger):
+        module_logger.setLevel(logging.INFO)
+        module_logger.addHandler(logging.NullHandler())
+        module_logger.propagate = False
+
+
+def bench_take_shelter(size, density, missile_type):
+    cmd = make_commander(size, density)
+    start_position = list(cmd.position)
+
+    def run():
+        cmd.take_shelter(start_position, 0, missile_type)
+        # Put the commander back (O(1)) so that every call escapes from the same position
+        cmd.layout[cmd.position[0] - 1, cmd.position[1] - 1] = 0
+        cmd.layout[start_position[0] - 1, start_position[1] - 1] = cmd.sid
+        cmd.position = list(start_position)
+        cmd.is_alive = True
+        cmd.layout_changes.clear()
+    return run
+
+
+def bench_move_soldier(size, density):
+    cmd = make_commander(size, density)
+    # The commander's cell is taken over by a Soldier which moves back and forth on the same layout
+    cmd.layout[cmd.position[0] - 1, cmd.position[1]] = 0
+    sol = Soldier(cmd.sid, list(cmd.position), cmd.speed, cmd.layout, random.Random(0))
+    directions = ["right", "left"]
+    calls = [0]
+
+    def run():
+        sol.move_soldier(directions[calls[0] % 2], 1)
+        calls[0] += 1
+    return run
+
+
+def bench_print_layout(size, density):
+    cmd = make_commander(size, density)
+    return cmd.print_layout
+
+
+def bench_form_message_snapshot(size, density):
+    cmd = make_commander(size, density)
+    missile = {"position": cmd.position, "time": 0, "type": "M4"}
+    return lambda: cmd.form_message(2, missile, -1)
+
+
+def bench_form_message_delta(size, density, no_of_changes=16):
+    cmd = make_commander(size, density)
+    missile = {"position": cmd.position, "time": 0, "type": "M4"}
+    for i in range(no_of_changes):
+        cmd.set_cell(cmd.position[0], cmd.position[1], cmd.sid)
+    return lambda: cmd.form_message(2, missile, 0)
+
+
+def bench_decode_snapshot(size, density):
+    cmd = make_commander(size, density)
+    missile = cmd.form_message(2, {"position": cmd.position, "time": 0, "type": "M4"}, -1)
+    # What a soldier receives: the serialized message, parsed and copied into its layout
+    data = missile.SerializeToString()
+    soldier.layout = np.zeros((size, size), dtype=soldier.layout_dtype)
+
+    def run():
+        soldier.layout_version = -1
+        soldier.update_layout(missiledefence_pb2.MissileApproaching.FromString(data))
+    return run
+
+
+# Evacuation of every soldier of the war zone from a missile in the center (the layout is left as is)
+def bench_plan_evacuation(size, density, missile_type):
+    cmd = make_commander(size, density)
+    rows, cols = np.nonzero(cmd.layout)
+    positions = np.stack([rows + 1, cols + 1], axis=1)
+    speeds = np.random.default_rng(0).integers(0, 5, len(positions))
+    rng = np.random.default_rng(0)
+    return lambda: evacuation.plan_evacuation(positions, speeds, cmd.position, radii[missile_type], cmd.layout, rng)
+
+
+def cases(sizes, densities):
+    for size in sizes:
+        for density in densities:
+            for missile_type in radii:
+                yield f"take_shelter N={size} density={density} radius={radii[missile_type]}", bench_take_shelter(size, density, missile_type)
+            for missile_type in radii:
+                yield f"plan_evacuation N={size} density={density} radius={radii[missile_type]}", bench_plan_evacuation(size, density, missile_type)
+            yield f"move_soldier N={size} density={density}", bench_move_soldier(size, density)
+            yield f"print_layout N={size} density={density}", bench_print_layout(size, density)
+            yield f"form_message/snapshot N={size} density={density}", bench_form_message_snapshot(size, density)
+            yield f"form_message/delta N={size} density={density}", bench_form_message_delta(size, density)
+            yield f"decode_snapshot N={size} density={density}", bench_decode_snapshot(size, density)
+
+
+# Time per call in seconds: (min, median) over `repeat` runs of an auto-calibrated number of calls (~0.2s each)
+def measure_time(func, repeat):
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return number, min(times), statistics.median(times)
+
+
+# Peak memory allocated by one call, in bytes
+def measure_peak_allocation(func):
+    func()  # warm up caches and lazy imports outside the measurement
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        func()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(sizes, densities, repeat, name_filter=None):
+    results = {}
+    print(f"{'benchmark':<52} {'loops':>8} {'min us':>12} {'median us':>12} {'peak KiB':>10}")
+    for name, func in cases(sizes, densities):
+        if name_filter and name_filter not in name:
+            continue
+        # Same random choices (take_shelter) in every run
+        random.seed(0)
+        number, best, median = measure_time(func, repeat)
+        peak = measure_peak_allocation(func)
+        results[name] = {"loops": number, "min_us": best * 1e6, "median_us": median * 1e6, "peak_kib": peak / 1024}
+        print(f"{name:<52} {number:>8} {best*1e6:>12.2f} {median*1e6:>12.2f} {peak/1024:>10.1f}")
+    return results
+
+
+# Compare the minimum times and peak allocations with a baseline, returns the names of regressed benchmarks
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'benchmark':<52} {'time':>8} {'alloc':>8}   (new / baseline)")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        time_ratio = result["min_us"] / base["min_us"]
+        # Allocations below 1 KiB are too small to compare meaningfully
+        alloc_ratio = max(result["peak_kib"], 1) / max(base["peak_kib"], 1)
+        regressed = time_ratio > threshold or alloc_ratio > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<52} {time_ratio:>7.2f}x {alloc_ratio:>7.2f}x{'   REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the hot game-logic functions.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes, help="war zone sizes N")
+    parser.add_argument("--densities", type=float, nargs="+", default=default_densities, help="fractions of occupied cells")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timing repeats per benchmark")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--save", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare the results against this saved JSON file")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown (new / baseline) reported as a regression")
+    args = parser.parse_args()
+
+    enable_logging()
+    results = run_benchmarks(args.sizes, args.densities, args.repeat, args.filter)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold}x")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Vectorized blast resolution: evasive action of all soldiers against one missile in a single pass.
+
+Follows the rules of take_shelter in commander.py and soldier.py, for arrays of soldiers at once:
+a soldier inside the red zone tries the movements in increasing number of moves (ties in random order),
+each movement being a straight line of exactly that many moves in one of the 8 directions.
+A movement is possible if the soldier is fast enough and the target cell is inside the war zone and empty.
+A soldier which runs out of possible movements is dead.
+"""
+
+import numpy as np
+import escape
+
+# Unit steps [row, col] of the movements, in the same order as take_shelter
+movement_steps = np.array(list(escape.movement_steps.values()))
+
+
+# Number of moves needed along each of the 8 movements to leave the red zone, for soldiers inside it
+def escape_distances(positions, missile_position, rad):
+    rows = positions[:, 0]
+    cols = positions[:, 1]
+    left = (cols - (missile_position[1] - rad)) + 1
+    right = ((missile_position[1] + rad) - cols) + 1
+    up = (rows - (missile_position[0] - rad)) + 1
+    down = ((missile_position[0] + rad) - rows) + 1
+    return np.stack([
+        left, right, up, down,
+        np.minimum(left, up), np.minimum(left, down), np.minimum(right, up), np.minimum(right, down),
+    ], axis=1)
+
+
+'''
+Resolve the evasive action of all soldiers against a missile.
+
+positions are the 1-indexed [row, col] of the soldiers (M x 2), speeds their max speeds (M),
+layout the NxN war zone where non-zero cells are occupied.
+Soldiers outside the red zone stay where they are. Inside the red zone, when several soldiers
+want the same empty cell in the same pass, the one which comes first in `positions` gets it.
+
+Returns the new positions (M x 2) and whether each soldier is alive (M).
+'''
+def resolve_blast(positions, speeds, missile_position, radius, layout, rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+    speeds = np.asarray(speeds, dtype=np.int64)
+    rad = radius - 1
+
+    new_positions = positions.copy()
+    alive = np.ones(len(positions), dtype=bool)
+
+    in_red_zone = np.flatnonzero(
+        (np.abs(positions[:, 0] - missile_position[0]) <= rad)
+        & (np.abs(positions[:, 1] - missile_position[1]) <= rad)
+    )
+    if len(in_red_zone) == 0:
+        return new_positions, alive
+
+    zone_positions = positions[in_red_zone]
+    distances = escape_distances(zone_positions, missile_position, rad)
+
+    # Order the movements of each soldier by number of moves, breaking ties randomly like random.choice does
+    order = np.argsort(distances + rng.random(distances.shape), axis=1)
+    distances = np.take_along_axis(distances, order, axis=1)
+    targets = zone_positions[:, None, :] + movement_steps[order] * distances[:, :, None]
+
+    # Movements which need more moves than the speed are never possible, and since they are sorted
+    # a soldier is dead as soon as its next movement is too long
+    feasible = distances <= speeds[in_red_zone][:, None]
+    size_x, size_y = layout.shape
+    in_bounds = (
+        (targets[:, :, 0] >= 1) & (targets[:, :, 0] <= size_x)
+        & (targets[:, :, 1] >= 1) & (targets[:, :, 1] <= size_y)
+    )
+
+    # Cells claimed during this resolution (as row * size_y + col), on top of the occupied cells of the layout.
+    # Kept as a list of cells instead of a grid so that sparse war zones work as well.
+    claimed = np.empty(0, dtype=np.int64)
+    unresolved = np.ones(len(in_red_zone), dtype=bool)
+    for rank in range(len(movement_steps)):
+        candidates = np.flatnonzero(unresolved)
+        if len(candidates) == 0:
+            break
+
+        # Out of fast enough movements
+        too_slow = ~feasible[candidates, rank]
+        alive[in_red_zone[candidates[too_slow]]] = False
+        unresolved[candidates[too_slow]] = False
+        candidates = candidates[~too_slow]
+
+        candidates = candidates[in_bounds[candidates, rank]]
+        target_x = targets[candidates, rank, 0] - 1
+        target_y = targets[candidates, rank, 1] - 1
+        target_cells = target_x * size_y + target_y
+        free = (layout[target_x, target_y] == 0) & ~np.isin(target_cells, claimed)
+        candidates, target_cells = candidates[free], target_cells[free]
+
+        # Conflict-free assignment: only the first soldier asking for a cell gets it
+        cells, first = np.unique(target_cells, return_index=True)
+        winners = candidates[first]
+        claimed = np.concatenate([claimed, cells])
+        new_positions[in_red_zone[winners]] = targets[winners, rank]
+        unresolved[winners] = False
+
+    # Soldiers which tried all 8 movements without success
+    alive[in_red_zone[unresolved]] = False
+    return new_positions, alive
+
+
+# Apply the result of resolve_blast to the layout: move the survivors and clear the cells of the dead
+def apply_blast(layout, soldier_ids, positions, new_positions, alive):
+    # A soldier host may have no soldiers left (e.g. a tile they all moved out of)
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+    changed = (alive & np.any(new_positions != positions, axis=1)) | ~alive
+    layout[positions[changed, 0] - 1, positions[changed, 1] - 1] = 0
+    moved = changed & alive
+    layout[new_positions[moved, 0] - 1, new_positions[moved, 1] - 1] = np.asarray(soldier_ids)[moved]
@@ -0,0 +1,162 @@
+"""Commander checkpoints: the authoritative war state in a memory-mapped file, updated after every round.
+
+A commander with checkpoint_file set (see commander.py) writes the state it has at the end of every round:
+the position of every soldier on its roster, the dead soldiers in order, the commander, the casualties,
+the layout version and the number of launches of the missile timeline which are over. A commander started
+with --resume or --standby maps the file and continues the war from the round after the last one written.
+
+Only what changed in a round is written, so a round costs O(soldiers moved or killed), not O(M):
+    header slot 0 | header slot 1 | soldier table (M records) | dead soldiers (M ids) | journal slot 0 | journal slot 1
+A round first writes its changes to the journal slot of its generation and appends its dead soldiers,
+then commits by writing the header slot of its generation (with a CRC), and only then applies the journal
+to the soldier table. A commander which dies anywhere in between leaves either the old header, whose
+journal is still intact in the other slot, or the new one, whose journal is replayed on load.
+Both are idempotent, so the table is always brought to the state of the newest valid header.
+
+The layout is not stored, it is rebuilt from the soldier table, which also keeps the file O(M) for sparse war zones.
+"""
+
+import zlib
+import numpy as np
+
+checkpoint_magic = b"MDCK"
+checkpoint_format = 1
+
+header_dtype = np.dtype([
+    ("magic", "S4"),
+    ("format", "<u4"),
+    ("generation", "<u8"),
+    ("size", "<u4"),
+    ("no_of_soldiers", "<u4"),
+    ("no_of_missiles", "<u4"),
+    # Launches of the missile timeline which are over, the war continues with the next one
+    ("launches", "<u4"),
+    ("layout_version", "<i8"),
+    ("casuality_count", "<u4"),
+    ("no_of_dead", "<u4"),
+    ("commander_id", "<i4"),
+    ("commander_row", "<i4"),
+    ("commander_col", "<i4"),
+    ("commander_speed", "<i4"),
+    ("commander_alive", "u1"),
+    ("commander_dead_sent", "u1"),
+    ("is_war_over", "u1"),
+    ("journal_length", "<u4"),
+    ("crc", "<u4"),
+])
+
+# A soldier on the commander's roster (soldier_details) is kept with its position, all others are gone
+soldier_dtype = np.dtype([("row", "<i4"), ("col", "<i4"), ("on_roster", "u1")])
+journal_dtype = np.dtype([("soldier_id", "<i4"), ("row", "<i4"), ("col", "<i4"), ("on_roster", "u1")])
+
+
+class Checkpoint():
+
+    def __init__(self, path, no_of_soldiers):
+        self.path = path
+        self.no_of_soldiers = no_of_soldiers
+        # One mapping of the whole file, the regions are views of it
+        self.map = np.memmap(path, dtype=np.uint8, mode="r+")
+        offset = 0
+        regions = []
+        for dtype, shape in ((header_dtype, (2,)), (soldier_dtype, (no_of_soldiers,)), (np.dtype("<i4"), (no_of_soldiers,)), (journal_dtype, (2, no_of_soldiers + 1))):
+            length = dtype.itemsize * int(np.prod(shape))
+            regions.append(self.map[offset:offset + length].view(dtype).reshape(shape))
+            offset += length
+        self.headers, self.soldiers, self.dead, self.journals = regions
+        self.header = None
+
+    # Bytes of the file of a war with M soldiers
+    @staticmethod
+    def file_size(no_of_soldiers):
+        return 2 * header_dtype.itemsize + no_of_soldiers * (soldier_dtype.itemsize + 4) + 2 * (no_of_soldiers + 1) * journal_dtype.itemsize
+
+    # A new, empty checkpoint file for a war with M soldiers (replaces an existing one)
+    @classmethod
+    def create(cls, path, no_of_soldiers):
+        with open(path, "wb") as f:
+            f.truncate(cls.file_size(no_of_soldiers))
+        return cls(path, no_of_soldiers)
+
+    # Map an existing checkpoint file and bring its soldier table to the newest committed round
+    @classmethod
+    def load(cls, path):
+        header = None
+        with open(path, "rb") as f:
+            data = f.read(2 * header_dtype.itemsize)
+        if len(data) == 2 * header_dtype.itemsize:
+            header = newest_header(np.frombuffer(data, dtype=header_dtype))
+        if header is None:
+            raise ValueError(f"{path} has no complete checkpoint")
+        checkpoint = cls(path, int(header["no_of_soldiers"]))
+        checkpoint.header = header
+        # The round may have died before its journal was applied to the table
+        checkpoint.apply_journal(header)
+        checkpoint.flush()
+        return checkpoint
+
+    '''
+    Commit a round: `changes` are (soldier id, row, col, on roster) of the soldiers which changed since the last commit,
+    new_dead the soldiers who died since then and `fields` the values of the header (see header_dtype).
+    '''
+    def commit(self, fields, changes, new_dead):
+        generation = 0 if self.header is None else int(self.header["generation"]) + 1
+        no_of_dead = 0 if self.header is None else int(self.header["no_of_dead"])
+        slot = generation % 2
+
+        journal = self.journals[slot]
+        journal[:len(changes)] = np.array(changes, dtype=journal_dtype)
+        self.dead[no_of_dead:no_of_dead + len(new_dead)] = new_dead
+        self.flush()
+
+        header = np.zeros(1, dtype=header_dtype)[0]
+        for name, value in fields.items():
+            header[name] = value
+        header["magic"] = checkpoint_magic
+        header["format"] = checkpoint_format
+        header["generation"] = generation
+        header["no_of_soldiers"] = self.no_of_soldiers
+        header["no_of_dead"] = no_of_dead + len(new_dead)
+        header["journal_length"] = len(changes)
+        header["crc"] = header_crc(header)
+        self.headers[slot] = header
+        self.flush()
+        self.header = header
+
+        self.apply_journal(header)
+        self.flush()
+
+    # Write the journal of the round committed by `header` to the soldier table
+    def apply_journal(self, header):
+        journal = self.journals[int(header["generation"]) % 2][:int(header["journal_length"])]
+        index = journal["soldier_id"] - 1
+        self.soldiers["row"][index] = journal["row"]
+        self.soldiers["col"][index] = journal["col"]
+        self.soldiers["on_roster"][index] = journal["on_roster"]
+
+    # Soldier ids and positions of the soldiers on the roster
+    def roster(self):
+        soldier_ids = np.flatnonzero(self.soldiers["on_roster"]) + 1
+        return soldier_ids, self.soldiers["row"][soldier_ids - 1], self.soldiers["col"][soldier_ids - 1]
+
+    def dead_soldiers(self):
+        return self.dead[:int(self.header["no_of_dead"])].tolist()
+
+    def flush(self):
+        self.map.flush()
+
+
+def header_crc(header):
+    header = header.copy()
+    header["crc"] = 0
+    return zlib.crc32(header.tobytes())
+
+# The valid header slot with the highest generation, None if neither slot is valid
+def newest_header(headers):
+    valid = [
+        header for header in headers
+        if header["magic"] == checkpoint_magic and header["format"] == checkpoint_format and header["crc"] == header_crc(header)
+    ]
+    if len(valid) == 0:
+        return None
+    return max(valid, key=lambda header: int(header["generation"])).copy()
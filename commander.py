@@ -1,39 +1,93 @@
 """The Python implementation of the GRPC missile defence system."""
 
 from concurrent import futures
-from threading import Lock
+from threading import Lock, Condition
+from collections import Counter
 import logging
+import logqueue
+import os
 import random
+import socket
+import itertools
+import sys
 import grpc
+import numpy as np
 import missiledefence_pb2
 import missiledefence_pb2_grpc
+import checkpoint
+import escape
+import journal
+import salvo
+import warzone
+import metrics
+import scenarios
+from scheduler import MissileScheduler
+from warzone import SparseWarZone
 import google.protobuf.empty_pb2
 import time
 from datetime import datetime as dt
 
-# Create and configure logger
+# Create the logger, handlers are only attached by configure_logging() so that importing this module
+# (e.g. from engine.py) neither creates log files nor prints
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
-fh_formatter = logging.Formatter("%(asctime)s %(message)s")
-ch_formatter = logging.Formatter("%(message)s")
+# Logs are written to <log_dir>/commander_<start time>.log from a background thread (see logqueue.py).
+# Messages below console_log_level are only written to the file, below file_log_level nowhere.
+log_dir = "logs"
+file_log_level = logging.DEBUG
+console_log_level = logging.INFO
 
-start_time = dt.now().strftime("%Y-%m-%d %H_%M_%S")
-
-# File handler to output the log to file
-fh = logging.FileHandler(f'logs\commander_{start_time}.log', mode='w', encoding='utf-8')
-fh.setLevel(logging.DEBUG)
-fh.setFormatter(fh_formatter)
-logger.addHandler(fh)
-
-# Console handler to output the log to console
-ch = logging.StreamHandler()
-ch.setLevel(logging.INFO)
-ch.setFormatter(ch_formatter)
-logger.addHandler(ch)
+def configure_logging():
+    start_time = dt.now().strftime("%Y-%m-%d %H_%M_%S")
+    logqueue.start(logger, os.path.join(log_dir, f"commander_{start_time}.log"), file_log_level, console_log_level)
 
 commander_port = "50050"
 
+# Worker threads of the gRPC server of commander.py (commander_aio.py has no thread pool). Every soldier stream
+# (war_session, or missile_approaching with use_war_session = False in soldier.py) holds one for the whole war.
+# With a scenario file the pool has one more per soldier; without one M is only known once soldiers join, and wars with
+# more soldiers than the pool can hold are refused (see check_stream_capacity). For many soldiers, use commander_aio.py
+# or use_soldier_host in soldier.py, which takes one stream per soldier host.
+max_workers = 10
+
+# The war zone is a contiguous NxN array of soldier ids, sent as is in MissileApproaching.layout_cells
+# (very large war zones are stored sparse instead, see warzone.py)
+layout_dtype = np.dtype("<i4")
+
+# Soldiers keep long-lived pooled channels open and ping them while idle, so allow keepalive pings without calls
+server_options = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_ping_interval_without_data_ms", 5000),
+    ("grpc.http2.max_pings_without_data", 0),
+    # Only one commander can listen on a port, a standby commander takes it over once the commander on it is gone
+    ("grpc.so_reuseport", 0),
+]
+
+# Metrics (see metrics.py) are only collected when they are exported: in the Prometheus text format
+# at http://<host>:<metrics_port>/metrics and/or written to metrics_file every metrics_file_interval seconds
+metrics_port = None
+metrics_file = None
+metrics_file_interval = 10
+
+# Virtual seconds of war time per real second, e.g. 60 replays a T=3600 war in a minute (see scheduler.py)
+time_scale = 1.0
+
+# Write the war state to this file after every round (see checkpoint.py), e.g. os.path.join(log_dir, "commander.ckpt").
+# A commander started with --resume continues the war from it, one started with --standby waits until the commander
+# on commander_port is gone and then does the same. None writes no checkpoints.
+checkpoint_file = None
+# Seconds between the checks of a standby commander whether the commander on commander_port is gone
+standby_interval = 0.05
+
+# Ranked election: once the commander is dead, the status update which finds it dead also elects the alive soldier
+# with the highest speed (lowest soldier id on a tie), and only that soldier is told once the round is over.
+# Otherwise the first alive soldier which reports in the round is asked to send its details with elect_commander.
+use_ranked_election = False
+
+# Append the events of the war (missiles, moves, deaths, elections) to this binary journal (see journal.py),
+# e.g. os.path.join(log_dir, "commander.journal"), which "python journal.py <file> <round>" replays. None keeps no journal.
+journal_file = None
+
 missile_details = {
     "M1": {"radius": 1},
     "M2": {"radius": 2},
@@ -48,13 +102,19 @@ missile_details = {
 #     {"position": [2, 2], "time": 20, "type": "M4", "sent":False},
 # ]
 missile_launches = []
-
-
-casuality_count = 0
-
-# A simple mutex lock which helps to execute a block of code without interference from parallel threads (if needed)
-lock = Lock()
-
+# Number of soldiers, if known before they join (from a scenario file)
+M = None
+
+'''
+Shared state of the commander is split between locks by structure, so that streams only contend on what they touch:
+    roster_lock: soldier_details, dead_soldiers, casuality_count, move_intents, the first commander and the election state
+    round_lock: the once-per-round work (commander's evasive action, printing layouts, checking the war status)
+    round_condition: status_requests_received and round_reports, the barrier of a round
+    layout_log_lock: the layout and its change log
+    journal.lock: the records of the round which are not written to journal_file yet
+They are always taken in this order (e.g. set_cell may be called while holding roster_lock, never the other way round).
+Once-per-round checks are done without a lock first, so only the first stream of a round takes round_lock.
+'''
 class Commander(missiledefence_pb2_grpc.CommanderServicer):
 
     def __init__(self):
@@ -66,406 +126,1152 @@ class Commander(missiledefence_pb2_grpc.CommanderServicer):
 
         self.war_zone_size = 0
         self.no_of_soldiers = 0
-        self.layout = []
+        self.layout = np.zeros((0, 0), dtype=layout_dtype)
         self.soldier_details = {}
         self.dead_soldiers = []
+        self.casuality_count = 0
+        self.roster_lock = Lock()
+        # Positions requested by the soldiers in their status updates of the current round (soldier id -> [row, col]),
+        # resolved at once when the round is finished
+        self.move_intents = {}
+        # Outcome of the soldiers' moves which did not go as requested or moved them (soldier id -> WasHit),
+        # taken by the stream of each soldier to send it back
+        self.confirmed_moves = {}
 
         # Attributes to help in synchronization
         self.status_requests_received={}
+        # Number of tracked soldiers per count of status requests received, and the lowest count of any tracked soldier,
+        # so a round is complete once no tracked soldier is below it (amortized O(1) check instead of scanning all soldiers)
+        self.round_reports = Counter()
+        self.lowest_report = 0
+        # Wakes streams waiting for the first commander or for the last status request of a round
+        self.round_condition = Condition()
         self.commander_dead_sent = False
         self.is_war_over = False
 
         self.soldier_ready_semaphore = 0
-        self.initial_layout_semaphore = 0
-        self.updated_layout_semaphore = 0
-        self.take_shelter_semaphore = 0
-        
+        self.round_lock = Lock()
+        self.initial_layout_printed = False
+        # Missiles for which the commander has already taken evasive action
+        self.sheltered_missiles = set()
+        # Missiles whose round has been finished (layout printed, war status checked)
+        self.finished_missiles = set()
+
+        # Versioned layout: every cell write is appended to a change log so that streams only send deltas.
+        # The version of the layout is layout_log_base + len(layout_changes).
+        self.layout_changes = []
+        self.layout_log_base = 0
+        self.layout_log_lock = Lock()
+
+        # All streams launch the missiles in the order and at the times of one shared timeline
+        self.scheduler = MissileScheduler(missile_launches, time_scale)
+
+        # perf_counter() at which the commander took shelter from missile i, until the round is finished
+        self.round_start_times = {}
+
+        # Checkpoint file of the war (see checkpoint.py), created by the first round written to it,
+        # with the layout version and the number of dead soldiers written last
+        self.checkpoint = None
+        self.checkpoint_version = 0
+        self.checkpoint_dead = 0
+        # Whether the war was resumed from a checkpoint, the soldiers then rejoin instead of joining
+        self.resumed = False
+
+        # Ranked election: all soldiers by speed (highest first), ranked at the first election, and the index of the first
+        # one which may still be on the roster
+        self.succession = None
+        self.succession_index = 0
+
+        # Number of soldier streams the server can hold at once, None if it has no thread pool (commander_aio.py)
+        self.stream_capacity = None
+
+        # Event journal of the war (see journal.py), opened by the first round once N and M are known
+        self.journal = journal.Journal(journal_file) if journal_file is not None else None
+
     # On receiving the FIRST ping from soldiers along with their details,
     # Set the initial values of hyperparameters N,M and layout
     def soldier_ready(self, request, context):
         # logger.info(f"Received status of soldier {request.soldier_id}, position: {request.position}")
-        self.no_of_soldiers = request.no_of_soldiers
-
-        self.soldier_details[request.soldier_id] = {
-            "position": request.position,
-            "is_alive": True
-        }
         pos_x = request.position[0]
         pos_y = request.position[1]
 
-        if len(self.layout)==0:
-            # If layout has not been set by any other thread, set layout
-            self.layout = [[0 for x in range(request.warzone_size)] for y in range(request.warzone_size)]
-            self.war_zone_size = request.warzone_size
-        with lock:
+        with self.roster_lock:
+            if self.resumed:
+                return self.rejoin(request)
+
+            self.no_of_soldiers = request.no_of_soldiers
+
+            if len(self.layout)==0:
+                # If layout has not been set by any other thread, set layout
+                with self.layout_log_lock:
+                    self.layout = warzone.new_layout(request.warzone_size, layout_dtype)
+                self.war_zone_size = request.warzone_size
+
             self.soldier_ready_semaphore+=1
-            if self.soldier_ready_semaphore == 1:
-                # If missile_propagation tracking list has not been set by any other thread, set missile_propagation
-                self.layout[pos_x-1][pos_y-1] = request.soldier_id
-                return missiledefence_pb2.NewCommanderFilter(soldier_id=request.soldier_id)
+            if not self.join_cell(pos_x, pos_y, request.soldier_id):
+                # The commander's layout is authoritative: a soldier whose cell is taken is out of the war
+                logger.warning(f"Soldier {request.soldier_id} joined on {pos_x},{pos_y} which is taken by soldier {self.layout[pos_x-1, pos_y-1]}, it is out of the war")
+                reply = missiledefence_pb2.NewCommanderFilter(
+                    soldier_id=-1, rejoined=missiledefence_pb2.WasHit(soldier_id=request.soldier_id, is_alive=False, position=request.position)
+                )
             else:
-                self.status_requests_received[request.soldier_id]=0
-        
-        self.layout[pos_x-1][pos_y-1] = request.soldier_id
-        return missiledefence_pb2.NewCommanderFilter(soldier_id=-1)
+                self.soldier_details[request.soldier_id] = {
+                    "position": list(request.position),
+                    "is_alive": True,
+                    "speed": request.speed,
+                }
+                if self.soldier_ready_semaphore == 1:
+                    # The first soldier which joins becomes the first commander
+                    reply = missiledefence_pb2.NewCommanderFilter(soldier_id=request.soldier_id)
+                else:
+                    self.track_soldier(request.soldier_id, 0)
+                    reply = missiledefence_pb2.NewCommanderFilter(soldier_id=-1)
 
-    # Form missile message using missile properties
-    def form_message(self, sid, missile, updatedLayout):
+            if self.soldier_ready_semaphore >= self.no_of_soldiers:
+                # Wake the streams waiting for every soldier to join
+                with self.round_condition:
+                    self.wake_streams()
+        return reply
+
+    # A soldier rejoins a commander resumed from a checkpoint (caller holds roster_lock). It is told the position the commander has for it,
+    # or that it is out of the war if it is no longer on the roster (dead, or elected as commander in the meantime).
+    def rejoin(self, request):
+        soldier_id = request.soldier_id
+        details = self.soldier_details.get(soldier_id)
+        if details is None or soldier_id == self.sid:
+            return missiledefence_pb2.NewCommanderFilter(soldier_id=-1, rejoined=missiledefence_pb2.WasHit(soldier_id=soldier_id, is_alive=False))
+        details["speed"] = request.speed
+        if soldier_id not in self.status_requests_received:
+            self.track_soldier(soldier_id, 0)
+        return missiledefence_pb2.NewCommanderFilter(
+            soldier_id=-1, rejoined=missiledefence_pb2.WasHit(soldier_id=soldier_id, is_alive=True, position=details["position"])
+        )
+
+    # Put a joining soldier on its cell, unless the cell is already taken (checked and written under one lock like move_cell)
+    def join_cell(self, pos_x, pos_y, soldier_id):
+        with self.layout_log_lock:
+            if self.layout[pos_x-1, pos_y-1] != 0:
+                return False
+            self.write_cells([(pos_x, pos_y, soldier_id)])
+            return True
+
+    # Write a single cell of the layout and record the change for delta updates
+    def set_cell(self, pos_x, pos_y, soldier_id):
+        self.set_cells([(pos_x, pos_y, soldier_id)])
+
+    # Write several cells at once, so that no message is formed with only some of them written (e.g. half of a move)
+    def set_cells(self, cells):
+        with self.layout_log_lock:
+            self.write_cells(cells)
+
+    # Move a soldier to a free cell, the check and both writes are done under one lock so no one else takes the cell in between
+    def move_cell(self, old_x, old_y, new_x, new_y, soldier_id):
+        with self.layout_log_lock:
+            if self.layout[new_x-1, new_y-1] != 0:
+                return False
+            self.write_cells([(old_x, old_y, 0), (new_x, new_y, soldier_id)])
+            return True
+
+    # Caller holds layout_log_lock
+    def write_cells(self, cells):
+        for pos_x, pos_y, soldier_id in cells:
+            self.layout[pos_x-1, pos_y-1] = soldier_id
+            self.layout_changes.append(missiledefence_pb2.LayoutCell(row=pos_x, col=pos_y, soldier_id=soldier_id))
+
+        # Once the log is larger than the grid, a snapshot is cheaper than replaying it.
+        # Drop the older half, streams which are behind the remaining log will get a fresh snapshot.
+        if len(self.layout_changes) > max(4 * self.snapshot_cost(), 64):
+            dropped = len(self.layout_changes) // 2
+            del self.layout_changes[:dropped]
+            self.layout_log_base += dropped
+
+    # Number of changed cells which cost about as much to send as a snapshot of the layout
+    def snapshot_cost(self):
+        if isinstance(self.layout, SparseWarZone):
+            return self.layout.no_of_occupied
+        return self.layout.size // 4
+
+    # Form missile message using missile properties.
+    # Layout is sent as the changes since `since_version`, or as a full snapshot if the stream is new or too far behind.
+    @metrics.timed("form_message")
+    def form_message(self, sid, missile, since_version):
         reply = missiledefence_pb2.MissileApproaching()
         reply.missile.CopyFrom(missiledefence_pb2.MissileDetails(
                 position=missile["position"],
-                time=missile["time"],
+                time=int(missile["time"]),
                 type=missile["type"],
+                launch_time=missile["time"],
             ))
-        reply.layout.extend(updatedLayout)
+        # The other missiles of a salvo land at the same time
+        reply.salvo.extend(
+            missiledefence_pb2.MissileDetails(position=other["position"], time=int(missile["time"]), type=other["type"], launch_time=missile["time"])
+            for other in missile.get("salvo", [])
+        )
+        with self.layout_log_lock:
+            reply.layout_version = self.layout_log_base + len(self.layout_changes)
+            no_of_changes = reply.layout_version - since_version
+            if since_version < self.layout_log_base or no_of_changes > self.snapshot_cost():
+                reply.is_snapshot = True
+                if isinstance(self.layout, SparseWarZone):
+                    for row, col, soldier_id in self.layout.items():
+                        reply.occupied_cells.append(missiledefence_pb2.LayoutCell(row=row+1, col=col+1, soldier_id=soldier_id))
+                else:
+                    reply.layout_cells = self.layout.tobytes()
+            else:
+                reply.base_version = since_version
+                reply.changes.extend(self.layout_changes[since_version - self.layout_log_base:])
         return reply
 
-    # Missile Server Streaming (once a client makes this request, stream is established.)
-    def missile_approaching(self, request, context):
-        # Wait till the first commander is elected
-        while self.sid==-1:
-            time.sleep(0.5)
-            continue
-
-        # Print initial layout (Only once)
-        with lock:
-            self.initial_layout_semaphore+=1
-            if self.initial_layout_semaphore==1:
+    # Track the status requests of a soldier which has already played `rounds` rounds (caller holds roster_lock)
+    def track_soldier(self, soldier_id, rounds):
+        with self.round_condition:
+            self.status_requests_received[soldier_id] = rounds
+            self.round_reports[rounds]+=1
+            self.lowest_report = min(self.lowest_report, rounds)
+
+    # Stop tracking status requests of a soldier (dead or elected as commander) and wake the waiting streams
+    def untrack_soldier(self, soldier_id):
+        with self.round_condition:
+            if soldier_id in self.status_requests_received:
+                self.round_reports[self.status_requests_received.pop(soldier_id)]-=1
+                self.wake_streams()
+
+    # Wake the streams waiting for the first commander or for a round (caller holds round_condition)
+    def wake_streams(self):
+        self.round_condition.notify_all()
+
+    # Check if every tracked soldier has sent at least `no_of_rounds` status requests (caller holds round_condition).
+    # Soldiers may already report the next round while a stream still waits for this one, so the count is not exact.
+    def is_round_reported(self, no_of_rounds):
+        if len(self.status_requests_received) == 0:
+            return True
+        # Counts only grow, except for soldiers which start being tracked (see track_soldier)
+        while self.round_reports[self.lowest_report] == 0:
+            self.lowest_report+=1
+        return self.lowest_report >= no_of_rounds
+
+    # Whether the first commander is elected and every soldier has joined (caller holds round_condition).
+    # The first missile is only launched then, so no one moves before the initial layout is complete.
+    def is_war_ready(self):
+        return self.sid != -1 and (self.resumed or self.soldier_ready_semaphore >= self.no_of_soldiers)
+
+    # Block until the war is ready, then print the initial layout
+    def wait_for_commander(self):
+        with self.round_condition:
+            self.round_condition.wait_for(self.is_war_ready)
+        self.print_initial_layout()
+
+    # Refuse the stream of a soldier if the streams of all soldiers do not fit the server's thread pool,
+    # instead of waiting forever for soldiers which get no thread
+    def check_stream_capacity(self, context):
+        if self.stream_capacity is not None and self.no_of_soldiers > self.stream_capacity:
+            message = (
+                f"{self.no_of_soldiers} soldier streams do not fit the {self.stream_capacity} threads this commander has for them, "
+                "use commander_aio.py, use_soldier_host in soldier.py or start the commander with the scenario file"
+            )
+            logger.error(message)
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, message)
+
+    # Print initial layout (Only once)
+    def print_initial_layout(self):
+        if self.initial_layout_printed:
+            return
+        with self.round_lock:
+            if not self.initial_layout_printed:
                 logger.info("Initial layout: ")
                 self.print_layout()
+                self.initial_layout_printed = True
+
+    # Prepare missile i for sending, returns False if the missile has to be skipped
+    def start_round(self, i):
+        # For each missile, take action for self and also inform soldiers.
+        missile = missile_launches[i]
+        missile_type = missile["type"]
+        missile_time = missile["time"]
+        missile_pos = missile["position"]
+
+        # If a new commander is elected in between, he will skip the already sent messages
+        if missile["sent"]:
+            return False
 
-        for i in range(len(missile_launches)):
-            # For each missile, take action for self and also inform soldiers.
-            missile = missile_launches[i]
-            missile_type = missile["type"]
-            missile_time = missile["time"]
-            missile_pos = missile["position"]
+        # The thread which executes FIRST will also take evasive action for SELF, the others do not need the lock
+        if i in self.sheltered_missiles:
+            return True
+        with self.round_lock:
+            if i not in self.sheltered_missiles:
+                missiles = salvo.round_missiles(missile)
+                in_war_zone = [other for other in missiles if other["position"][0] <= self.war_zone_size and other["position"][1] <= self.war_zone_size]
+                if len(in_war_zone) == 0:
+                    # During the execution of the first thread, also check if the missile is within bounds.
+                    # If drop location is outside war zone, the missile will be skipped for current and all subsequent threads.
+                    missile["sent"] = True
+                    logger.info(f"Skipping missile {salvo.format_salvo(missile)} at time {missile_time} because it is outside the war zone..")
+                    return False
+                if len(in_war_zone) < len(missiles):
+                    # Only the missiles of a salvo which are outside the war zone are skipped
+                    logger.info(f"Skipping {len(missiles) - len(in_war_zone)} missiles of the salvo {salvo.format_salvo(missile)} which are outside the war zone..")
+                    missile_pos = missile["position"] = in_war_zone[0]["position"]
+                    missile_type = missile["type"] = in_war_zone[0]["type"]
+                    missile["salvo"] = in_war_zone[1:]
+                    missiles = in_war_zone
+
+                self.round_start_times[i] = time.perf_counter()
+                if self.journal is not None:
+                    self.begin_journal_round(i, missiles)
+                # All missiles of a salvo land at once, so the evasive action is taken against the union of their red zones
+                red_zones = salvo.RedZones.of(missiles, missile_details) if len(missiles) > 1 else None
+                self.take_shelter(missile_pos, missile_time, missile_type, red_zones)
+                self.sheltered_missiles.add(i)
+
+                if logger.isEnabledFor(logging.DEBUG):
+                    in_red_zone = []
+                    for other in missiles:
+                        rad = missile_details[other["type"]]["radius"] - 1
+                        row, col = other["position"]
+                        in_red_zone += [soldier_id for r, c, soldier_id in warzone.occupied_in(self.layout, row-1-rad, row-1+rad, col-1-rad, col-1+rad)]
+                    logger.debug(f"Soldiers in red zone: {sorted(set(in_red_zone))}")
+        return True
 
-            # If a new commander is elected in between, he will skip the already sent messages
-            if missile["sent"]:
-                continue
+    # Start the round of missile i in the journal, with a keyframe of the layout if it is due (caller holds round_lock)
+    def begin_journal_round(self, i, missiles):
+        if not self.journal.is_open():
+            self.journal.open(self.war_zone_size, self.no_of_soldiers)
+        with self.roster_lock:
+            with self.layout_log_lock:
+                self.journal.begin_round(i, missiles, self.layout, (self.sid, self.position, self.is_alive))
+
+    # Record an event of the round in the journal, if there is one
+    def log_event(self, kind, soldier_id, position):
+        if self.journal is not None:
+            self.journal.append(kind, soldier_id, position[0], position[1])
+
+    def is_soldier_alive(self, soldier_id):
+        # A single lookup, the soldier may be removed by another thread at any time
+        details = self.soldier_details.get(soldier_id)
+        return details is not None and details["is_alive"] == True
+
+    # Wait till every alive soldier updates the status for the `rounds_sent`th missile of a stream
+    @metrics.timed("status_barrier_wait")
+    def wait_for_round(self, rounds_sent):
+        with self.round_condition:
+            self.round_condition.wait_for(lambda: self.is_round_reported(rounds_sent))
+
+    # Print the updated layout and check the war status after missile i, returns True once the war is over
+    def finish_round(self, i):
+        # All status updates of the round are in by now, so the first thread which finishes the round
+        # prints the updated layout and checks the war status for every stream
+        if i in self.finished_missiles:
+            return self.is_war_over
+        with self.round_lock:
+            if i in self.finished_missiles:
+                return self.is_war_over
+
+            with self.roster_lock:
+                self.resolve_moves(missile_launches[i])
+
+            if not self.is_war_over:
+                logger.info("Updated layout: ")
+                self.print_layout()
+                logger.info(f"Dead soldiers: {self.dead_soldiers}")
 
-            # The thread which executes FIRST will also take evasive action for SELF
-            with lock:
-                if self.take_shelter_semaphore == i:
-                    if missile["position"][0] > self.war_zone_size or missile["position"][1] > self.war_zone_size:
-                        # During the execution of the first thread, also check if the missile is within bounds.
-                        # If drop location is outside war zone, the missile will be skipped for current and all subsequent threads.
-                        missile["sent"] = True
-                        logger.info(f"Skipping missile {missile_type} at time {missile_time} because {missile_pos} is outside the war zone..")
-                        continue
-                    self.take_shelter(missile_pos, missile_time, missile_type)
-                    self.take_shelter_semaphore+=1
-
-            # Update layout after taking action for self
-            updatedLayout = []
-            for layoutRow in self.layout:
-                updatedLayout.append(missiledefence_pb2.LayoutRow(row=layoutRow))
+            missile_launches[i]["sent"] = True
+            round_start_time = self.round_start_times.pop(i, None)
+            if round_start_time is not None:
+                metrics.inc("commander_rounds_total")
+                metrics.observe("commander_round_duration_seconds", time.perf_counter() - round_start_time)
+
+            # Check war status and print only once if war is won or lost
+            with self.roster_lock:
+                casuality_count = self.casuality_count
+                no_one_to_elect = not self.is_alive and len(self.soldier_details) == 0
+            if not self.is_war_over:
+                if casuality_count >= 0.5 * self.no_of_soldiers:
+                    logger.info("casuality_count >= 0.5*no_of_soldiers..")
+                    logger.info("War lost!")
+                    self.is_war_over = True
+                elif len(list(filter(lambda m: m["sent"]==False,missile_launches)))==0:
+                    logger.info("War won!")
+                    self.is_war_over = True
+                elif no_one_to_elect:
+                    logger.info("Commander dead, No one to elect.. War lost")
+                    self.is_war_over = True
+                    
+                if self.is_war_over:
+                    logger.info("Final layout: ")
+                    self.print_layout()
+
+            if checkpoint_file is not None:
+                self.write_checkpoint(i)
+            # The journal never has a round the checkpoint does not have
+            if self.journal is not None and self.journal.is_open():
+                self.journal.flush()
+            self.finished_missiles.add(i)
+        return self.is_war_over
+
+    # Write the state at the end of the round of missile i to checkpoint_file, only the soldiers which changed since the last round
+    # (caller holds round_lock)
+    @metrics.timed("checkpoint")
+    def write_checkpoint(self, i):
+        if self.checkpoint is None:
+            self.checkpoint = checkpoint.Checkpoint.create(checkpoint_file, self.no_of_soldiers)
+
+        with self.roster_lock:
+            with self.layout_log_lock:
+                version = self.layout_log_base + len(self.layout_changes)
+                if self.checkpoint.header is None or self.checkpoint_version < self.layout_log_base:
+                    # First checkpoint of the war, or the changes since the last one have been dropped from the log
+                    changed = set(range(1, self.no_of_soldiers + 1))
+                else:
+                    changed = {cell.soldier_id for cell in self.layout_changes[self.checkpoint_version - self.layout_log_base:]}
+            new_dead = self.dead_soldiers[self.checkpoint_dead:]
+            # The commander leaves the roster without a change of the layout when it is elected
+            changed.update(new_dead, [self.sid])
+            changed.discard(0)
+            changed.discard(-1)
+
+            changes = []
+            for soldier_id in changed:
+                details = self.soldier_details.get(soldier_id)
+                if details is None:
+                    changes.append((soldier_id, 0, 0, False))
+                else:
+                    changes.append((soldier_id, details["position"][0], details["position"][1], True))
+            fields = {
+                "size": self.war_zone_size,
+                "no_of_missiles": len(missile_launches),
+                "launches": self.scheduler.launch_number(i) + 1,
+                "layout_version": version,
+                "casuality_count": self.casuality_count,
+                "commander_id": self.sid,
+                "commander_row": self.position[0],
+                "commander_col": self.position[1],
+                "commander_speed": self.speed,
+                "commander_alive": self.is_alive,
+                "commander_dead_sent": self.commander_dead_sent,
+                "is_war_over": self.is_war_over,
+            }
+
+        self.checkpoint.commit(fields, changes, new_dead)
+        self.checkpoint_version = version
+        self.checkpoint_dead += len(new_dead)
+
+    '''
+    Continue the war from the last round of a checkpoint (see checkpoint.py), before the server is started.
+    The soldiers rejoin with soldier_ready and are told the position the commander has for them (see rejoin).
+    Layout versions continue past the versions of the lost round, so the first layout the soldiers are sent replaces theirs.
+    '''
+    def restore(self, saved):
+        header = saved.header
+        if int(header["no_of_missiles"]) != len(missile_launches):
+            raise ValueError(f"The checkpoint is of a war of {int(header['no_of_missiles'])} missiles, not {len(missile_launches)}")
+
+        self.war_zone_size = int(header["size"])
+        self.no_of_soldiers = saved.no_of_soldiers
+        self.layout = warzone.new_layout(self.war_zone_size, layout_dtype)
+        soldier_ids, rows, cols = saved.roster()
+        self.layout[rows-1, cols-1] = soldier_ids
+        self.soldier_details = {
+            soldier_id: {"position": [row, col], "is_alive": True}
+            for soldier_id, row, col in zip(soldier_ids.tolist(), rows.tolist(), cols.tolist())
+        }
+        self.dead_soldiers = saved.dead_soldiers()
+        self.casuality_count = int(header["casuality_count"])
+
+        self.sid = int(header["commander_id"])
+        self.position = [int(header["commander_row"]), int(header["commander_col"])]
+        self.speed = int(header["commander_speed"])
+        self.is_alive = bool(header["commander_alive"])
+        self.commander_dead_sent = bool(header["commander_dead_sent"])
+        self.is_war_over = bool(header["is_war_over"])
+        if self.sid in self.soldier_details:
+            self.soldier_details[self.sid]["position"] = self.position
+        if self.is_alive:
+            self.layout[self.position[0]-1, self.position[1]-1] = self.sid
+
+        # Every soldier and the commander may have moved (two cell changes each) in the round which was lost
+        self.layout_log_base = int(header["layout_version"]) + 2 * (self.no_of_soldiers + 1)
+        launches = int(header["launches"])
+        for k in range(launches):
+            missile_launches[self.scheduler.launch(k)[1]]["sent"] = True
+        self.scheduler.resume(launches)
+
+        # The first commander was elected long ago
+        self.soldier_ready_semaphore = 1
+        self.resumed = True
+        self.checkpoint = saved
+        self.checkpoint_version = self.layout_log_base
+        self.checkpoint_dead = len(self.dead_soldiers)
+
+        logger.info(f"Resumed the war after {launches} of {len(missile_launches)} missiles with {len(self.soldier_details)} soldiers and commander {self.sid}, layout: ")
+        self.print_layout()
+        self.initial_layout_printed = True
+
+    # Wait until the k-th missile of the timeline is launched, returns its index in missile_launches
+    @metrics.timed("sleep")
+    def wait_for_launch(self, k):
+        return self.scheduler.wait_for_launch(k)
+
+    '''
+    Steps of a round on a stream of the soldiers `soldier_ids` (one soldier, or all the soldiers of a soldier host),
+    shared by the handlers below and those of commander_aio.py, which only differ in how they wait and read the stream.
+    '''
+
+    # Start the round of missile i: None if the missile is skipped, otherwise the soldiers of the stream which are still alive
+    def open_round(self, i, soldier_ids):
+        if not self.start_round(i):
+            return None
+        return set(filter(self.is_soldier_alive, soldier_ids))
+
+    # Missile message of round i with the layout changes since `sent_version`, `sid` as in form_message
+    def round_message(self, i, sid, sent_version):
+        return self.form_message(sid, missile_launches[i], sent_version)
+
+    # Status of a soldier sent on the stream: the reply to send back in-band if the commander is dead, else None
+    def stream_status(self, was_hit):
+        status_reply = self.apply_status(was_hit)
+        return status_reply if status_reply.new_commander_id != -1 else None
+
+    # The soldier asked to take over answers with its details on the stream of soldier `soldier_id` (None if the stream ended).
+    # Not self.elect_commander, which is a coroutine in AsyncCommander.
+    def elect_from(self, soldier_id, update, context):
+        if update is not None and update.HasField("elect"):
+            Commander.elect_commander(self, update.elect, context)
+        else:
+            # It will not take over, so the round does not wait for it
+            self.untrack_soldier(soldier_id)
+
+    '''
+    Finish the round of missile i once every soldier has reported it: returns whether the war is over,
+    the outcome of the moves of the stream's soldiers and, if one of them was elected in this round by a ranked election,
+    the notice to send it (None otherwise).
+    '''
+    def close_round(self, i, soldier_ids):
+        war_over = self.finish_round(i)
+        confirmed = [self.confirmed_moves.pop(soldier_id) for soldier_id in soldier_ids if soldier_id in self.confirmed_moves]
+        elected = None
+        sid = self.sid
+        if sid in soldier_ids:
+            elected = missiledefence_pb2.CommanderStatus(new_commander_id=sid, is_elected=True)
+        return war_over, confirmed, elected
+
+    # Missile Server Streaming (once a client makes this request, stream is established.)
+    def missile_approaching(self, request, context):
+        self.check_stream_capacity(context)
+        # Wait till the first commander is elected
+        self.wait_for_commander()
+
+        # Layout version last sent on this stream, -1 forces a full snapshot on the first missile
+        sent_version = -1
+        # Number of missiles sent on this stream, i.e. the number of status requests expected from each soldier
+        rounds_sent = 0
+        for k in range(len(missile_launches)):
+            i = self.wait_for_launch(k)
+            alive = self.open_round(i, [request.soldier_id])
+            if alive is None:
+                continue
 
             # If soldier dead, exit the thread of that particular soldier without giving a reply
-            if request.soldier_id not in self.soldier_details.keys() or self.soldier_details[request.soldier_id]["is_alive"] == False:
+            if len(alive) == 0:
                 return
-            
-            reply = self.form_message(request.soldier_id, missile, updatedLayout)
+
+            # Send the layout changes made since the last missile on this stream (including action taken for self)
+            reply = self.round_message(i, request.soldier_id, sent_version)
+            sent_version = reply.layout_version
             yield reply
-            
+            rounds_sent+=1
+
             # Wait till every alive soldier updates the status before printing and proceeding to next missile
-            while not all(v == i+1 for v in self.status_requests_received.values()):
-                time.sleep(0.1)
+            self.wait_for_round(rounds_sent)
+
+            war_over, confirmed, elected = self.close_round(i, [request.soldier_id])
+            # Send the outcome of the soldier's move once the moves of the round are resolved
+            if len(confirmed) > 0:
+                yield missiledefence_pb2.MissileApproaching(confirmed=confirmed[0])
+            if elected is not None:
+                # Elected in this round by a ranked election, the soldier is only told
+                yield missiledefence_pb2.MissileApproaching(elected=elected)
+                return
+            if war_over:
+                return
 
-            with lock:
-                # Only print the updated layout once per missile in the thread which executes LAST
-                if not self.is_war_over  and (self.updated_layout_semaphore == len(self.status_requests_received) or (self.no_of_soldiers - casuality_count) <= 1):
-                    logger.info("Updated layout: ")
-                    self.print_layout()
-                    logger.info(f"Dead soldiers: {self.dead_soldiers}")
-                    self.updated_layout_semaphore = 0
+    '''
+    Bidirectional war session (once a soldier joins, missiles, status updates and elections share one stream)
+    The soldier sends its status on the stream after every missile instead of a separate status call,
+    election notices are sent back in-band and the elected soldier answers with its details on the same stream.
+    '''
+    def war_session(self, request_iterator, context):
+        soldier_id = next(request_iterator).join.soldier_id
+        self.check_stream_capacity(context)
 
-            missile_launches[i]["sent"] = True
-            with lock:
-                # Check war status and print only once if war is won or lost
-                # Once war comes to some conclusion, only the first thread which executes this block of code will print the status.
-                if not self.is_war_over:
-                    if casuality_count >= 0.5 * self.no_of_soldiers:
-                        logger.info("casuality_count >= 0.5*no_of_soldiers..")
-                        logger.info("War lost!")
-                        self.is_war_over = True
-                    elif len(list(filter(lambda m: m["sent"]==False,missile_launches)))==0:
-                        logger.info("War won!")
-                        self.is_war_over = True
-                    elif not self.is_alive and len(self.soldier_details) == 0:
-                        logger.info("Commander dead, No one to elect.. War lost")
-                        self.is_war_over = True
-                        
-                    if self.is_war_over:
-                        logger.info("Final layout: ")
-                        self.print_layout()
-            
-            if self.is_war_over:
+        # Wait till the first commander is elected
+        self.wait_for_commander()
+
+        sent_version = -1
+        rounds_sent = 0
+        for k in range(len(missile_launches)):
+            i = self.wait_for_launch(k)
+            alive = self.open_round(i, [soldier_id])
+            if alive is None:
+                continue
+
+            if len(alive) == 0:
+                return
+
+            reply = self.round_message(i, soldier_id, sent_version)
+            sent_version = reply.layout_version
+            yield missiledefence_pb2.SessionEvent(missile=reply)
+            rounds_sent+=1
+
+            # Status of the soldier after taking shelter arrives on the same stream
+            update = next(request_iterator, None)
+            if update is None:
+                return
+            status_reply = self.stream_status(update.status)
+
+            if status_reply is not None:
+                # Commander is dead, notify the soldier in-band
+                yield missiledefence_pb2.SessionEvent(status=status_reply)
+                if status_reply.new_commander_id == soldier_id:
+                    # The elected soldier sends its details on the stream and continues as the commander
+                    self.elect_from(status_reply.new_commander_id, next(request_iterator, None), context)
+                    return
+
+            self.wait_for_round(rounds_sent)
+
+            war_over, confirmed, elected = self.close_round(i, [soldier_id])
+            if len(confirmed) > 0:
+                yield missiledefence_pb2.SessionEvent(confirmed=confirmed[0])
+            if elected is not None:
+                # Elected in this round by a ranked election, the soldier is only told
+                yield missiledefence_pb2.SessionEvent(status=elected)
+                return
+            if war_over:
                 return
 
-            # Sleep for 't' seconds before launching the next missile
-            time.sleep(t)  # Change this to the desired 't' value
+    '''
+    Soldier host session (one stream for all the soldiers driven by a soldier host process)
+    All soldiers of the host join at once, every missile is sent once for all of them
+    and the host answers with one batch containing the status of each of its alive soldiers.
+    '''
+    def host_session(self, request_iterator, context):
+        host_soldiers = set()
+        first_commander = -1
+        rejoined = []
+        # A host with many soldiers joins them in several batches, all but the last with `more` set
+        more = True
+        while more:
+            join = next(request_iterator).join
+            more = join.more
+            for connection_request in join.soldiers:
+                host_soldiers.add(connection_request.soldier_id)
+                ready = self.soldier_ready(connection_request, context)
+                if ready.soldier_id != -1:
+                    first_commander = connection_request.soldier_id
+                if ready.HasField("rejoined"):
+                    rejoined.append(ready.rejoined)
+        yield missiledefence_pb2.HostEvent(ready=missiledefence_pb2.NewCommanderFilter(soldier_id=first_commander))
+        if len(rejoined) > 0:
+            # Rejoined a resumed commander, the host takes the positions the commander has for its soldiers
+            yield missiledefence_pb2.HostEvent(confirmed=missiledefence_pb2.WasHitBatch(statuses=rejoined))
+
+        if first_commander != -1:
+            # The host sends the details of its soldier which has to become the first commander
+            self.elect_commander(next(request_iterator).elect, context)
+            host_soldiers.discard(first_commander)
+
+        # Wait till the first commander is elected
+        self.wait_for_commander()
+
+        sent_version = -1
+        rounds_sent = 0
+        for k in range(len(missile_launches)):
+            i = self.wait_for_launch(k)
+            alive = self.open_round(i, host_soldiers)
+            if alive is None:
+                continue
+
+            # Exit once none of the host's soldiers is alive
+            host_soldiers = alive
+            if len(host_soldiers) == 0:
+                return
+
+            reply = self.round_message(i, -1, sent_version)
+            sent_version = reply.layout_version
+            yield missiledefence_pb2.HostEvent(missile=reply)
+            rounds_sent+=1
+
+            update = next(request_iterator, None)
+            if update is None:
+                return
+            for was_hit in update.statuses.statuses:
+                if was_hit.soldier_id not in host_soldiers:
+                    # Elected as commander earlier in this batch
+                    continue
+                status_reply = self.stream_status(was_hit)
+                if status_reply is not None:
+                    # Commander is dead, notify the host in-band
+                    yield missiledefence_pb2.HostEvent(status=status_reply)
+                    if status_reply.new_commander_id in host_soldiers:
+                        # The host sends the details of the elected soldier, which continues as the commander
+                        self.elect_from(status_reply.new_commander_id, next(request_iterator, None), context)
+                        host_soldiers.discard(status_reply.new_commander_id)
+
+            self.wait_for_round(rounds_sent)
+
+            war_over, confirmed, elected = self.close_round(i, host_soldiers)
+            if len(confirmed) > 0:
+                yield missiledefence_pb2.HostEvent(confirmed=missiledefence_pb2.WasHitBatch(statuses=confirmed))
+            if elected is not None:
+                # One of the host's soldiers was elected in this round by a ranked election, the host is only told
+                yield missiledefence_pb2.HostEvent(status=elected)
+                host_soldiers.discard(elected.new_commander_id)
+            if war_over:
+                return
 
     # Upon election request, update the new commander details
     def elect_commander(self, request, context):
         logger.info(f"Electing {request.soldier_id} as the new commander ...")
 
-        self.sid = request.soldier_id
-        self.speed = request.speed
-        self.position = request.position
-        self.soldier_details[request.soldier_id]["position"] = request.position
+        with self.roster_lock:
+            self.take_over(request.soldier_id, request.speed)
+
+        # Wake streams waiting for the first commander
+        with self.round_condition:
+            self.wake_streams()
+
+        return google.protobuf.empty_pb2.Empty()
+
+    # The soldier becomes the commander (caller holds roster_lock)
+    def take_over(self, soldier_id, speed):
+        # The new commander takes its confirmed position, a move it requested in this round is resolved right away
+        position = self.soldier_details[soldier_id]["position"]
+        target = self.move_intents.pop(soldier_id, None)
+        if target is not None and target != position and self.in_war_zone(target) and self.move_cell(position[0], position[1], target[0], target[1], soldier_id):
+            position = target
+
+        self.sid = soldier_id
+        self.speed = speed
+        self.position = list(position)
+        self.soldier_details[soldier_id]["position"] = self.position
         self.is_alive = True
         self.commander_dead_sent = False
+        self.log_event(journal.ELECTED, soldier_id, self.position)
 
-        if request.soldier_id in self.status_requests_received.keys():
+        if soldier_id in self.status_requests_received.keys():
             # Remove tracking the particular soldier since he has now become the commander itself
-            del self.status_requests_received[request.soldier_id]
-            del self.soldier_details[request.soldier_id]
-
-        return google.protobuf.empty_pb2.Empty()
+            self.untrack_soldier(soldier_id)
+            del self.soldier_details[soldier_id]
+
+    # Successor of a dead commander in a ranked election: the alive soldier with the highest speed, lowest soldier id first
+    # (caller holds roster_lock). Soldiers which are not tracked (e.g. not rejoined yet) are passed over, but keep their rank.
+    def next_successor(self):
+        if self.succession is None:
+            self.succession = sorted(self.soldier_details, key=lambda soldier_id: (-self.soldier_details[soldier_id].get("speed", 0), soldier_id))
+        # Soldiers leave the roster for good, so the ranking is only walked once over the whole war
+        while self.succession_index < len(self.succession) and self.succession[self.succession_index] not in self.soldier_details:
+            self.succession_index+=1
+        for soldier_id in itertools.islice(self.succession, self.succession_index, None):
+            if soldier_id in self.soldier_details and soldier_id in self.status_requests_received:
+                return soldier_id
+        return None
+
+    # Status of the round from a soldier elected by a ranked election before it arrived (caller holds roster_lock).
+    # The soldier took shelter as a soldier, so its move is the commander's, and the commander is dead if it did not escape.
+    def apply_commander_status(self, request):
+        if request.is_alive == False:
+            self.is_alive = False
+            self.dead_soldiers.append(self.sid)
+            self.set_cell(self.position[0], self.position[1], 0)
+            self.log_event(journal.DIED, self.sid, self.position)
+            return
+        target = list(request.position)
+        if target != self.position and self.in_war_zone(target) and self.move_cell(self.position[0], self.position[1], target[0], target[1], self.sid):
+            self.position[0], self.position[1] = target
+            self.log_event(journal.MOVED, self.sid, self.position)
+
+    def in_war_zone(self, position):
+        return 1 <= position[0] <= self.layout.shape[0] and 1 <= position[1] <= self.layout.shape[1]
+
+    # Remove a dead soldier from the war (caller holds roster_lock)
+    def remove_dead_soldier(self, soldier_id):
+        position = self.soldier_details.pop(soldier_id)["position"]
+        self.set_cell(position[0], position[1], 0)
+        self.dead_soldiers.append(soldier_id)
+        self.untrack_soldier(soldier_id)
+        self.casuality_count+=1
+        self.log_event(journal.DIED, soldier_id, position)
 
-    def updatePositions(self, soldier_id, position):
-        old_pos_x = self.soldier_details[soldier_id]["position"][0]
-        old_pos_y = self.soldier_details[soldier_id]["position"][1]
-        new_pos_x = position[0]
-        new_pos_y = position[1]
-        if old_pos_x != new_pos_x or old_pos_y!=new_pos_y:
-            self.soldier_details[soldier_id]["position"]=position
-            self.layout[old_pos_x-1][old_pos_y-1] = 0
-            self.layout[new_pos_x-1][new_pos_y-1] = soldier_id
-            logger.info(f"Updating position of soldier {soldier_id} from {old_pos_x},{old_pos_y} to {new_pos_x},{new_pos_y}...")
+    '''
+    Resolve the move intents of the round of `missile` in one batch (caller holds roster_lock).
+    Soldiers decide their moves on their own copy of the layout, so two of them may want the same cell.
+    Every move is a compare-and-set on the commander's layout which only succeeds if the target cell is still empty.
+    Moves into cells vacated by other moves of the batch are retried until no more move succeeds (in soldier id order).
+    A rejected soldier keeps its position, which kills it if that is inside the red zone (of any missile of a salvo).
+    '''
+    def resolve_moves(self, missile):
+        self.reject_moves(self.claim_moves(self.pending_moves()), missile)
+
+    # Move intents of the round as (soldier id, target) in soldier id order, the intents are cleared (caller holds roster_lock)
+    def pending_moves(self):
+        pending = []
+        for soldier_id, target in sorted(self.move_intents.items()):
+            # Soldiers which died or were elected as commander in the meantime have no move left to make
+            if soldier_id in self.soldier_details and target != self.soldier_details[soldier_id]["position"]:
+                pending.append((soldier_id, target))
+        self.move_intents = {}
+        return pending
+
+    # Make the moves whose target cell is empty, until no more move succeeds, returns the rejected moves (caller holds roster_lock)
+    def claim_moves(self, pending):
+        has_moved = True
+        while has_moved and len(pending) > 0:
+            has_moved = False
+            rejected = []
+            for soldier_id, target in pending:
+                old_pos_x, old_pos_y = self.soldier_details[soldier_id]["position"]
+                if self.in_war_zone(target) and self.move_cell(old_pos_x, old_pos_y, target[0], target[1], soldier_id):
+                    logger.info(f"Updating position of soldier {soldier_id} from {old_pos_x},{old_pos_y} to {target[0]},{target[1]}...")
+                    self.soldier_details[soldier_id]["position"] = target
+                    self.confirmed_moves[soldier_id] = missiledefence_pb2.WasHit(soldier_id=soldier_id, is_alive=True, position=target)
+                    self.log_event(journal.MOVED, soldier_id, target)
+                    has_moved = True
+                else:
+                    rejected.append((soldier_id, target))
+            pending = rejected
+        return pending
+
+    # Soldiers whose move was rejected stay where they are, dead if that is in a red zone of `missile` (caller holds roster_lock)
+    def reject_moves(self, rejected, missile):
+        if len(rejected) > 0:
+            red_zones = salvo.RedZones.of(salvo.round_missiles(missile), missile_details)
+        for soldier_id, target in rejected:
+            position = self.soldier_details[soldier_id]["position"]
+            is_alive = not red_zones.is_red(position[0], position[1])
+            logger.info(f"Move of soldier {soldier_id} to {target[0]},{target[1]} rejected, the cell is taken. Soldier {'stays' if is_alive else 'dead'} at {position[0]},{position[1]}")
+            if not is_alive:
+                self.remove_dead_soldier(soldier_id)
+            self.confirmed_moves[soldier_id] = missiledefence_pb2.WasHit(soldier_id=soldier_id, is_alive=is_alive, position=position)
 
     '''
-    Update ALIVE status and position after movement upon request (if any)
+    Update ALIVE status upon request, and take the position after movement (if any) as the soldier's move intent
     If the soldier which requested is alive, but the commander is dead by this time:
         If the commander has not asked any other soldier to be the new commander:
             Ask the current soldier to be the new commander
     '''
     def status(self, request, context):
-        self.soldier_details[request.soldier_id]["is_alive"]=request.is_alive
-            
-        global casuality_count
-        if request.is_alive == False:
-            # If dead
-            pos_x = self.soldier_details[request.soldier_id]["position"][0]
-            pos_y = self.soldier_details[request.soldier_id]["position"][1]
-            self.layout[pos_x-1][pos_y-1] = 0
-
-            # Remove tracking details of the dead soldier
-            self.dead_soldiers.append(request.soldier_id)
-            del self.soldier_details[request.soldier_id]
-            del self.status_requests_received[request.soldier_id]
-            casuality_count+=1
-        else:
-            self.updatePositions(request.soldier_id, request.position)
-        
+        return self.apply_status(request)
+
+    # Shared by the status RPC and the status updates sent on war_session
+    @metrics.timed("status")
+    def apply_status(self, request):
         reply = missiledefence_pb2.CommanderStatus()
         election_needed = False
-        if not self.is_alive and not self.commander_dead_sent:
-            election_needed = True
-            # If commander in currently in dead state and no soldier has been asked to become new commander
-            del self.status_requests_received[request.soldier_id]
-            self.commander_dead_sent = True
-            pos_x = self.position[0]
-            pos_y = self.position[1]
-            self.layout[pos_x-1][pos_y-1] = 0
-
-            soldiers = list(self.soldier_details)
-            if len(soldiers) == 0:
-                # If there are no more soldiers to elect commander
+        # Roster and election state first, the round accounting below only needs round_condition
+        with self.roster_lock:
+            if request.soldier_id == self.sid:
+                self.apply_commander_status(request)
+                return reply
+
+            if request.is_alive == False:
+                # If dead, remove tracking details of the dead soldier
+                self.remove_dead_soldier(request.soldier_id)
+            else:
+                # The move is only an intent until the round is resolved (see resolve_moves)
+                self.move_intents[request.soldier_id] = list(request.position)
+
+            if not self.is_alive and not self.commander_dead_sent and use_ranked_election:
+                # The successor takes over right away, the status update is counted for the round as usual
+                self.commander_dead_sent = True
+                self.set_cell(self.position[0], self.position[1], 0)
+                self.casuality_count+=1
+                successor = self.next_successor()
+                if successor is not None:
+                    logger.info(f"Electing {successor} as the new commander (highest speed) ...")
+                    self.take_over(successor, self.soldier_details[successor].get("speed", 0))
                 reply.new_commander_id = -1
+            elif not self.is_alive and not self.commander_dead_sent and (request.is_alive or len(self.soldier_details) == 0):
+                election_needed = True
+                # If commander in currently in dead state and no soldier has been asked to become new commander.
+                # Only the soldier which reported gets the reply (on its own stream), so it is the one asked,
+                # a dead one leaves the election to the next alive soldier which reports.
+                # The asked soldier's status is not counted, so the round is only over once it has taken over
+                # and its election is in the round's journal records (see take_over).
+                self.commander_dead_sent = True
+                pos_x = self.position[0]
+                pos_y = self.position[1]
+                self.set_cell(pos_x, pos_y, 0)
+
+                if request.is_alive:
+                    reply.new_commander_id = request.soldier_id
+                else:
+                    # If there are no more soldiers to elect commander
+                    reply.new_commander_id = -1
+                self.casuality_count+=1
             else:
-                reply.new_commander_id = random.choice(soldiers)
-            casuality_count+=1
-        else:
-            reply.new_commander_id = -1
+                reply.new_commander_id = -1
 
         if request.is_alive == True and not election_needed:
             # Update the number of status update requests received from the particular soldier for tracking purposes
-            self.status_requests_received[request.soldier_id]+=1
-            self.updated_layout_semaphore+=1
+            # (a soldier which was asked to become commander is no longer tracked)
+            with self.round_condition:
+                if request.soldier_id not in self.status_requests_received:
+                    return reply
+                reported = self.status_requests_received[request.soldier_id]
+                self.status_requests_received[request.soldier_id] = reported+1
+                self.round_reports[reported]-=1
+                self.round_reports[reported+1]+=1
+
+                # Wake the streams only when the last status request of the round arrives
+                if self.is_round_reported(reported+1):
+                    self.wake_streams()
 
         return reply
 
     def print_layout(self):
-        layout_string = "\n"
-        for row in self.layout:
-            for col in row:
-                layout_string += str(col) + "     "
-            layout_string += "\n"
-        logger.info(layout_string)
+        # Rendering the layout is O(N^2), so only do it when the message is written somewhere
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        if isinstance(self.layout, SparseWarZone):
+            # Only the occupied regions of a sparse war zone are printed
+            logger.info(self.layout.render())
+            return
+        logger.info("\n" + "".join("     ".join(map(str, row)) + "     \n" for row in self.layout.tolist()))
 
 
     # commander as a soldier
     def move_soldier(self, selected_movement, no_of_moves):
+        row_step, col_step = escape.movement_steps[selected_movement]
+        return self.move_by(row_step * no_of_moves, col_step * no_of_moves)
+
+    # Move by a displacement of (row_move, col_move), returns False if the new position is outside the war zone or taken
+    def move_by(self, row_move, col_move):
         old_x = self.position[0]
         old_y = self.position[1]
-
-        # Update position according to the randomly chosen direction and number of moves
-        if selected_movement == "left":
-            self.position[1] = old_y - no_of_moves
-        elif selected_movement == "right":
-            self.position[1] = old_y + no_of_moves
-        elif selected_movement == "up":
-            self.position[0] = old_x - no_of_moves
-        elif selected_movement == "down":
-            self.position[0] = old_x + no_of_moves
-        elif selected_movement == "left_up":
-            self.position[0] = old_x - no_of_moves
-            self.position[1] = old_y - no_of_moves
-        elif selected_movement == "left_down":
-            self.position[0] = old_x + no_of_moves
-            self.position[1] = old_y - no_of_moves
-        elif selected_movement == "right_up":
-            self.position[0] = old_x - no_of_moves
-            self.position[1] = old_y + no_of_moves
-        else:  # right_down
-            self.position[0] = old_x + no_of_moves
-            self.position[1] = old_y + no_of_moves
+        self.position[0] = old_x + row_move
+        self.position[1] = old_y + col_move
 
         # Check if new position is going out of war zone boundary. If so, reset position and return FALSE.
         if (
             self.position[0] <= 0
             or self.position[1] <= 0
-            or self.position[0] > len(self.layout)
-            or self.position[1] > len(self.layout[0])
-            or self.layout[self.position[0]-1][self.position[1]-1] != 0
+            or self.position[0] > self.layout.shape[0]
+            or self.position[1] > self.layout.shape[1]
+            or not self.move_cell(old_x, old_y, self.position[0], self.position[1], self.sid)
         ):
             self.position[0] = old_x
             self.position[1] = old_y
             return False
-        self.layout[old_x-1][old_y-1] = 0
-        self.layout[self.position[0]-1][self.position[1]-1] = self.sid
         return True
 
-    def take_shelter(self, missile_position, time, missile_type):
+    # red_zones are the red zones of all missiles of a salvo round (see salvo.py), None for a single missile
+    @metrics.timed("take_shelter")
+    def take_shelter(self, missile_position, time, missile_type, red_zones=None):
         # Print current missile details
         logger.info("Time: {0}".format(time))
         logger.info("Missile type: {0}".format(missile_type))
         logger.info("Missile position: {0}".format(missile_position))
-        rad = missile_details[missile_type]["radius"] - 1
-        logger.info("Radius: {0}".format(rad+1))
-
-        # Calculate red zone using missile drop location and radius
-        i_start = missile_position[0] - rad
-        i_end = missile_position[0] + rad
-        j_start = missile_position[1] - rad
-        j_end = missile_position[1] + rad
-        
+        radius = missile_details[missile_type]["radius"]
+        logger.info("Radius: {0}".format(radius))
+
         has_moved = False
+        row_offset = self.position[0] - missile_position[0]
+        col_offset = self.position[1] - missile_position[1]
+        if red_zones is None:
+            in_red_zone = escape.in_red_zone(radius, row_offset, col_offset)
+        else:
+            logger.info("Salvo of {0} missiles".format(len(red_zones.zones)))
+            in_red_zone = red_zones.is_red(self.position[0], self.position[1])
 
         # If current soldier within red zone, try to move
-        if (
-            i_start <= self.position[0] <= i_end
-            and j_start <= self.position[1] <= j_end
-        ):
-            movements = {}
-            # Calculate basic movements - left, right, up down
-            movements["left"] = (self.position[1] - j_start) + 1
-            movements["right"] = (j_end - self.position[1]) + 1
-            movements["up"] = (self.position[0] - i_start) + 1
-            movements["down"] = (i_end - self.position[0]) + 1
-
-            # Deduce diagonal movements from basic movements
-            movements["left_up"] = min(movements["left"], movements["up"])
-            movements["left_down"] = min(movements["left"], movements["down"])
-            movements["right_up"] = min(movements["right"], movements["up"])
-            movements["right_down"] = min(movements["right"], movements["down"])
-
-            while len(movements) > 0 and not has_moved:
-                # Find the minimum of all the above calculated movements
-                min_move_calc = min(movements.values())
-
-                # Compare the above result with max speed of the soldier,
-                # If speed is lesser than what is needed, soldier can't escape the read zone (DEAD)
-                if self.speed >= min_move_calc:
-                    # Choose all possible direction where movement can be made with selected min no of moves
-                    possible_movements = [
-                        key for key in movements if movements[key] == min_move_calc
-                    ]
+        if in_red_zone:
+            # Movements out of the red zone within the speed of the soldier, by number of moves, shortest first (see escape.py),
+            # or out of the red zones of all missiles of a salvo (see salvo.py)
+            if red_zones is None:
+                escape_movements = escape.escape_movements(radius, row_offset, col_offset, self.speed)
+            else:
+                escape_movements = red_zones.escape_movements(self.position, self.speed)
+            for possible_movements in escape_movements:
+                possible_movements = list(possible_movements)
+                selected_movement = random.choice(possible_movements)
+
+                # Try to move as long as there are possible movements
+                while (
+                    len(possible_movements) != 0
+                    and has_moved != True
+                ):
                     selected_movement = random.choice(possible_movements)
-
-                    # Try to move as long as there are possible movements
-                    while (
-                        len(possible_movements) != 0
-                        and has_moved != True
-                    ):
-                        selected_movement = random.choice(possible_movements)
-                        has_moved = self.move_soldier(selected_movement, min_move_calc)
-                        if has_moved==False:
-                            del movements[selected_movement]
-                            possible_movements.remove(selected_movement)
-
-                    if len(movements) == 0 and not has_moved:
-                        self.layout[self.position[0]-1][self.position[1]-1] = 0
-                        self.is_alive = False
-                        break
-                else:
-                    self.is_alive = False
+                    has_moved = self.move_by(*selected_movement)
+                    if has_moved==False:
+                        possible_movements.remove(selected_movement)
+                if has_moved:
                     break
-            
+
+            # If no movement is possible within the speed of the soldier, soldier can't escape the red zone (DEAD)
+            if not has_moved:
+                self.is_alive = False
+
             # If soldier dead, make soldier position 0 in layout
             if self.is_alive == False:
-                self.dead_soldiers.append(self.sid)
-                self.layout[self.position[0] - 1][self.position[1] - 1] = 0
-                if self.sid in self.soldier_details.keys():
-                    del self.soldier_details[self.sid]
+                with self.roster_lock:
+                    self.dead_soldiers.append(self.sid)
+                    self.set_cell(self.position[0], self.position[1], 0)
+                    self.soldier_details.pop(self.sid, None)
+                    self.log_event(journal.DIED, self.sid, self.position)
+            else:
+                self.log_event(journal.MOVED, self.sid, self.position)
 
         logger.info(f"has_moved: {has_moved}, New position of soldier {self.sid}: {self.position}...")
 
 
 def take_missile_seq_input():
     global missile_launches
-    no_of_missiles = int(T/t)
+    no_of_missiles = round(T/t)
     logger.info(f"Please enter the type and position of your {no_of_missiles} missiles in the following format... Eg: M1:1,1  M2:1,2  M3:2,2  M4:3,2")
+    logger.info("Missiles joined with + land at the same time as a salvo, Eg: M1:1,1+M4:6,6  M2:1,2")
     while True:
         missile_launches = []
         missile_seq = list(input(f"Your missile sequence: ").split(" "))
         for i in range(len(missile_seq)):
-            type_plus_pos = missile_seq[i].split(":")
-            if len(type_plus_pos) != 2:
+            missiles = [parse_missile(type_plus_pos) for type_plus_pos in missile_seq[i].split("+")]
+            if None in missiles:
                 break
+            launch = {"position": missiles[0]["position"], "time": parse_seconds(t*i), "type": missiles[0]["type"], "sent":False}
+            if len(missiles) > 1:
+                launch["salvo"] = missiles[1:]
+            missile_launches.append(launch)
 
-            missile_type = type_plus_pos[0]
-            if missile_type in missile_details.keys():
-                position = type_plus_pos[1].split(",")
-                if len(position) != 2:
-                    break
-
-                try:
-                    missile_row = int(position[0])
-                    missile_col = int(position[1])
-                    if missile_row <= 0 or missile_col <= 0:
-                        break
-                    missile_launches.append({"position":[missile_row, missile_col], "time": t*i, "type": missile_type, "sent":False})
-                except:
-                    break
-                
         if len(missile_launches) == no_of_missiles: 
             break
         else:
             logger.info("Please enter again with proper format.. Also check the missile position with war zone boundary values..")
 
+# A missile in the format type:row,col, None if it is not valid
+def parse_missile(type_plus_pos):
+    type_plus_pos = type_plus_pos.split(":")
+    if len(type_plus_pos) != 2 or type_plus_pos[0] not in missile_details.keys():
+        return None
+    position = type_plus_pos[1].split(",")
+    if len(position) != 2:
+        return None
+    try:
+        missile_row = int(position[0])
+        missile_col = int(position[1])
+    except ValueError:
+        return None
+    if missile_row <= 0 or missile_col <= 0:
+        return None
+    return {"position": [missile_row, missile_col], "type": type_plus_pos[0]}
+
+# Seconds as an int if whole, otherwise as a float (t can be a fraction of a second)
+def parse_seconds(seconds):
+    seconds = round(float(seconds), 9)
+    return int(seconds) if seconds.is_integer() else seconds
+
 def take_inputs():
     global T, t
-    T = int(input("Please enter total time of war (T): "))
+    T = parse_seconds(input("Please enter total time of war (T): "))
     while True:
-        t = int(input("Please enter time per missile (t): "))
-        if T%t == 0:
+        t = parse_seconds(input("Please enter time per missile (t): "))
+        # T has to be a multiple of t (up to floating point error)
+        if t > 0 and abs(round(T/t) * t - T) <= 1e-9 * T:
             break
         else:
             logger.info(f"Please enter any factor of the T which you have specified as {T}")
     take_missile_seq_input()
 
-def start_commander():
+# Start exporting metrics if configured, returns the server interceptors which count RPCs and streamed bytes
+def start_metrics(interceptor):
+    if metrics_port is None and metrics_file is None:
+        return []
+    metrics.enable()
+    if metrics_port is not None:
+        metrics.serve_http(metrics_port)
+        logger.info(f"Serving metrics on port {metrics_port}")
+    if metrics_file is not None:
+        metrics.write_periodically(metrics_file, metrics_file_interval)
+    return [interceptor]
+
+# Missile launches of a scenario (see scenarios.py), none of them sent yet
+def launches_of(scenario):
+    launches = []
+    for missile in scenario.missiles:
+        launch = {"position": missile["position"], "time": missile["time"], "type": missile["type"], "sent": False}
+        if len(missile.get("salvo", [])) > 0:
+            launch["salvo"] = missile["salvo"]
+        launches.append(launch)
+    return launches
+
+# Take T, t and the missile sequence from a scenario file (see scenarios.py) instead of input prompts
+def load_inputs(scenario_file):
+    global T, t, M, missile_launches
+    scenario = scenarios.load(scenario_file)
+    T = scenario.T
+    t = scenario.t
+    M = scenario.no_of_soldiers
+    missile_launches = launches_of(scenario)
+    logger.info(f"Loaded {len(missile_launches)} missiles from {scenario_file}, T={T}, t={t}")
+
+# Scenario file and failover mode (--resume, --standby or None) of "python commander.py [scenario_file] [--resume | --standby]"
+def parse_args(args):
+    mode = next((arg for arg in args if arg in ("--resume", "--standby")), None)
+    files = [arg for arg in args if arg != mode]
+    if mode is not None and checkpoint_file is None:
+        raise SystemExit(f"{mode} needs a checkpoint_file (see commander.py)")
+    return (files[0] if len(files) > 0 else None), mode
+
+# A standby commander waits until no one accepts connections on commander_port any more, i.e. the commander is gone
+def stand_by():
+    logger.info(f"Standing by until the commander on port {commander_port} is gone..")
+    while True:
+        try:
+            socket.create_connection(("localhost", int(commander_port)), timeout=1).close()
+        except ConnectionRefusedError:
+            return
+        except OSError:
+            # A busy commander may be slow to accept, it is only gone once connections are refused
+            pass
+        time.sleep(standby_interval)
+
+# Continue the war of checkpoint_file with `commander`, returns False if there is nothing left to serve
+def resume_war(commander):
+    started = time.perf_counter()
+    try:
+        saved = checkpoint.Checkpoint.load(checkpoint_file)
+    except (FileNotFoundError, ValueError) as e:
+        # The commander was gone before the first round was over
+        logger.info(f"No checkpoint to resume from ({e}), starting the war from the beginning..")
+        return True
+    commander.restore(saved)
+    logger.info(f"Resumed from {checkpoint_file} in {(time.perf_counter() - started) * 1000:.1f} ms")
+    if commander.is_war_over:
+        logger.info("The war is already over..")
+        return False
+    return True
+
+def start_commander(scenario_file=None, mode=None):
     # Accept hyperparameters T, t and missile launch details
-    take_inputs()
+    if scenario_file is not None:
+        load_inputs(scenario_file)
+    else:
+        take_inputs()
     port = commander_port
 
-    # By default, gRPC "server" supports multi-threading out of the box
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    missiledefence_pb2_grpc.add_CommanderServicer_to_server(Commander(), server)
+    if mode == "--standby":
+        stand_by()
+    commander = Commander()
+    if mode is not None and not resume_war(commander):
+        return
+
+    # By default, gRPC "server" supports multi-threading out of the box.
+    # Soldier streams hold their thread for the whole war, at least one thread is left for the other calls.
+    workers = max_workers if M is None else M + max_workers
+    commander.stream_capacity = workers - 1
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=workers),
+        interceptors=start_metrics(metrics.MetricsInterceptor()),
+        options=server_options,
+    )
+    missiledefence_pb2_grpc.add_CommanderServicer_to_server(commander, server)
     server.add_insecure_port("[::]:" + port)
 
     # Server starts listening and will satisfy all requests which pertain to the Commander class
@@ -475,4 +1281,6 @@ def start_commander():
 
 
 if __name__ == "__main__":
-    start_commander()
+    configure_logging()
+    # python commander.py [scenario_file] [--resume | --standby]
+    start_commander(*parse_args(sys.argv[1:]))
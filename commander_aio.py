@@ -0,0 +1,232 @@
+"""The asyncio (grpc.aio) implementation of the GRPC missile defence commander.
+
+Every stream is a coroutine instead of a thread pool worker, so one commander process
+can serve thousands of concurrent soldier streams. The game logic is shared with commander.py, down to the
+steps of a round on a stream (open_round ... close_round), so only the waits and the stream reads differ.
+"""
+
+import asyncio
+import sys
+import grpc
+import missiledefence_pb2
+import missiledefence_pb2_grpc
+import commander
+import metrics
+from commander import Commander, logger
+
+
+class AsyncCommander(Commander):
+
+    def __init__(self):
+        super().__init__()
+        # Set (and replaced) whenever the first commander is elected or a round may have been completed.
+        # All handlers run on the event loop thread, so the state itself is only guarded by the threading locks
+        # of Commander, which are never held across an await.
+        self.round_changed = asyncio.Event()
+
+    def wake_streams(self):
+        self.round_changed.set()
+        self.round_changed = asyncio.Event()
+
+    async def wait_until(self, predicate):
+        while not predicate():
+            await self.round_changed.wait()
+
+    async def wait_for_commander(self):
+        await self.wait_until(self.is_war_ready)
+        self.print_initial_layout()
+
+    @metrics.timed("status_barrier_wait")
+    async def wait_for_round(self, rounds_sent):
+        await self.wait_until(lambda: self.is_round_reported(rounds_sent))
+
+    @metrics.timed("sleep")
+    async def wait_for_launch(self, k):
+        return await self.scheduler.async_wait_for_launch(k)
+
+    async def soldier_ready(self, request, context):
+        return Commander.soldier_ready(self, request, context)
+
+    async def status(self, request, context):
+        return self.apply_status(request)
+
+    async def elect_commander(self, request, context):
+        return Commander.elect_commander(self, request, context)
+
+    # Missile Server Streaming, see Commander.missile_approaching
+    async def missile_approaching(self, request, context):
+        await self.wait_for_commander()
+
+        sent_version = -1
+        rounds_sent = 0
+        for k in range(len(commander.missile_launches)):
+            i = await self.wait_for_launch(k)
+            alive = self.open_round(i, [request.soldier_id])
+            if alive is None:
+                continue
+
+            if len(alive) == 0:
+                return
+
+            reply = self.round_message(i, request.soldier_id, sent_version)
+            sent_version = reply.layout_version
+            yield reply
+            rounds_sent+=1
+
+            await self.wait_for_round(rounds_sent)
+
+            war_over, confirmed, elected = self.close_round(i, [request.soldier_id])
+            if len(confirmed) > 0:
+                yield missiledefence_pb2.MissileApproaching(confirmed=confirmed[0])
+            if elected is not None:
+                yield missiledefence_pb2.MissileApproaching(elected=elected)
+                return
+            if war_over:
+                return
+
+    # Bidirectional war session, see Commander.war_session
+    async def war_session(self, request_iterator, context):
+        soldier_id = (await anext(request_iterator)).join.soldier_id
+
+        await self.wait_for_commander()
+
+        sent_version = -1
+        rounds_sent = 0
+        for k in range(len(commander.missile_launches)):
+            i = await self.wait_for_launch(k)
+            alive = self.open_round(i, [soldier_id])
+            if alive is None:
+                continue
+
+            if len(alive) == 0:
+                return
+
+            reply = self.round_message(i, soldier_id, sent_version)
+            sent_version = reply.layout_version
+            yield missiledefence_pb2.SessionEvent(missile=reply)
+            rounds_sent+=1
+
+            update = await anext(request_iterator, None)
+            if update is None:
+                return
+            status_reply = self.stream_status(update.status)
+
+            if status_reply is not None:
+                yield missiledefence_pb2.SessionEvent(status=status_reply)
+                if status_reply.new_commander_id == soldier_id:
+                    self.elect_from(status_reply.new_commander_id, await anext(request_iterator, None), context)
+                    return
+
+            await self.wait_for_round(rounds_sent)
+
+            war_over, confirmed, elected = self.close_round(i, [soldier_id])
+            if len(confirmed) > 0:
+                yield missiledefence_pb2.SessionEvent(confirmed=confirmed[0])
+            if elected is not None:
+                yield missiledefence_pb2.SessionEvent(status=elected)
+                return
+            if war_over:
+                return
+
+    # Soldier host session, see Commander.host_session
+    async def host_session(self, request_iterator, context):
+        host_soldiers = set()
+        first_commander = -1
+        rejoined = []
+        more = True
+        while more:
+            join = (await anext(request_iterator)).join
+            more = join.more
+            for connection_request in join.soldiers:
+                host_soldiers.add(connection_request.soldier_id)
+                ready = Commander.soldier_ready(self, connection_request, context)
+                if ready.soldier_id != -1:
+                    first_commander = connection_request.soldier_id
+                if ready.HasField("rejoined"):
+                    rejoined.append(ready.rejoined)
+        yield missiledefence_pb2.HostEvent(ready=missiledefence_pb2.NewCommanderFilter(soldier_id=first_commander))
+        if len(rejoined) > 0:
+            yield missiledefence_pb2.HostEvent(confirmed=missiledefence_pb2.WasHitBatch(statuses=rejoined))
+
+        if first_commander != -1:
+            Commander.elect_commander(self, (await anext(request_iterator)).elect, context)
+            host_soldiers.discard(first_commander)
+
+        await self.wait_for_commander()
+
+        sent_version = -1
+        rounds_sent = 0
+        for k in range(len(commander.missile_launches)):
+            i = await self.wait_for_launch(k)
+            alive = self.open_round(i, host_soldiers)
+            if alive is None:
+                continue
+
+            host_soldiers = alive
+            if len(host_soldiers) == 0:
+                return
+
+            reply = self.round_message(i, -1, sent_version)
+            sent_version = reply.layout_version
+            yield missiledefence_pb2.HostEvent(missile=reply)
+            rounds_sent+=1
+
+            update = await anext(request_iterator, None)
+            if update is None:
+                return
+            for was_hit in update.statuses.statuses:
+                if was_hit.soldier_id not in host_soldiers:
+                    # Elected as commander earlier in this batch
+                    continue
+                status_reply = self.stream_status(was_hit)
+                if status_reply is not None:
+                    yield missiledefence_pb2.HostEvent(status=status_reply)
+                    if status_reply.new_commander_id in host_soldiers:
+                        self.elect_from(status_reply.new_commander_id, await anext(request_iterator, None), context)
+                        host_soldiers.discard(status_reply.new_commander_id)
+
+            await self.wait_for_round(rounds_sent)
+
+            war_over, confirmed, elected = self.close_round(i, host_soldiers)
+            if len(confirmed) > 0:
+                yield missiledefence_pb2.HostEvent(confirmed=missiledefence_pb2.WasHitBatch(statuses=confirmed))
+            if elected is not None:
+                yield missiledefence_pb2.HostEvent(status=elected)
+                host_soldiers.discard(elected.new_commander_id)
+            if war_over:
+                return
+
+
+async def serve(mode=None):
+    port = commander.commander_port
+
+    if mode == "--standby":
+        commander.stand_by()
+    async_commander = AsyncCommander()
+    if mode is not None and not commander.resume_war(async_commander):
+        return
+
+    # Streams are coroutines, so the number of soldiers is not bound by a thread pool
+    server = grpc.aio.server(
+        interceptors=commander.start_metrics(metrics.AsyncMetricsInterceptor()),
+        options=commander.server_options,
+    )
+    missiledefence_pb2_grpc.add_CommanderServicer_to_server(async_commander, server)
+    server.add_insecure_port("[::]:" + port)
+
+    await server.start()
+    logger.info("Server started (asyncio), listening on " + port)
+    await server.wait_for_termination()
+
+
+if __name__ == "__main__":
+    commander.configure_logging()
+
+    # Accept hyperparameters T, t and missile launch details
+    # python commander_aio.py [scenario_file] [--resume | --standby]
+    scenario_file, mode = commander.parse_args(sys.argv[1:])
+    if scenario_file is not None:
+        commander.load_inputs(scenario_file)
+    else:
+        commander.take_inputs()
+    asyncio.run(serve(mode))
@@ -0,0 +1,255 @@
+"""Headless in-process war engine: a complete war without sockets, sleeps or input prompts.
+
+Soldiers (and the commander) are the Soldier state machines of soldier.py moving on one simulated layout,
+so take_shelter and move_soldier are the exact rules of a live war. Rounds and elections follow Commander:
+
+- the commander takes shelter first, then every alive soldier, in a random order (like the order in which
+  the soldier threads of a live war get to move)
+- missiles dropped outside the war zone are skipped, salvo missiles (see salvo.py) one by one
+- a dead commander counts as a casualty and is replaced by a randomly chosen alive soldier, or with
+  ranked_election=True by the fastest one, lowest soldier id first (see use_ranked_election in commander.py)
+- the war is lost once the casualties reach half of the soldiers, or when the commander is dead and
+  there is no one left to elect, and won once all missiles have been dropped
+
+All random choices are made with one random.Random, so a scenario and a seed always give the same war.
+With planner=True the soldiers (not the commander) evacuate together as planned by evacuation.py instead.
+With journal_file set the war is recorded like a live one (see journal_file in commander.py) for "python journal.py".
+
+    result = engine.run_war(engine.Scenario(6, [[1, 1], [5, 5], [3, 3]], [1, 2, 4], [{"type": "M2", "position": [3, 3]}]), seed=7)
+"""
+
+import random
+import numpy as np
+import blast
+import evacuation
+import journal
+import salvo
+import warzone
+# soldier.py imports scenarios.py, which imports this module, so attributes of soldier are only looked up when used
+import soldier
+
+
+class Scenario():
+
+    '''
+    size: N of the NxN war zone
+    positions: 1-indexed [row, col] of soldiers 1..M
+    speeds: max speed of soldiers 1..M
+    missiles: in launch order, each {"type": "M1".."M4", "position": [row, col]} and optionally its "time"
+    first_commander: soldier id of the first commander, chosen randomly (from the seed) if None
+    t: seconds between missiles, used by a live war (see scenarios.py)
+    '''
+    def __init__(self, size, positions, speeds, missiles, first_commander=None, t=1):
+        if len(positions) != len(speeds):
+            raise ValueError(f"{len(positions)} soldier positions but {len(speeds)} speeds")
+        if len(positions) == 0:
+            raise ValueError("A war needs at least one soldier")
+        occupied = set()
+        for position in positions:
+            if not (1 <= position[0] <= size and 1 <= position[1] <= size) or tuple(position) in occupied:
+                raise ValueError(f"Soldier position {position} is outside the war zone or already taken")
+            occupied.add(tuple(position))
+        if first_commander is not None and not 1 <= first_commander <= len(positions):
+            raise ValueError(f"First commander {first_commander} is not a soldier id")
+
+        self.size = size
+        self.positions = positions
+        self.speeds = speeds
+        self.missiles = missiles
+        self.first_commander = first_commander
+        self.t = t
+
+    @property
+    def no_of_soldiers(self):
+        return len(self.positions)
+
+    # Total time of the war
+    @property
+    def T(self):
+        return self.t * len(self.missiles)
+
+
+class WarResult():
+
+    def __init__(self, outcome, casualties, layout, dead_soldiers, elections, rounds, commander_id):
+        # "won" or "lost"
+        self.outcome = outcome
+        self.casualties = casualties
+        # Final NxN layout (dense or sparse, see warzone.py)
+        self.layout = layout
+        # Ids of the dead soldiers and commanders in order of death
+        self.dead_soldiers = dead_soldiers
+        # Number of commanders elected after the first one died
+        self.elections = elections
+        # Number of missiles dropped inside the war zone
+        self.rounds = rounds
+        # Id of the commander at the end of the war, -1 if the last commander died
+        self.commander_id = commander_id
+
+    @property
+    def is_won(self):
+        return self.outcome == "won"
+
+    def __repr__(self):
+        return (f"WarResult(outcome={self.outcome!r}, casualties={self.casualties}, elections={self.elections}, "
+                f"rounds={self.rounds}, commander_id={self.commander_id})")
+
+
+# Missiles of a sequence in the commander's input format, e.g. "M1:1,1 M2:1,2", one every t seconds
+def parse_missile_sequence(missile_seq, t=1):
+    missiles = []
+    for i, launch in enumerate(missile_seq.split()):
+        # Missiles joined with "+" are a salvo, they all land at time t*i (see salvo.py)
+        salvo_missiles = []
+        for type_plus_pos in launch.split("+"):
+            try:
+                missile_type, position = type_plus_pos.split(":")
+                missile_row, missile_col = [int(x) for x in position.split(",")]
+            except ValueError:
+                raise ValueError(f"Missile {type_plus_pos!r} is not in the format type:row,col") from None
+            if missile_type not in soldier.missile_details or missile_row <= 0 or missile_col <= 0:
+                raise ValueError(f"Missile {type_plus_pos!r} has an unknown type or a position outside the war zone")
+            salvo_missiles.append({"position": [missile_row, missile_col], "type": missile_type})
+        missile = dict(salvo_missiles[0], time=t*i)
+        if len(salvo_missiles) > 1:
+            missile["salvo"] = salvo_missiles[1:]
+        missiles.append(missile)
+    return missiles
+
+
+def is_in_war_zone(position, size):
+    return position[0] <= size and position[1] <= size
+
+
+# All soldiers take shelter together as planned by evacuation.plan_salvo_evacuation
+def evacuate(participants, red_zones, layout, rng):
+    positions = [participant.position for participant in participants]
+    new_positions, alive = evacuation.plan_salvo_evacuation(
+        positions,
+        [participant.speed for participant in participants],
+        red_zones,
+        layout,
+        rng,
+    )
+    blast.apply_blast(layout, [participant.sid for participant in participants], positions, new_positions, alive)
+    for participant, position, is_alive in zip(participants, new_positions.tolist(), alive.tolist()):
+        participant.position = position
+        participant.is_alive = is_alive
+
+
+# Record the moves and deaths of a round in the journal, the position of each participant before the round is in `positions`
+def journal_round(events, participants, positions):
+    for participant in participants:
+        if not participant.is_alive:
+            events.append(journal.DIED, participant.sid, participant.position[0], participant.position[1])
+        elif list(participant.position) != positions[participant.sid]:
+            events.append(journal.MOVED, participant.sid, participant.position[0], participant.position[1])
+
+
+# Run a complete war of `scenario`, deterministically for a given seed
+def run_war(scenario, seed=None, planner=False, ranked_election=False, journal_file=None):
+    rng = random.Random(seed)
+    size = scenario.size
+    layout = warzone.new_layout(size, soldier.layout_dtype)
+    events = None
+    if journal_file is not None:
+        events = journal.Journal(journal_file)
+        events.open(size, scenario.no_of_soldiers)
+
+    soldiers = {}
+    for i in range(scenario.no_of_soldiers):
+        position = list(scenario.positions[i])
+        layout[position[0]-1, position[1]-1] = i+1
+        soldiers[i+1] = soldier.Soldier(i+1, position, scenario.speeds[i], layout, rng)
+
+    # The first commander no longer takes part as a soldier
+    commander_id = scenario.first_commander if scenario.first_commander is not None else rng.choice(list(soldiers))
+    commander = soldiers.pop(commander_id)
+    commander.is_commander = True
+    if planner:
+        planner_rng = np.random.default_rng(rng.getrandbits(64))
+
+    casualties = 0
+    dead_soldiers = []
+    elections = 0
+    rounds = 0
+    outcome = None
+
+    # Index of the last missile dropped inside the war zone, the war is won once it has been survived
+    last_round = max(
+        (i for i, missile in enumerate(scenario.missiles) if any(is_in_war_zone(m["position"], size) for m in salvo.round_missiles(missile))),
+        default=-1,
+    )
+
+    for i in range(last_round + 1):
+        # Missiles of a salvo outside the war zone are skipped, like single missiles
+        missiles = [m for m in salvo.round_missiles(scenario.missiles[i]) if is_in_war_zone(m["position"], size)]
+        if len(missiles) == 0:
+            continue
+        rounds += 1
+        missile = missiles[0]
+        missile_time = scenario.missiles[i].get("time", i)
+        red_zones = salvo.RedZones.of(missiles, soldier.missile_details) if len(missiles) > 1 else None
+        if events is not None:
+            events.begin_round(i, missiles, layout, (commander.sid, commander.position, commander.is_alive))
+            positions = {participant.sid: list(participant.position) for participant in [commander, *soldiers.values()]}
+
+        # Commander takes evasive action first, then the soldiers
+        commander.take_shelter(missile["position"], missile_time, missile["type"], red_zones)
+        order = list(soldiers.values())
+        if planner:
+            if red_zones is None:
+                red_zones = salvo.RedZones.of(missiles, soldier.missile_details)
+            evacuate(order, red_zones, layout, planner_rng)
+        else:
+            rng.shuffle(order)
+            for participant in order:
+                participant.take_shelter(missile["position"], missile_time, missile["type"], red_zones)
+        if events is not None:
+            journal_round(events, [commander, *order], positions)
+        for participant in order:
+            if not participant.is_alive:
+                del soldiers[participant.sid]
+                dead_soldiers.append(participant.sid)
+                casualties += 1
+
+        if not commander.is_alive:
+            dead_soldiers.append(commander.sid)
+            casualties += 1
+            if len(soldiers) == 0:
+                commander = None
+            else:
+                if ranked_election:
+                    commander = soldiers.pop(min(soldiers, key=lambda sid: (-soldiers[sid].speed, sid)))
+                else:
+                    commander = soldiers.pop(rng.choice(list(soldiers)))
+                commander.is_commander = True
+                elections += 1
+                if events is not None:
+                    events.append(journal.ELECTED, commander.sid, commander.position[0], commander.position[1])
+
+        # Same order of checks as Commander.finish_round
+        if casualties >= 0.5 * scenario.no_of_soldiers:
+            outcome = "lost"
+        elif i == last_round:
+            outcome = "won"
+        elif commander is None:
+            outcome = "lost"
+        if events is not None:
+            events.flush()
+        if outcome is not None:
+            break
+
+    if outcome is None:
+        # No missile was dropped inside the war zone
+        outcome = "won"
+
+    return WarResult(
+        outcome,
+        casualties,
+        layout,
+        dead_soldiers,
+        elections,
+        rounds,
+        commander.sid if commander is not None else -1,
+    )
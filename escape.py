@@ -0,0 +1,70 @@
+"""Escape tables: the movements which take_shelter tries to leave a red zone, computed once and cached.
+
+They only depend on the missile radius (given by the missile type in missile_details), the soldier's offset from
+the impact point and its speed, and speeds above the longest movement out of the red zone all behave the same.
+So the candidate displacements are cached per (radius, offset, speed bucket), and the evasive action of a soldier
+is a table lookup plus occupancy checks (see take_shelter in commander.py and soldier.py).
+"""
+
+import functools
+
+# Unit steps [row, col] of the 8 movements, in the order take_shelter lists movements of the same length
+movement_steps = {
+    "left": (0, -1),
+    "right": (0, 1),
+    "up": (-1, 0),
+    "down": (1, 0),
+    "left_up": (-1, -1),
+    "left_down": (1, -1),
+    "right_up": (-1, 1),
+    "right_down": (1, 1),
+}
+
+
+def in_red_zone(radius, row_offset, col_offset):
+    rad = radius - 1
+    return abs(row_offset) <= rad and abs(col_offset) <= rad
+
+
+'''
+Movements out of the red zone of a missile of `radius` for a soldier at (row_offset, col_offset) from the impact point
+which can make at most `speed` moves: groups of equally long movements, shortest first, each group a tuple of
+(row_move, col_move) displacements. Empty if the soldier is outside the red zone or too slow for every movement.
+'''
+def escape_movements(radius, row_offset, col_offset, speed):
+    # The longest movement out of the red zone crosses all of it, any higher speed is the same bucket
+    return escape_table(radius, row_offset, col_offset, min(speed, 2 * radius - 1))
+
+
+@functools.lru_cache(maxsize=None)
+def escape_table(radius, row_offset, col_offset, speed):
+    if not in_red_zone(radius, row_offset, col_offset):
+        return ()
+    rad = radius - 1
+
+    # Number of moves to leave the red zone along each movement, diagonals are limited by the nearer edge
+    left = col_offset + rad + 1
+    right = rad - col_offset + 1
+    up = row_offset + rad + 1
+    down = rad - row_offset + 1
+    distances = {
+        "left": left,
+        "right": right,
+        "up": up,
+        "down": down,
+        "left_up": min(left, up),
+        "left_down": min(left, down),
+        "right_up": min(right, up),
+        "right_down": min(right, down),
+    }
+
+    groups = []
+    for moves in sorted(set(distances.values())):
+        if moves > speed:
+            break
+        groups.append(tuple(
+            (row_step * moves, col_step * moves)
+            for movement, (row_step, col_step) in movement_steps.items()
+            if distances[movement] == moves
+        ))
+    return tuple(groups)
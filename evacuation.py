@@ -0,0 +1,227 @@
+"""Evacuation planner: shelter for all soldiers in the red zone of a missile, planned together.
+
+take_shelter (and blast.py) only try the 8 straight-line movements of the minimum number of moves, so a soldier
+dies once those few cells are taken, even when another free cell outside the red zone is within its speed.
+The planner lets a soldier move to any free cell outside the red zone within its speed (up to `speed` moves
+along the rows, columns and diagonals, i.e. a Chebyshev distance of at most `speed`) and hands out the cells
+to all soldiers of the red zone together, so that as many of them as possible survive:
+
+1. a distance transform of the free safe cells around the red zone gives the distance from every cell to the
+   nearest free safe cell, soldiers farther than their speed from all of them are dead right away
+2. the other soldiers list the nearest free safe cells within their speed (at most max_candidates of them), and a
+   maximum bipartite matching between soldiers and cells (Hopcroft-Karp) decides who goes where. Only soldiers
+   an augmenting path has to go through list all free safe cells within their speed.
+
+Only the red zone and the cells around it within the highest speed are looked at, so the cost of a round does not
+depend on the number of soldiers outside the red zone. Same interface as blast.resolve_blast.
+plan_salvo_evacuation does the same for the red zones of all missiles of a salvo round (see salvo.py).
+"""
+
+from collections import deque
+import numpy as np
+import salvo
+import warzone
+
+# Cells a soldier lists at first, nearest first. A few more than the soldiers competing for the same cells are enough,
+# the lists are what bounds the cost of the matching for rounds with thousands of soldiers in the red zones.
+max_candidates = 32
+
+
+'''
+Distance from every cell of `mask`'s grid to the nearest True cell, in moves along rows, columns and diagonals
+(Chebyshev distance). Cells farther than max_distance from every True cell get max_distance + 1.
+'''
+def chebyshev_distance(mask, max_distance):
+    distance = np.full(mask.shape, max_distance + 1, dtype=np.int64)
+    distance[mask] = 0
+    reached = mask.copy()
+    for d in range(1, max_distance + 1):
+        # One move in any of the 8 directions is a 3x3 dilation, done as a dilation of the rows then of the cols
+        grown = reached.copy()
+        grown[1:, :] |= reached[:-1, :]
+        grown[:-1, :] |= reached[1:, :]
+        dilated = grown.copy()
+        dilated[:, 1:] |= grown[:, :-1]
+        dilated[:, :-1] |= grown[:, 1:]
+        distance[dilated & ~reached] = d
+        reached = dilated
+    return distance
+
+
+'''
+Maximum bipartite matching of soldiers to cells (Hopcroft-Karp, with explicit stacks instead of recursion).
+candidates[s] are the cells soldier s can take (an array of indices below no_of_cells), in order of preference.
+If the lists are cut short, complete(s) returns the whole list of soldier s: it is only asked for the soldiers which
+an augmenting path may go through, so the matching is still maximum. Returns the cell of every soldier, None if it has none.
+'''
+def match(candidates, no_of_cells, complete=None):
+    candidates = [np.asarray(soldier_cells, dtype=np.int64) for soldier_cells in candidates]
+    cells = np.full(len(candidates), -1, dtype=np.int64)
+    owner = np.full(no_of_cells, -1, dtype=np.int64)
+    is_complete = [complete is None] * len(candidates)
+
+    # Every soldier takes its most preferred free cell first, which leaves only a few soldiers to search for
+    for s, soldier_cells in enumerate(candidates):
+        free_cells = soldier_cells[owner[soldier_cells] < 0]
+        if len(free_cells) > 0:
+            owner[free_cells[0]] = s
+            cells[s] = free_cells[0]
+
+    while True:
+        # Layers of the soldiers reachable from the soldiers without a cell by taking over the cell of another soldier,
+        # up to the first layer which reaches a free cell (the shortest augmenting paths)
+        free = [s for s in np.flatnonzero(cells < 0).tolist() if len(candidates[s]) > 0]
+        layer = np.full(len(candidates), -1, dtype=np.int64)
+        layer[free] = 0
+        queue = deque(free)
+        shortest = None
+        while queue:
+            s = queue.popleft()
+            if shortest is not None and layer[s] > shortest:
+                break
+            if not is_complete[s]:
+                candidates[s] = np.asarray(complete(s), dtype=np.int64)
+                is_complete[s] = True
+            owners = owner[candidates[s]]
+            if shortest is None and (owners < 0).any():
+                shortest = int(layer[s])
+            others = owners[owners >= 0]
+            others = others[layer[others] < 0]
+            layer[others] = layer[s] + 1
+            queue.extend(others.tolist())
+        if shortest is None:
+            return [None if cell < 0 else int(cell) for cell in cells]
+
+        # Augmenting paths along the layers: every soldier on the path takes the cell of the next one, the last a free cell
+        next_cell = np.zeros(len(candidates), dtype=np.int64)
+        for root in free:
+            path = [root]
+            taken = []
+            while len(path) > 0:
+                s = path[-1]
+                rest = candidates[s][next_cell[s]:]
+                owners = owner[rest]
+                # A free cell, or the cell of a soldier in the next layer
+                next_layer = np.where(owners >= 0, layer[owners], -2)
+                usable = np.flatnonzero((owners < 0) | ((next_layer == layer[s] + 1) & (next_layer <= shortest)))
+                if len(usable) == 0:
+                    # Dead end, the soldier is not tried again in this phase
+                    next_cell[s] = len(candidates[s])
+                    layer[s] = -1
+                    path.pop()
+                    if len(taken) > 0:
+                        taken.pop()
+                    continue
+                j = int(usable[0])
+                next_cell[s] += j + 1
+                taken.append(int(rest[j]))
+                if owners[j] < 0:
+                    owner[taken] = path
+                    cells[path] = taken
+                    break
+                path.append(int(owners[j]))
+
+
+'''
+Plan the evacuation of all soldiers from the red zone of a missile.
+
+positions are the 1-indexed [row, col] of the soldiers (M x 2), speeds their max speeds (M),
+layout the NxN war zone (dense or sparse) where non-zero cells are occupied.
+Soldiers outside the red zone stay where they are. rng breaks ties between cells at the same distance.
+
+Returns the new positions (M x 2) and whether each soldier is alive (M).
+'''
+def plan_evacuation(positions, speeds, missile_position, radius, layout, rng=None):
+    return plan_salvo_evacuation(positions, speeds, salvo.RedZones([(missile_position, radius)]), layout, rng)
+
+
+# Same as plan_evacuation, out of the red zones of all missiles of a salvo round (see salvo.py)
+def plan_salvo_evacuation(positions, speeds, red_zones, layout, rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+    speeds = np.asarray(speeds, dtype=np.int64)
+
+    new_positions = positions.copy()
+    alive = np.ones(len(positions), dtype=bool)
+
+    in_red_zone = np.flatnonzero(red_zones.is_red(positions[:, 0], positions[:, 1]))
+    if len(in_red_zone) == 0:
+        return new_positions, alive
+
+    # Window of the cells which any soldier of the red zones can reach (0-indexed, inclusive)
+    reach = int(speeds[in_red_zone].max())
+    size_x, size_y = layout.shape
+    row_start = max(red_zones.row_start - reach, 0)
+    row_end = min(red_zones.row_start + red_zones.height - 1 + reach, size_x - 1)
+    col_start = max(red_zones.col_start - reach, 0)
+    col_end = min(red_zones.col_start + red_zones.width - 1 + reach, size_y - 1)
+
+    safe = np.ones((row_end - row_start + 1, col_end - col_start + 1), dtype=bool)
+    for row, col, soldier_id in warzone.occupied_in(layout, row_start, row_end, col_start, col_end):
+        safe[row - row_start, col - col_start] = False
+    # The red zones themselves are not safe
+    rows, cols = np.mgrid[row_start + 1:row_end + 2, col_start + 1:col_end + 2]
+    safe &= ~red_zones.is_red(rows, cols)
+    distance = chebyshev_distance(safe, reach)
+    # Number of free safe cells in every rectangle of the window in O(1) (integral image)
+    safe_counts = np.zeros((safe.shape[0] + 1, safe.shape[1] + 1), dtype=np.int64)
+    safe_counts[1:, 1:] = safe.cumsum(axis=0).cumsum(axis=1)
+    offsets = preferred_offsets(reach, rng)
+
+    # Free safe cells within the speed of soldier s as flat indices of `safe`, nearest first, at most `limit` of them
+    def listing(s, limit=None):
+        row, col = positions[s, 0] - 1 - row_start, positions[s, 1] - 1 - col_start
+        speed = int(speeds[s])
+        moves = speed
+        if limit is not None and (2 * speed + 1) ** 2 > 4 * limit:
+            # The nearest `limit` cells are within the smallest number of moves which reaches that many
+            # (small windows are cheaper to list whole and cut)
+            within = np.arange(distance[row, col], speed + 1)
+            tops, bottoms = np.maximum(row - within, 0), np.minimum(row + within + 1, safe.shape[0])
+            lefts, rights = np.maximum(col - within, 0), np.minimum(col + within + 1, safe.shape[1])
+            counts = safe_counts[bottoms, rights] - safe_counts[tops, rights] - safe_counts[bottoms, lefts] + safe_counts[tops, lefts]
+            moves = int(within[min(np.searchsorted(counts, limit), len(within) - 1)])
+        return nearest_cells(safe, row, col, offsets[:, :(2 * moves + 1) ** 2], limit)
+
+    soldiers = []
+    for s in in_red_zone.tolist():
+        row, col = positions[s, 0] - 1 - row_start, positions[s, 1] - 1 - col_start
+        if distance[row, col] > speeds[s]:
+            # No free safe cell within reach
+            alive[s] = False
+            continue
+        soldiers.append(s)
+
+    # Soldiers list their nearest max_candidates cells, and all of them only if the matching has to search through them
+    cells = match([listing(s, max_candidates) for s in soldiers], safe.size, lambda k: listing(soldiers[k]))
+
+    width = safe.shape[1]
+    for s, cell in zip(soldiers, cells):
+        if cell is None:
+            alive[s] = False
+        else:
+            new_positions[s] = [cell // width + row_start + 1, cell % width + col_start + 1]
+    return new_positions, alive
+
+
+# Offsets (rows, cols) of the cells within `reach` moves, nearest first (fewest moves, then fewest rows and cols apart),
+# ties in random order. The cells within k moves are the first (2k + 1)^2 of them.
+def preferred_offsets(reach, rng):
+    rows, cols = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+    rows, cols = rows.ravel(), cols.ravel()
+    order = np.lexsort((
+        rng.random(len(rows)),
+        np.abs(rows) + np.abs(cols),
+        np.maximum(np.abs(rows), np.abs(cols)),
+    ))
+    return np.stack([rows[order], cols[order]])
+
+
+# The free safe cells at `offsets` from (row, col), as flat indices of `safe` in the order of the offsets, the first `limit` of them
+def nearest_cells(safe, row, col, offsets, limit):
+    rows, cols = row + offsets[0], col + offsets[1]
+    inside = (rows >= 0) & (rows < safe.shape[0]) & (cols >= 0) & (cols < safe.shape[1])
+    rows, cols = rows[inside], cols[inside]
+    is_safe = safe[rows, cols]
+    return (rows[is_safe] * safe.shape[1] + cols[is_safe])[:limit]
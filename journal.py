@@ -0,0 +1,210 @@
+"""Binary event journal of a war: what happened, round by round, in fixed-size records appended to one file.
+
+A commander with journal_file set (see commander.py) appends a record for every missile launched, soldier moved,
+soldier died and commander elected, instead of having to read whole layouts back from the text logs.
+Every record is 20 bytes (record_dtype), the first one holds N and M.
+
+Every keyframe_interval rounds, the round starts with a keyframe: the position of every soldier on the layout
+and the commander. A small index file next to the journal (<journal_file>.idx) has, for every round, the records
+at which the round starts and ends and the record at which its keyframe starts. So the layout after any round is rebuilt
+from at most keyframe_interval rounds of records, without reading the journal from the start.
+Both files are only appended to, once per round, so a commander which dies in a round leaves complete rounds behind.
+
+    python journal.py logs/commander.journal        # number of rounds, N and M
+    python journal.py logs/commander.journal 3      # events of round 3 (counted from 0) and the layout after it
+"""
+
+from threading import Lock
+import sys
+import numpy as np
+import warzone
+
+# Rounds between two keyframes: more keyframes cost O(soldiers) each, fewer make replaying a round longer
+keyframe_interval = 16
+
+record_dtype = np.dtype([
+    ("kind", "u1"),
+    # Missile records: the k of the type Mk
+    ("missile_type", "u1"),
+    ("reserved", "<u2"),
+    # Index of the round's missile in the missile sequence
+    ("missile", "<i4"),
+    ("soldier_id", "<i4"),
+    ("row", "<i4"),
+    ("col", "<i4"),
+])
+index_dtype = np.dtype([("start", "<u8"), ("end", "<u8"), ("keyframe", "<u8")])
+
+# Kinds of records
+HEADER = 0          # row is N and col is M
+MISSILE = 1         # a missile of the round (one per missile of a salvo) at row, col
+MOVED = 2           # a soldier (or the commander) moved to row, col
+DIED = 3            # a soldier (or the commander) died at row, col
+ELECTED = 4         # a soldier took over as the commander at row, col
+POSITION = 5        # keyframe: a soldier is at row, col
+COMMANDER = 6       # keyframe: the commander (alive at row, col, or dead if row is 0)
+
+kind_names = {MISSILE: "missile launched", MOVED: "moved", DIED: "died", ELECTED: "elected as commander", POSITION: "at", COMMANDER: "commander"}
+
+
+class Journal():
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.index_file = None
+        # Records of the current round which are not written yet, and the rounds they start
+        self.buffer = bytearray()
+        self.pending_rounds = []
+        self.no_of_records = 0
+        self.no_of_rounds = 0
+        # Record at which the last keyframe starts, None until the first round after opening
+        self.keyframe = None
+        self.missile = -1
+        # Taken after all locks of the commander, the events of a round come from all of its streams
+        self.lock = Lock()
+
+    def is_open(self):
+        return self.file is not None
+
+    # Open the journal for appending, a new one starts with the header (a resumed commander continues an existing one)
+    def open(self, size, no_of_soldiers):
+        self.file = open(self.path, "ab")
+        self.index_file = open(self.path + ".idx", "ab")
+        # Records of a round which a commander died while writing are overwritten, only rounds in the index are kept
+        self.no_of_rounds = self.index_file.tell() // index_dtype.itemsize
+        self.index_file.truncate(self.no_of_rounds * index_dtype.itemsize)
+        if self.no_of_rounds > 0:
+            self.no_of_records = int(np.fromfile(self.path + ".idx", dtype=index_dtype, count=self.no_of_rounds)[-1]["end"])
+        else:
+            self.no_of_records = min(self.file.tell() // record_dtype.itemsize, 1)
+        self.file.truncate(self.no_of_records * record_dtype.itemsize)
+        if self.no_of_records == 0:
+            self.file.write(np.array([(HEADER, 0, 0, -1, 0, size, no_of_soldiers)], dtype=record_dtype).tobytes())
+            self.no_of_records = 1
+
+    # Record an event of the current round, events before the first round are in its keyframe
+    def append(self, kind, soldier_id, row, col):
+        with self.lock:
+            if self.keyframe is None:
+                return
+            self.buffer += np.array([(kind, 0, 0, self.missile, soldier_id, row, col)], dtype=record_dtype).tobytes()
+            self.no_of_records += 1
+
+    '''
+    Start the round of missile i (the missiles of a salvo, all in the war zone). Every keyframe_interval rounds, and always in the
+    first round after the journal was opened, the round starts with a keyframe of `layout` and the commander
+    (soldier id, [row, col], is alive).
+    '''
+    def begin_round(self, i, missiles, layout, commander):
+        with self.lock:
+            self.missile = i
+            start = self.no_of_records
+            if self.keyframe is None or self.no_of_rounds % keyframe_interval == 0:
+                records = keyframe_records(i, layout, commander)
+                self.keyframe = start
+                self.buffer += records.tobytes()
+                self.no_of_records += len(records)
+            self.pending_rounds.append([start, 0, self.keyframe])
+            self.no_of_rounds += 1
+            self.buffer += np.array(
+                [(MISSILE, int(missile["type"][1:]), 0, i, 0, missile["position"][0], missile["position"][1]) for missile in missiles],
+                dtype=record_dtype,
+            ).tobytes()
+            self.no_of_records += len(missiles)
+
+    # Write the records and rounds so far, once the round is over
+    def flush(self):
+        with self.lock:
+            # A round ends where the next one starts
+            for pending, next_round in zip(self.pending_rounds, self.pending_rounds[1:] + [[self.no_of_records]]):
+                pending[1] = next_round[0]
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.index_file.write(np.array([tuple(pending) for pending in self.pending_rounds], dtype=index_dtype).tobytes())
+            self.index_file.flush()
+            self.buffer = bytearray()
+            self.pending_rounds = []
+
+
+# Keyframe records of the layout and the commander
+def keyframe_records(i, layout, commander):
+    if isinstance(layout, warzone.SparseWarZone):
+        cells = np.array(list(layout.items()), dtype=np.int64).reshape(-1, 3)
+        rows, cols, soldier_ids = cells[:, 0], cells[:, 1], cells[:, 2]
+    else:
+        rows, cols = np.nonzero(layout)
+        soldier_ids = layout[rows, cols]
+    records = np.zeros(len(soldier_ids) + 1, dtype=record_dtype)
+    records["missile"] = i
+    records["kind"][:-1] = POSITION
+    records["soldier_id"][:-1] = soldier_ids
+    records["row"][:-1] = rows + 1
+    records["col"][:-1] = cols + 1
+    soldier_id, position, is_alive = commander
+    records[-1] = (COMMANDER, 0, 0, i, soldier_id, position[0] if is_alive else 0, position[1] if is_alive else 0)
+    return records
+
+
+class JournalReader():
+
+    # Memory-maps the journal and its index, nothing is read until a round is asked for
+    def __init__(self, path):
+        self.records = np.memmap(path, dtype=record_dtype, mode="r")
+        self.index = np.memmap(path + ".idx", dtype=index_dtype, mode="r")
+        header = self.records[0]
+        self.size = int(header["row"])
+        self.no_of_soldiers = int(header["col"])
+
+    def __len__(self):
+        return len(self.index)
+
+    def round_records(self, k):
+        return self.records[int(self.index[k]["start"]):int(self.index[k]["end"])]
+
+    '''
+    Layout after round k and the commander then, as (soldier id, [row, col] or None if dead). Only the records from
+    the keyframe of round k on are read: the last record of each soldier gives its position, or that it died.
+    '''
+    def layout_after(self, k):
+        records = self.records[int(self.index[k]["keyframe"]):int(self.index[k]["end"])]
+
+        placed = records[np.isin(records["kind"], [MOVED, DIED, ELECTED, POSITION])][::-1]
+        # np.unique finds the first record of every soldier, which is its last one in reverse
+        soldier_ids, last = np.unique(placed["soldier_id"], return_index=True)
+        last = placed[last]
+        alive = last[last["kind"] != DIED]
+
+        layout = warzone.new_layout(self.size, np.dtype("<i4"))
+        layout[alive["row"] - 1, alive["col"] - 1] = alive["soldier_id"]
+
+        # The commander is on the layout like every soldier, unless it died
+        commander_id = int(records[np.isin(records["kind"], [COMMANDER, ELECTED])][-1]["soldier_id"])
+        position = None
+        commander = alive[alive["soldier_id"] == commander_id]
+        if len(commander) > 0:
+            position = [int(commander[0]["row"]), int(commander[0]["col"])]
+        return layout, (commander_id, position)
+
+
+def describe(record):
+    if record["kind"] == MISSILE:
+        return f"Missile M{record['missile_type']} launched at {record['row']},{record['col']}"
+    return f"Soldier {record['soldier_id']} {kind_names[int(record['kind'])]} {record['row']},{record['col']}"
+
+
+if __name__ == "__main__":
+    # python journal.py journal_file [round]
+    reader = JournalReader(sys.argv[1])
+    print(f"{len(reader)} rounds of a war of {reader.no_of_soldiers} soldiers on a {reader.size}x{reader.size} war zone")
+    if len(sys.argv) > 2:
+        k = int(sys.argv[2])
+        for record in reader.round_records(k):
+            if record["kind"] not in (POSITION, COMMANDER):
+                print(describe(record))
+        layout, commander = reader.layout_after(k)
+        print(f"Layout after round {k}, commander {commander[0]}{'' if commander[1] is not None else ' (dead)'}:")
+        if isinstance(layout, warzone.SparseWarZone):
+            print(layout.render())
+        else:
+            print("".join("     ".join(map(str, row)) + "     \n" for row in layout.tolist()), end="")
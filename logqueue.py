@@ -0,0 +1,40 @@
+"""Non-blocking logging: the logging threads only put records on a queue, a background listener writes them.
+
+Used by configure_logging() of commander.py and soldier.py, so the file and console I/O of the logs
+is kept off the threads which serve the war.
+"""
+
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import logging
+import os
+import queue
+
+
+'''
+Log `logger` to `log_file` (at file_level and above) and to the console (at console_level and above)
+through a queue. The directory of `log_file` is created if needed. The logger level is set to the lowest
+of both levels, so logger.isEnabledFor() tells whether a message would be written anywhere at all.
+'''
+def start(logger, log_file, file_level=logging.DEBUG, console_level=logging.INFO):
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+
+    # File handler to output the log to file
+    fh = logging.FileHandler(log_file, mode='w', encoding='utf-8')
+    fh.setLevel(file_level)
+    fh.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+
+    # Console handler to output the log to console
+    ch = logging.StreamHandler()
+    ch.setLevel(console_level)
+    ch.setFormatter(logging.Formatter("%(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(min(file_level, console_level))
+
+    listener = QueueListener(log_queue, fh, ch, respect_handler_level=True)
+    listener.start()
+    # Write out the queued records before the process exits
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,242 @@
+"""Commander metrics: per-phase timers, counters, gauges and a round duration histogram.
+
+Nothing is recorded until enable() is called (see start_metrics in commander.py), so when metrics are
+not exported the instrumented functions only pay for one flag check. The metrics are rendered in the
+Prometheus text format, served over HTTP (serve_http) and/or written to a file periodically (write_periodically).
+
+- commander_phase_seconds_total / commander_phase_calls_total{phase}: time spent in take_shelter,
+  form_message, status (applying status updates), status_barrier_wait and sleep, summed over all streams
+- commander_rpcs_total{method}, commander_bytes_streamed_total{method}: RPCs served and response bytes sent
+- commander_streams_active{method}: streams currently open
+- commander_rounds_total and commander_round_duration_seconds: rounds completed and their duration
+  (from the commander taking shelter until the last status update of the round)
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from collections import Counter
+import functools
+import inspect
+import os
+import time
+import grpc
+
+enabled = False
+
+# Upper bounds of the round duration histogram buckets, in seconds
+round_duration_buckets = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+lock = Lock()
+# (name, labels) -> value, labels being a tuple of (label, value) pairs
+counters = Counter()
+gauges = Counter()
+# name -> {"buckets": counts per bucket, "sum": ..., "count": ...}
+histograms = {}
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def inc(name, value=1, **labels):
+    if not enabled:
+        return
+    with lock:
+        counters[(name, tuple(labels.items()))] += value
+
+
+def add_gauge(name, value, **labels):
+    if not enabled:
+        return
+    with lock:
+        gauges[(name, tuple(labels.items()))] += value
+
+
+def observe(name, value, buckets=round_duration_buckets):
+    if not enabled:
+        return
+    with lock:
+        histogram = histograms.setdefault(name, {"buckets": [0] * len(buckets), "bounds": buckets, "sum": 0.0, "count": 0})
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+                break
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+def record_phase(phase, seconds):
+    with lock:
+        counters[("commander_phase_seconds_total", (("phase", phase),))] += seconds
+        counters[("commander_phase_calls_total", (("phase", phase),))] += 1
+
+
+# Decorator which adds the time spent in a function (or coroutine function) to a phase
+def timed(phase):
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not enabled:
+                    return await func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record_phase(phase, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_phase(phase, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def format_labels(labels):
+    if len(labels) == 0:
+        return ""
+    return "{" + ",".join(f'{label}="{value}"' for label, value in labels) + "}"
+
+
+# All metrics in the Prometheus text exposition format
+def render():
+    with lock:
+        lines = []
+        for kind, values in [("counter", counters), ("gauge", gauges)]:
+            names = sorted({name for name, labels in values})
+            for name in names:
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{format_labels(labels)} {value:g}")
+        for name, histogram in sorted(histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram["bounds"], histogram["buckets"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {histogram["count"]}')
+            lines.append(f"{name}_sum {histogram['sum']:g}")
+            lines.append(f"{name}_count {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Scrapes are not logged
+    def log_message(self, format, *args):
+        pass
+
+
+# Serve the metrics at http://<host>:<port>/metrics from a daemon thread
+def serve_http(port):
+    server = ThreadingHTTPServer(("", port), MetricsRequestHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Rewrite `path` with the current metrics every `interval` seconds from a daemon thread.
+# The file is replaced atomically, so a reader never sees a partly written file.
+def write_periodically(path, interval):
+    def write_loop():
+        while True:
+            time.sleep(interval)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(render())
+            os.replace(path + ".tmp", path)
+
+    Thread(target=write_loop, daemon=True).start()
+
+
+'''
+Count the RPCs, open streams and response bytes of every method of a gRPC server.
+The handler of each call is wrapped: the behavior counts the call (and tracks open response streams),
+the response serializer counts the bytes which are actually sent.
+'''
+def wrap_handler(handler, method):
+    if handler is None:
+        return None
+
+    def serialize(response):
+        data = handler.response_serializer(response)
+        inc("commander_bytes_streamed_total", len(data), method=method)
+        return data
+
+    def count_call():
+        inc("commander_rpcs_total", method=method)
+
+    def unary(behavior):
+        if inspect.iscoroutinefunction(behavior):
+            async def async_unary(request, context):
+                count_call()
+                return await behavior(request, context)
+            return async_unary
+
+        def sync_unary(request, context):
+            count_call()
+            return behavior(request, context)
+        return sync_unary
+
+    def streaming(behavior):
+        if inspect.isasyncgenfunction(behavior):
+            async def async_streaming(request, context):
+                count_call()
+                add_gauge("commander_streams_active", 1, method=method)
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                finally:
+                    add_gauge("commander_streams_active", -1, method=method)
+            return async_streaming
+
+        def sync_streaming(request, context):
+            count_call()
+            add_gauge("commander_streams_active", 1, method=method)
+            try:
+                yield from behavior(request, context)
+            finally:
+                add_gauge("commander_streams_active", -1, method=method)
+        return sync_streaming
+
+    if handler.unary_unary:
+        return grpc.unary_unary_rpc_method_handler(unary(handler.unary_unary), handler.request_deserializer, serialize)
+    if handler.stream_unary:
+        return grpc.stream_unary_rpc_method_handler(unary(handler.stream_unary), handler.request_deserializer, serialize)
+    if handler.unary_stream:
+        return grpc.unary_stream_rpc_method_handler(streaming(handler.unary_stream), handler.request_deserializer, serialize)
+    return grpc.stream_stream_rpc_method_handler(streaming(handler.stream_stream), handler.request_deserializer, serialize)
+
+
+def method_name(handler_call_details):
+    return handler_call_details.method.rsplit("/", 1)[-1]
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+
+    def intercept_service(self, continuation, handler_call_details):
+        return wrap_handler(continuation(handler_call_details), method_name(handler_call_details))
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+
+    async def intercept_service(self, continuation, handler_call_details):
+        return wrap_handler(await continuation(handler_call_details), method_name(handler_call_details))
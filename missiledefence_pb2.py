@@ -13,35 +13,62 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x14missiledefence.proto\x12\x0emissiledefense\"#\n\rSoldierFilter\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\"+\n\x0f\x43ommanderStatus\x12\x18\n\x10new_commander_id\x18\x03 \x01(\x05\"(\n\x12NewCommanderFilter\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\"g\n\x11\x43onnectionRequest\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\x12\x10\n\x08position\x18\x02 \x03(\x05\x12\x16\n\x0eno_of_soldiers\x18\x03 \x01(\x05\x12\x14\n\x0cwarzone_size\x18\x04 \x01(\x05\"J\n\x13NewCommanderDetails\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\x12\x10\n\x08position\x18\x02 \x03(\x05\x12\r\n\x05speed\x18\x03 \x01(\x05\"\x07\n\x05\x45mpty\"@\n\x06WasHit\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\x12\x10\n\x08is_alive\x18\x02 \x01(\x08\x12\x10\n\x08position\x18\x03 \x03(\x05\">\n\x0eMissileDetails\x12\x10\n\x08position\x18\x01 \x03(\x05\x12\x0c\n\x04time\x18\x02 \x01(\x05\x12\x0c\n\x04type\x18\x03 \x01(\t\"\x18\n\tLayoutRow\x12\x0b\n\x03row\x18\x02 \x03(\x05\"p\n\x12MissileApproaching\x12/\n\x07missile\x18\x01 \x01(\x0b\x32\x1e.missiledefense.MissileDetails\x12)\n\x06layout\x18\x02 \x03(\x0b\x32\x19.missiledefense.LayoutRow2\xd9\x02\n\tCommander\x12X\n\rsoldier_ready\x12!.missiledefense.ConnectionRequest\x1a\".missiledefense.NewCommanderFilter\"\x00\x12\\\n\x13missile_approaching\x12\x1d.missiledefense.SoldierFilter\x1a\".missiledefense.MissileApproaching\"\x00\x30\x01\x12\x43\n\x06status\x12\x16.missiledefense.WasHit\x1a\x1f.missiledefense.CommanderStatus\"\x00\x12O\n\x0f\x65lect_commander\x12#.missiledefense.NewCommanderDetails\x1a\x15.missiledefense.Empty\"\x00\x42>\n\x1fio.grpc.examples.MissileDefenceB\x13MissileDefenceProtoP\x01\xa2\x02\x03MDSb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x14missiledefence.proto\x12\x0emissiledefense\"#\n\rSoldierFilter\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\"?\n\x0f\x43ommanderStatus\x12\x18\n\x10new_commander_id\x18\x03 \x01(\x05\x12\x12\n\nis_elected\x18\x04 \x01(\x08\"R\n\x12NewCommanderFilter\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\x12(\n\x08rejoined\x18\x02 \x01(\x0b\x32\x16.missiledefense.WasHit\"v\n\x11\x43onnectionRequest\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\x12\x10\n\x08position\x18\x02 \x03(\x05\x12\x16\n\x0eno_of_soldiers\x18\x03 \x01(\x05\x12\x14\n\x0cwarzone_size\x18\x04 \x01(\x05\x12\r\n\x05speed\x18\x05 \x01(\x05\"J\n\x13NewCommanderDetails\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\x12\x10\n\x08position\x18\x02 \x03(\x05\x12\r\n\x05speed\x18\x03 \x01(\x05\"\x07\n\x05\x45mpty\"@\n\x06WasHit\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\x12\x10\n\x08is_alive\x18\x02 \x01(\x08\x12\x10\n\x08position\x18\x03 \x03(\x05\"S\n\x0eMissileDetails\x12\x10\n\x08position\x18\x01 \x03(\x05\x12\x0c\n\x04time\x18\x02 \x01(\x05\x12\x0c\n\x04type\x18\x03 \x01(\t\x12\x13\n\x0blaunch_time\x18\x04 \x01(\x01\"\x18\n\tLayoutRow\x12\x0b\n\x03row\x18\x02 \x03(\x05\":\n\nLayoutCell\x12\x0b\n\x03row\x18\x01 \x01(\x05\x12\x0b\n\x03\x63ol\x18\x02 \x01(\x05\x12\x12\n\nsoldier_id\x18\x03 \x01(\x05\"\xb6\x03\n\x12MissileApproaching\x12/\n\x07missile\x18\x01 \x01(\x0b\x32\x1e.missiledefense.MissileDetails\x12)\n\x06layout\x18\x02 \x03(\x0b\x32\x19.missiledefense.LayoutRow\x12\x16\n\x0elayout_version\x18\x03 \x01(\x03\x12\x13\n\x0bis_snapshot\x18\x04 \x01(\x08\x12\x14\n\x0c\x62\x61se_version\x18\x05 \x01(\x03\x12+\n\x07\x63hanges\x18\x06 \x03(\x0b\x32\x1a.missiledefense.LayoutCell\x12\x14\n\x0clayout_cells\x18\x07 \x01(\x0c\x12\x32\n\x0eoccupied_cells\x18\x08 \x03(\x0b\x32\x1a.missiledefense.LayoutCell\x12)\n\tconfirmed\x18\t \x01(\x0b\x32\x16.missiledefense.WasHit\x12-\n\x05salvo\x18\n \x03(\x0b\x32\x1e.missiledefense.MissileDetails\x12\x30\n\x07\x65lected\x18\x0b \x01(\x0b\x32\x1f.missiledefense.CommanderStatus\"\xa8\x01\n\rSessionUpdate\x12-\n\x04join\x18\x01 \x01(\x0b\x32\x1d.missiledefense.SoldierFilterH\x00\x12(\n\x06status\x18\x02 \x01(\x0b\x32\x16.missiledefense.WasHitH\x00\x12\x34\n\x05\x65lect\x18\x03 \x01(\x0b\x32#.missiledefense.NewCommanderDetailsH\x00\x42\x08\n\x06update\"\xae\x01\n\x0cSessionEvent\x12\x35\n\x07missile\x18\x01 \x01(\x0b\x32\".missiledefense.MissileApproachingH\x00\x12\x31\n\x06status\x18\x02 \x01(\x0b\x32\x1f.missiledefense.CommanderStatusH\x00\x12+\n\tconfirmed\x18\x03 \x01(\x0b\x32\x16.missiledefense.WasHitH\x00\x42\x07\n\x05\x65vent\"[\n\x16\x43onnectionRequestBatch\x12\x33\n\x08soldiers\x18\x01 \x03(\x0b\x32!.missiledefense.ConnectionRequest\x12\x0c\n\x04more\x18\x02 \x01(\x08\"7\n\x0bWasHitBatch\x12(\n\x08statuses\x18\x01 \x03(\x0b\x32\x16.missiledefense.WasHit\"\xb5\x01\n\nHostUpdate\x12\x36\n\x04join\x18\x01 \x01(\x0b\x32&.missiledefense.ConnectionRequestBatchH\x00\x12/\n\x08statuses\x18\x02 \x01(\x0b\x32\x1b.missiledefense.WasHitBatchH\x00\x12\x34\n\x05\x65lect\x18\x03 \x01(\x0b\x32#.missiledefense.NewCommanderDetailsH\x00\x42\x08\n\x06update\"\xc6\x02\n\tHostEvent\x12\x33\n\x05ready\x18\x01 \x01(\x0b\x32\".missiledefense.NewCommanderFilterH\x00\x12\x35\n\x07missile\x18\x02 \x01(\x0b\x32\".missiledefense.MissileApproachingH\x00\x12\x31\n\x06status\x18\x03 \x01(\x0b\x32\x1f.missiledefense.CommanderStatusH\x00\x12\x30\n\tconfirmed\x18\x04 \x01(\x0b\x32\x1b.missiledefense.WasHitBatchH\x00\x12/\n\x08\x64\x65parted\x18\x05 \x01(\x0b\x32\x1b.missiledefense.WasHitBatchH\x00\x12.\n\x07\x61rrived\x18\x06 \x01(\x0b\x32\x1b.missiledefense.WasHitBatchH\x00\x42\x07\n\x05\x65vent\",\n\tPromotion\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\x12\x0b\n\x03nth\x18\x02 \x01(\x05\"\x1d\n\x0cRoundRequest\x12\r\n\x05index\x18\x01 \x01(\x05\"^\n\x05\x43laim\x12\x12\n\nsoldier_id\x18\x01 \x01(\x05\x12\x10\n\x08position\x18\x02 \x03(\x05\x12\x0e\n\x06target\x18\x03 \x03(\x05\x12\r\n\x05speed\x18\x04 \x01(\x05\x12\x10\n\x08\x61\x63\x63\x65pted\x18\x05 \x01(\x08\"3\n\nClaimBatch\x12%\n\x06\x63laims\x18\x01 \x03(\x0b\x32\x15.missiledefense.Claim\"\x8d\x01\n\nTileStatus\x12\x16\n\x0eno_of_soldiers\x18\x01 \x01(\x05\x12\x17\n\x0f\x63\x61suality_count\x18\x02 \x01(\x05\x12\x1a\n\x12is_commander_alive\x18\x03 \x01(\x08\x12\x32\n\x0e\x62order_changes\x18\x04 \x03(\x0b\x32\x1a.missiledefense.LayoutCell\"X\n\x08RoundEnd\x12\r\n\x05index\x18\x01 \x01(\x05\x12\x13\n\x0bis_war_over\x18\x02 \x01(\x08\x12(\n\x04halo\x18\x03 \x03(\x0b\x32\x1a.missiledefense.LayoutCell2\xf8\x03\n\tCommander\x12X\n\rsoldier_ready\x12!.missiledefense.ConnectionRequest\x1a\".missiledefense.NewCommanderFilter\"\x00\x12\\\n\x13missile_approaching\x12\x1d.missiledefense.SoldierFilter\x1a\".missiledefense.MissileApproaching\"\x00\x30\x01\x12\x43\n\x06status\x12\x16.missiledefense.WasHit\x1a\x1f.missiledefense.CommanderStatus\"\x00\x12O\n\x0f\x65lect_commander\x12#.missiledefense.NewCommanderDetails\x1a\x15.missiledefense.Empty\"\x00\x12P\n\x0bwar_session\x12\x1d.missiledefense.SessionUpdate\x1a\x1c.missiledefense.SessionEvent\"\x00(\x01\x30\x01\x12K\n\x0chost_session\x12\x1a.missiledefense.HostUpdate\x1a\x19.missiledefense.HostEvent\"\x00(\x01\x30\x01\x32\xec\x03\n\x04Tile\x12\x41\n\ntile_ready\x12\x15.missiledefense.Empty\x1a\x1a.missiledefense.TileStatus\"\x00\x12J\n\x07promote\x12\x19.missiledefense.Promotion\x1a\".missiledefense.NewCommanderFilter\"\x00\x12>\n\tbegin_war\x12\x18.missiledefense.RoundEnd\x1a\x15.missiledefense.Empty\"\x00\x12H\n\nplay_round\x12\x1c.missiledefense.RoundRequest\x1a\x1a.missiledefense.ClaimBatch\"\x00\x12G\n\x0b\x63laim_cells\x12\x1a.missiledefense.ClaimBatch\x1a\x1a.missiledefense.ClaimBatch\"\x00\x12\x42\n\x06settle\x12\x1a.missiledefense.ClaimBatch\x1a\x1a.missiledefense.TileStatus\"\x00\x12>\n\tend_round\x12\x18.missiledefense.RoundEnd\x1a\x15.missiledefense.Empty\"\x00\x42>\n\x1fio.grpc.examples.MissileDefenceB\x13MissileDefenceProtoP\x01\xa2\x02\x03MDSb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'missiledefence_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
-
   DESCRIPTOR._options = None
   DESCRIPTOR._serialized_options = b'\n\037io.grpc.examples.MissileDefenceB\023MissileDefenceProtoP\001\242\002\003MDS'
   _globals['_SOLDIERFILTER']._serialized_start=40
   _globals['_SOLDIERFILTER']._serialized_end=75
   _globals['_COMMANDERSTATUS']._serialized_start=77
-  _globals['_COMMANDERSTATUS']._serialized_end=120
-  _globals['_NEWCOMMANDERFILTER']._serialized_start=122
-  _globals['_NEWCOMMANDERFILTER']._serialized_end=162
-  _globals['_CONNECTIONREQUEST']._serialized_start=164
-  _globals['_CONNECTIONREQUEST']._serialized_end=267
-  _globals['_NEWCOMMANDERDETAILS']._serialized_start=269
-  _globals['_NEWCOMMANDERDETAILS']._serialized_end=343
-  _globals['_EMPTY']._serialized_start=345
-  _globals['_EMPTY']._serialized_end=352
-  _globals['_WASHIT']._serialized_start=354
-  _globals['_WASHIT']._serialized_end=418
-  _globals['_MISSILEDETAILS']._serialized_start=420
-  _globals['_MISSILEDETAILS']._serialized_end=482
-  _globals['_LAYOUTROW']._serialized_start=484
-  _globals['_LAYOUTROW']._serialized_end=508
-  _globals['_MISSILEAPPROACHING']._serialized_start=510
-  _globals['_MISSILEAPPROACHING']._serialized_end=622
-  _globals['_COMMANDER']._serialized_start=625
-  _globals['_COMMANDER']._serialized_end=970
+  _globals['_COMMANDERSTATUS']._serialized_end=140
+  _globals['_NEWCOMMANDERFILTER']._serialized_start=142
+  _globals['_NEWCOMMANDERFILTER']._serialized_end=224
+  _globals['_CONNECTIONREQUEST']._serialized_start=226
+  _globals['_CONNECTIONREQUEST']._serialized_end=344
+  _globals['_NEWCOMMANDERDETAILS']._serialized_start=346
+  _globals['_NEWCOMMANDERDETAILS']._serialized_end=420
+  _globals['_EMPTY']._serialized_start=422
+  _globals['_EMPTY']._serialized_end=429
+  _globals['_WASHIT']._serialized_start=431
+  _globals['_WASHIT']._serialized_end=495
+  _globals['_MISSILEDETAILS']._serialized_start=497
+  _globals['_MISSILEDETAILS']._serialized_end=580
+  _globals['_LAYOUTROW']._serialized_start=582
+  _globals['_LAYOUTROW']._serialized_end=606
+  _globals['_LAYOUTCELL']._serialized_start=608
+  _globals['_LAYOUTCELL']._serialized_end=666
+  _globals['_MISSILEAPPROACHING']._serialized_start=669
+  _globals['_MISSILEAPPROACHING']._serialized_end=1107
+  _globals['_SESSIONUPDATE']._serialized_start=1110
+  _globals['_SESSIONUPDATE']._serialized_end=1278
+  _globals['_SESSIONEVENT']._serialized_start=1281
+  _globals['_SESSIONEVENT']._serialized_end=1455
+  _globals['_CONNECTIONREQUESTBATCH']._serialized_start=1457
+  _globals['_CONNECTIONREQUESTBATCH']._serialized_end=1548
+  _globals['_WASHITBATCH']._serialized_start=1550
+  _globals['_WASHITBATCH']._serialized_end=1605
+  _globals['_HOSTUPDATE']._serialized_start=1608
+  _globals['_HOSTUPDATE']._serialized_end=1789
+  _globals['_HOSTEVENT']._serialized_start=1792
+  _globals['_HOSTEVENT']._serialized_end=2118
+  _globals['_PROMOTION']._serialized_start=2120
+  _globals['_PROMOTION']._serialized_end=2164
+  _globals['_ROUNDREQUEST']._serialized_start=2166
+  _globals['_ROUNDREQUEST']._serialized_end=2195
+  _globals['_CLAIM']._serialized_start=2197
+  _globals['_CLAIM']._serialized_end=2291
+  _globals['_CLAIMBATCH']._serialized_start=2293
+  _globals['_CLAIMBATCH']._serialized_end=2344
+  _globals['_TILESTATUS']._serialized_start=2347
+  _globals['_TILESTATUS']._serialized_end=2488
+  _globals['_ROUNDEND']._serialized_start=2490
+  _globals['_ROUNDEND']._serialized_end=2578
+  _globals['_COMMANDER']._serialized_start=2581
+  _globals['_COMMANDER']._serialized_end=3085
+  _globals['_TILE']._serialized_start=3088
+  _globals['_TILE']._serialized_end=3580
 # @@protoc_insertion_point(module_scope)
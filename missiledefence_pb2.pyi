@@ -12,28 +12,34 @@ class SoldierFilter(_message.Message):
     def __init__(self, soldier_id: _Optional[int] = ...) -> None: ...
 
 class CommanderStatus(_message.Message):
-    __slots__ = ["new_commander_id"]
+    __slots__ = ["new_commander_id", "is_elected"]
     NEW_COMMANDER_ID_FIELD_NUMBER: _ClassVar[int]
+    IS_ELECTED_FIELD_NUMBER: _ClassVar[int]
     new_commander_id: int
-    def __init__(self, new_commander_id: _Optional[int] = ...) -> None: ...
+    is_elected: bool
+    def __init__(self, new_commander_id: _Optional[int] = ..., is_elected: bool = ...) -> None: ...
 
 class NewCommanderFilter(_message.Message):
-    __slots__ = ["soldier_id"]
+    __slots__ = ["soldier_id", "rejoined"]
     SOLDIER_ID_FIELD_NUMBER: _ClassVar[int]
+    REJOINED_FIELD_NUMBER: _ClassVar[int]
     soldier_id: int
-    def __init__(self, soldier_id: _Optional[int] = ...) -> None: ...
+    rejoined: WasHit
+    def __init__(self, soldier_id: _Optional[int] = ..., rejoined: _Optional[_Union[WasHit, _Mapping]] = ...) -> None: ...
 
 class ConnectionRequest(_message.Message):
-    __slots__ = ["soldier_id", "position", "no_of_soldiers", "warzone_size"]
+    __slots__ = ["soldier_id", "position", "no_of_soldiers", "warzone_size", "speed"]
     SOLDIER_ID_FIELD_NUMBER: _ClassVar[int]
     POSITION_FIELD_NUMBER: _ClassVar[int]
     NO_OF_SOLDIERS_FIELD_NUMBER: _ClassVar[int]
     WARZONE_SIZE_FIELD_NUMBER: _ClassVar[int]
+    SPEED_FIELD_NUMBER: _ClassVar[int]
     soldier_id: int
     position: _containers.RepeatedScalarFieldContainer[int]
     no_of_soldiers: int
     warzone_size: int
-    def __init__(self, soldier_id: _Optional[int] = ..., position: _Optional[_Iterable[int]] = ..., no_of_soldiers: _Optional[int] = ..., warzone_size: _Optional[int] = ...) -> None: ...
+    speed: int
+    def __init__(self, soldier_id: _Optional[int] = ..., position: _Optional[_Iterable[int]] = ..., no_of_soldiers: _Optional[int] = ..., warzone_size: _Optional[int] = ..., speed: _Optional[int] = ...) -> None: ...
 
 class NewCommanderDetails(_message.Message):
     __slots__ = ["soldier_id", "position", "speed"]
@@ -60,14 +66,16 @@ class WasHit(_message.Message):
     def __init__(self, soldier_id: _Optional[int] = ..., is_alive: bool = ..., position: _Optional[_Iterable[int]] = ...) -> None: ...
 
 class MissileDetails(_message.Message):
-    __slots__ = ["position", "time", "type"]
+    __slots__ = ["position", "time", "type", "launch_time"]
     POSITION_FIELD_NUMBER: _ClassVar[int]
     TIME_FIELD_NUMBER: _ClassVar[int]
     TYPE_FIELD_NUMBER: _ClassVar[int]
+    LAUNCH_TIME_FIELD_NUMBER: _ClassVar[int]
     position: _containers.RepeatedScalarFieldContainer[int]
     time: int
     type: str
-    def __init__(self, position: _Optional[_Iterable[int]] = ..., time: _Optional[int] = ..., type: _Optional[str] = ...) -> None: ...
+    launch_time: float
+    def __init__(self, position: _Optional[_Iterable[int]] = ..., time: _Optional[int] = ..., type: _Optional[str] = ..., launch_time: _Optional[float] = ...) -> None: ...
 
 class LayoutRow(_message.Message):
     __slots__ = ["row"]
@@ -75,10 +83,154 @@ class LayoutRow(_message.Message):
     row: _containers.RepeatedScalarFieldContainer[int]
     def __init__(self, row: _Optional[_Iterable[int]] = ...) -> None: ...
 
+class LayoutCell(_message.Message):
+    __slots__ = ["row", "col", "soldier_id"]
+    ROW_FIELD_NUMBER: _ClassVar[int]
+    COL_FIELD_NUMBER: _ClassVar[int]
+    SOLDIER_ID_FIELD_NUMBER: _ClassVar[int]
+    row: int
+    col: int
+    soldier_id: int
+    def __init__(self, row: _Optional[int] = ..., col: _Optional[int] = ..., soldier_id: _Optional[int] = ...) -> None: ...
+
 class MissileApproaching(_message.Message):
-    __slots__ = ["missile", "layout"]
+    __slots__ = ["missile", "layout", "layout_version", "is_snapshot", "base_version", "changes", "layout_cells", "occupied_cells", "confirmed", "salvo", "elected"]
     MISSILE_FIELD_NUMBER: _ClassVar[int]
     LAYOUT_FIELD_NUMBER: _ClassVar[int]
+    LAYOUT_VERSION_FIELD_NUMBER: _ClassVar[int]
+    IS_SNAPSHOT_FIELD_NUMBER: _ClassVar[int]
+    BASE_VERSION_FIELD_NUMBER: _ClassVar[int]
+    CHANGES_FIELD_NUMBER: _ClassVar[int]
+    LAYOUT_CELLS_FIELD_NUMBER: _ClassVar[int]
+    OCCUPIED_CELLS_FIELD_NUMBER: _ClassVar[int]
+    CONFIRMED_FIELD_NUMBER: _ClassVar[int]
+    SALVO_FIELD_NUMBER: _ClassVar[int]
+    ELECTED_FIELD_NUMBER: _ClassVar[int]
     missile: MissileDetails
     layout: _containers.RepeatedCompositeFieldContainer[LayoutRow]
-    def __init__(self, missile: _Optional[_Union[MissileDetails, _Mapping]] = ..., layout: _Optional[_Iterable[_Union[LayoutRow, _Mapping]]] = ...) -> None: ...
+    layout_version: int
+    is_snapshot: bool
+    base_version: int
+    changes: _containers.RepeatedCompositeFieldContainer[LayoutCell]
+    layout_cells: bytes
+    occupied_cells: _containers.RepeatedCompositeFieldContainer[LayoutCell]
+    confirmed: WasHit
+    salvo: _containers.RepeatedCompositeFieldContainer[MissileDetails]
+    elected: CommanderStatus
+    def __init__(self, missile: _Optional[_Union[MissileDetails, _Mapping]] = ..., layout: _Optional[_Iterable[_Union[LayoutRow, _Mapping]]] = ..., layout_version: _Optional[int] = ..., is_snapshot: bool = ..., base_version: _Optional[int] = ..., changes: _Optional[_Iterable[_Union[LayoutCell, _Mapping]]] = ..., layout_cells: _Optional[bytes] = ..., occupied_cells: _Optional[_Iterable[_Union[LayoutCell, _Mapping]]] = ..., confirmed: _Optional[_Union[WasHit, _Mapping]] = ..., salvo: _Optional[_Iterable[_Union[MissileDetails, _Mapping]]] = ..., elected: _Optional[_Union[CommanderStatus, _Mapping]] = ...) -> None: ...
+
+class SessionUpdate(_message.Message):
+    __slots__ = ["join", "status", "elect"]
+    JOIN_FIELD_NUMBER: _ClassVar[int]
+    STATUS_FIELD_NUMBER: _ClassVar[int]
+    ELECT_FIELD_NUMBER: _ClassVar[int]
+    join: SoldierFilter
+    status: WasHit
+    elect: NewCommanderDetails
+    def __init__(self, join: _Optional[_Union[SoldierFilter, _Mapping]] = ..., status: _Optional[_Union[WasHit, _Mapping]] = ..., elect: _Optional[_Union[NewCommanderDetails, _Mapping]] = ...) -> None: ...
+
+class SessionEvent(_message.Message):
+    __slots__ = ["missile", "status", "confirmed"]
+    MISSILE_FIELD_NUMBER: _ClassVar[int]
+    STATUS_FIELD_NUMBER: _ClassVar[int]
+    CONFIRMED_FIELD_NUMBER: _ClassVar[int]
+    missile: MissileApproaching
+    status: CommanderStatus
+    confirmed: WasHit
+    def __init__(self, missile: _Optional[_Union[MissileApproaching, _Mapping]] = ..., status: _Optional[_Union[CommanderStatus, _Mapping]] = ..., confirmed: _Optional[_Union[WasHit, _Mapping]] = ...) -> None: ...
+
+class ConnectionRequestBatch(_message.Message):
+    __slots__ = ["soldiers", "more"]
+    SOLDIERS_FIELD_NUMBER: _ClassVar[int]
+    MORE_FIELD_NUMBER: _ClassVar[int]
+    soldiers: _containers.RepeatedCompositeFieldContainer[ConnectionRequest]
+    more: bool
+    def __init__(self, soldiers: _Optional[_Iterable[_Union[ConnectionRequest, _Mapping]]] = ..., more: bool = ...) -> None: ...
+
+class WasHitBatch(_message.Message):
+    __slots__ = ["statuses"]
+    STATUSES_FIELD_NUMBER: _ClassVar[int]
+    statuses: _containers.RepeatedCompositeFieldContainer[WasHit]
+    def __init__(self, statuses: _Optional[_Iterable[_Union[WasHit, _Mapping]]] = ...) -> None: ...
+
+class HostUpdate(_message.Message):
+    __slots__ = ["join", "statuses", "elect"]
+    JOIN_FIELD_NUMBER: _ClassVar[int]
+    STATUSES_FIELD_NUMBER: _ClassVar[int]
+    ELECT_FIELD_NUMBER: _ClassVar[int]
+    join: ConnectionRequestBatch
+    statuses: WasHitBatch
+    elect: NewCommanderDetails
+    def __init__(self, join: _Optional[_Union[ConnectionRequestBatch, _Mapping]] = ..., statuses: _Optional[_Union[WasHitBatch, _Mapping]] = ..., elect: _Optional[_Union[NewCommanderDetails, _Mapping]] = ...) -> None: ...
+
+class HostEvent(_message.Message):
+    __slots__ = ["ready", "missile", "status", "confirmed", "departed", "arrived"]
+    READY_FIELD_NUMBER: _ClassVar[int]
+    MISSILE_FIELD_NUMBER: _ClassVar[int]
+    STATUS_FIELD_NUMBER: _ClassVar[int]
+    CONFIRMED_FIELD_NUMBER: _ClassVar[int]
+    DEPARTED_FIELD_NUMBER: _ClassVar[int]
+    ARRIVED_FIELD_NUMBER: _ClassVar[int]
+    ready: NewCommanderFilter
+    missile: MissileApproaching
+    status: CommanderStatus
+    confirmed: WasHitBatch
+    departed: WasHitBatch
+    arrived: WasHitBatch
+    def __init__(self, ready: _Optional[_Union[NewCommanderFilter, _Mapping]] = ..., missile: _Optional[_Union[MissileApproaching, _Mapping]] = ..., status: _Optional[_Union[CommanderStatus, _Mapping]] = ..., confirmed: _Optional[_Union[WasHitBatch, _Mapping]] = ..., departed: _Optional[_Union[WasHitBatch, _Mapping]] = ..., arrived: _Optional[_Union[WasHitBatch, _Mapping]] = ...) -> None: ...
+
+class Promotion(_message.Message):
+    __slots__ = ["soldier_id", "nth"]
+    SOLDIER_ID_FIELD_NUMBER: _ClassVar[int]
+    NTH_FIELD_NUMBER: _ClassVar[int]
+    soldier_id: int
+    nth: int
+    def __init__(self, soldier_id: _Optional[int] = ..., nth: _Optional[int] = ...) -> None: ...
+
+class RoundRequest(_message.Message):
+    __slots__ = ["index"]
+    INDEX_FIELD_NUMBER: _ClassVar[int]
+    index: int
+    def __init__(self, index: _Optional[int] = ...) -> None: ...
+
+class Claim(_message.Message):
+    __slots__ = ["soldier_id", "position", "target", "speed", "accepted"]
+    SOLDIER_ID_FIELD_NUMBER: _ClassVar[int]
+    POSITION_FIELD_NUMBER: _ClassVar[int]
+    TARGET_FIELD_NUMBER: _ClassVar[int]
+    SPEED_FIELD_NUMBER: _ClassVar[int]
+    ACCEPTED_FIELD_NUMBER: _ClassVar[int]
+    soldier_id: int
+    position: _containers.RepeatedScalarFieldContainer[int]
+    target: _containers.RepeatedScalarFieldContainer[int]
+    speed: int
+    accepted: bool
+    def __init__(self, soldier_id: _Optional[int] = ..., position: _Optional[_Iterable[int]] = ..., target: _Optional[_Iterable[int]] = ..., speed: _Optional[int] = ..., accepted: bool = ...) -> None: ...
+
+class ClaimBatch(_message.Message):
+    __slots__ = ["claims"]
+    CLAIMS_FIELD_NUMBER: _ClassVar[int]
+    claims: _containers.RepeatedCompositeFieldContainer[Claim]
+    def __init__(self, claims: _Optional[_Iterable[_Union[Claim, _Mapping]]] = ...) -> None: ...
+
+class TileStatus(_message.Message):
+    __slots__ = ["no_of_soldiers", "casuality_count", "is_commander_alive", "border_changes"]
+    NO_OF_SOLDIERS_FIELD_NUMBER: _ClassVar[int]
+    CASUALITY_COUNT_FIELD_NUMBER: _ClassVar[int]
+    IS_COMMANDER_ALIVE_FIELD_NUMBER: _ClassVar[int]
+    BORDER_CHANGES_FIELD_NUMBER: _ClassVar[int]
+    no_of_soldiers: int
+    casuality_count: int
+    is_commander_alive: bool
+    border_changes: _containers.RepeatedCompositeFieldContainer[LayoutCell]
+    def __init__(self, no_of_soldiers: _Optional[int] = ..., casuality_count: _Optional[int] = ..., is_commander_alive: bool = ..., border_changes: _Optional[_Iterable[_Union[LayoutCell, _Mapping]]] = ...) -> None: ...
+
+class RoundEnd(_message.Message):
+    __slots__ = ["index", "is_war_over", "halo"]
+    INDEX_FIELD_NUMBER: _ClassVar[int]
+    IS_WAR_OVER_FIELD_NUMBER: _ClassVar[int]
+    HALO_FIELD_NUMBER: _ClassVar[int]
+    index: int
+    is_war_over: bool
+    halo: _containers.RepeatedCompositeFieldContainer[LayoutCell]
+    def __init__(self, index: _Optional[int] = ..., is_war_over: bool = ..., halo: _Optional[_Iterable[_Union[LayoutCell, _Mapping]]] = ...) -> None: ...
@@ -34,6 +34,16 @@ class CommanderStub(object):
                 request_serializer=missiledefence__pb2.NewCommanderDetails.SerializeToString,
                 response_deserializer=missiledefence__pb2.Empty.FromString,
                 )
+        self.war_session = channel.stream_stream(
+                '/missiledefense.Commander/war_session',
+                request_serializer=missiledefence__pb2.SessionUpdate.SerializeToString,
+                response_deserializer=missiledefence__pb2.SessionEvent.FromString,
+                )
+        self.host_session = channel.stream_stream(
+                '/missiledefense.Commander/host_session',
+                request_serializer=missiledefence__pb2.HostUpdate.SerializeToString,
+                response_deserializer=missiledefence__pb2.HostEvent.FromString,
+                )
 
 
 class CommanderServicer(object):
@@ -63,6 +73,18 @@ class CommanderServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def war_session(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def host_session(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_CommanderServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -86,6 +108,16 @@ def add_CommanderServicer_to_server(servicer, server):
                     request_deserializer=missiledefence__pb2.NewCommanderDetails.FromString,
                     response_serializer=missiledefence__pb2.Empty.SerializeToString,
             ),
+            'war_session': grpc.stream_stream_rpc_method_handler(
+                    servicer.war_session,
+                    request_deserializer=missiledefence__pb2.SessionUpdate.FromString,
+                    response_serializer=missiledefence__pb2.SessionEvent.SerializeToString,
+            ),
+            'host_session': grpc.stream_stream_rpc_method_handler(
+                    servicer.host_session,
+                    request_deserializer=missiledefence__pb2.HostUpdate.FromString,
+                    response_serializer=missiledefence__pb2.HostEvent.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'missiledefense.Commander', rpc_method_handlers)
@@ -163,3 +195,302 @@ class Commander(object):
             missiledefence__pb2.Empty.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def war_session(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/missiledefense.Commander/war_session',
+            missiledefence__pb2.SessionUpdate.SerializeToString,
+            missiledefence__pb2.SessionEvent.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def host_session(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/missiledefense.Commander/host_session',
+            missiledefence__pb2.HostUpdate.SerializeToString,
+            missiledefence__pb2.HostEvent.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+
+class TileStub(object):
+    """Sharded commander (see sharding.py): every tile of the war zone is served by its own commander process,
+    the coordinator drives the rounds of all tiles with these calls
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.tile_ready = channel.unary_unary(
+                '/missiledefense.Tile/tile_ready',
+                request_serializer=missiledefence__pb2.Empty.SerializeToString,
+                response_deserializer=missiledefence__pb2.TileStatus.FromString,
+                )
+        self.promote = channel.unary_unary(
+                '/missiledefense.Tile/promote',
+                request_serializer=missiledefence__pb2.Promotion.SerializeToString,
+                response_deserializer=missiledefence__pb2.NewCommanderFilter.FromString,
+                )
+        self.begin_war = channel.unary_unary(
+                '/missiledefense.Tile/begin_war',
+                request_serializer=missiledefence__pb2.RoundEnd.SerializeToString,
+                response_deserializer=missiledefence__pb2.Empty.FromString,
+                )
+        self.play_round = channel.unary_unary(
+                '/missiledefense.Tile/play_round',
+                request_serializer=missiledefence__pb2.RoundRequest.SerializeToString,
+                response_deserializer=missiledefence__pb2.ClaimBatch.FromString,
+                )
+        self.claim_cells = channel.unary_unary(
+                '/missiledefense.Tile/claim_cells',
+                request_serializer=missiledefence__pb2.ClaimBatch.SerializeToString,
+                response_deserializer=missiledefence__pb2.ClaimBatch.FromString,
+                )
+        self.settle = channel.unary_unary(
+                '/missiledefense.Tile/settle',
+                request_serializer=missiledefence__pb2.ClaimBatch.SerializeToString,
+                response_deserializer=missiledefence__pb2.TileStatus.FromString,
+                )
+        self.end_round = channel.unary_unary(
+                '/missiledefense.Tile/end_round',
+                request_serializer=missiledefence__pb2.RoundEnd.SerializeToString,
+                response_deserializer=missiledefence__pb2.Empty.FromString,
+                )
+
+
+class TileServicer(object):
+    """Sharded commander (see sharding.py): every tile of the war zone is served by its own commander process,
+    the coordinator drives the rounds of all tiles with these calls
+    """
+
+    def tile_ready(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def promote(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def begin_war(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def play_round(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def claim_cells(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def settle(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def end_round(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_TileServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'tile_ready': grpc.unary_unary_rpc_method_handler(
+                    servicer.tile_ready,
+                    request_deserializer=missiledefence__pb2.Empty.FromString,
+                    response_serializer=missiledefence__pb2.TileStatus.SerializeToString,
+            ),
+            'promote': grpc.unary_unary_rpc_method_handler(
+                    servicer.promote,
+                    request_deserializer=missiledefence__pb2.Promotion.FromString,
+                    response_serializer=missiledefence__pb2.NewCommanderFilter.SerializeToString,
+            ),
+            'begin_war': grpc.unary_unary_rpc_method_handler(
+                    servicer.begin_war,
+                    request_deserializer=missiledefence__pb2.RoundEnd.FromString,
+                    response_serializer=missiledefence__pb2.Empty.SerializeToString,
+            ),
+            'play_round': grpc.unary_unary_rpc_method_handler(
+                    servicer.play_round,
+                    request_deserializer=missiledefence__pb2.RoundRequest.FromString,
+                    response_serializer=missiledefence__pb2.ClaimBatch.SerializeToString,
+            ),
+            'claim_cells': grpc.unary_unary_rpc_method_handler(
+                    servicer.claim_cells,
+                    request_deserializer=missiledefence__pb2.ClaimBatch.FromString,
+                    response_serializer=missiledefence__pb2.ClaimBatch.SerializeToString,
+            ),
+            'settle': grpc.unary_unary_rpc_method_handler(
+                    servicer.settle,
+                    request_deserializer=missiledefence__pb2.ClaimBatch.FromString,
+                    response_serializer=missiledefence__pb2.TileStatus.SerializeToString,
+            ),
+            'end_round': grpc.unary_unary_rpc_method_handler(
+                    servicer.end_round,
+                    request_deserializer=missiledefence__pb2.RoundEnd.FromString,
+                    response_serializer=missiledefence__pb2.Empty.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'missiledefense.Tile', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+ # This class is part of an EXPERIMENTAL API.
+class Tile(object):
+    """Sharded commander (see sharding.py): every tile of the war zone is served by its own commander process,
+    the coordinator drives the rounds of all tiles with these calls
+    """
+
+    @staticmethod
+    def tile_ready(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/missiledefense.Tile/tile_ready',
+            missiledefence__pb2.Empty.SerializeToString,
+            missiledefence__pb2.TileStatus.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def promote(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/missiledefense.Tile/promote',
+            missiledefence__pb2.Promotion.SerializeToString,
+            missiledefence__pb2.NewCommanderFilter.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def begin_war(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/missiledefense.Tile/begin_war',
+            missiledefence__pb2.RoundEnd.SerializeToString,
+            missiledefence__pb2.Empty.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def play_round(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/missiledefense.Tile/play_round',
+            missiledefence__pb2.RoundRequest.SerializeToString,
+            missiledefence__pb2.ClaimBatch.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def claim_cells(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/missiledefense.Tile/claim_cells',
+            missiledefence__pb2.ClaimBatch.SerializeToString,
+            missiledefence__pb2.ClaimBatch.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def settle(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/missiledefense.Tile/settle',
+            missiledefence__pb2.ClaimBatch.SerializeToString,
+            missiledefence__pb2.TileStatus.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def end_round(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/missiledefense.Tile/end_round',
+            missiledefence__pb2.RoundEnd.SerializeToString,
+            missiledefence__pb2.Empty.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
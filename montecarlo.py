@@ -0,0 +1,132 @@
+"""Monte Carlo war runner: many seeded random wars on all cores, see engine.py.
+
+War k of a run is fully determined by its seed (--seed + k): the soldier positions and speeds are drawn
+from it, and so are the missiles unless one missile sequence is given for all wars with --sequence.
+Per-war results are streamed as JSON lines while the wars finish, followed by the aggregated
+win rate, casualty distribution and election counts.
+
+    python montecarlo.py --wars 10000 --size 10 --soldiers 8 --max-speed 4 --sequence "M1:3,3 M2:6,6 M3:1,6 M4:6,1"
+    python montecarlo.py --wars 10000 --size 10 --soldiers 40 --planner   # soldiers evacuate together, see evacuation.py
+    python montecarlo.py --wars 10000 --size 10 --soldiers 8 --ranked-election   # the fastest soldier takes over a dead commander
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+import argparse
+import functools
+import json
+import os
+import random
+import sys
+import engine
+from soldier import missile_details
+
+
+# Random positions and speeds (and missiles, unless `missiles` is given) of a war, drawn from `rng`
+def random_scenario(rng, size, no_of_soldiers, max_speed, no_of_missiles, missiles=None):
+    cells = rng.sample(range(size * size), no_of_soldiers)
+    positions = [[cell // size + 1, cell % size + 1] for cell in cells]
+    speeds = [rng.randint(0, max_speed) for x in range(no_of_soldiers)]
+    if missiles is None:
+        missile_types = list(missile_details)
+        missiles = [
+            {"position": [rng.randint(1, size), rng.randint(1, size)], "time": i, "type": rng.choice(missile_types)}
+            for i in range(no_of_missiles)
+        ]
+    return engine.Scenario(size, positions, speeds, missiles)
+
+
+# Runs in the worker processes, so it only returns what the report needs (not the layout)
+def run_seeded_war(seed, size, no_of_soldiers, max_speed, no_of_missiles, missiles, planner=False, ranked_election=False):
+    rng = random.Random(seed)
+    scenario = random_scenario(rng, size, no_of_soldiers, max_speed, no_of_missiles, missiles)
+    result = engine.run_war(scenario, rng.getrandbits(64), planner, ranked_election)
+    return {
+        "seed": seed,
+        "outcome": result.outcome,
+        "casualties": result.casualties,
+        "elections": result.elections,
+        "rounds": result.rounds,
+        "positions": scenario.positions,
+        "speeds": scenario.speeds,
+    }
+
+
+class Summary():
+
+    def __init__(self):
+        self.no_of_wars = 0
+        self.no_of_wins = 0
+        self.casualties = Counter()
+        self.elections = Counter()
+
+    def add(self, war):
+        self.no_of_wars += 1
+        self.no_of_wins += war["outcome"] == "won"
+        self.casualties[war["casualties"]] += 1
+        self.elections[war["elections"]] += 1
+
+    def report(self, out):
+        if self.no_of_wars == 0:
+            print("No wars were run", file=out)
+            return
+        print(f"Wars: {self.no_of_wars}   won: {self.no_of_wins}   win rate: {self.no_of_wins / self.no_of_wars * 100:.2f}%", file=out)
+        for name, counts in [("Casualties", self.casualties), ("Elections", self.elections)]:
+            mean = sum(value * count for value, count in counts.items()) / self.no_of_wars
+            print(f"{name} (mean {mean:.2f}):", file=out)
+            for value in sorted(counts):
+                share = counts[value] / self.no_of_wars
+                print(f"  {value:>4}: {counts[value]:>8}  {share * 100:6.2f}%  {'#' * round(share * 50)}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many seeded random wars in parallel and report their statistics.")
+    parser.add_argument("--wars", type=int, default=1000, help="number of wars to run")
+    parser.add_argument("--size", type=int, default=10, help="N, where NxN is the size of the war zone")
+    parser.add_argument("--soldiers", type=int, default=10, help="M, the number of soldiers (including the commander)")
+    parser.add_argument("--max-speed", type=int, default=4, help="speeds are drawn uniformly from 0..max-speed")
+    parser.add_argument("--missiles", type=int, default=10, help="number of random missiles per war, when no --sequence is given")
+    parser.add_argument("--sequence", help='the same missile sequence for every war, e.g. "M1:3,3 M2:6,6"')
+    parser.add_argument("--seed", type=int, default=0, help="war k is run with the seed SEED+k")
+    parser.add_argument("--planner", action="store_true", help="soldiers evacuate together as planned by evacuation.py")
+    parser.add_argument("--ranked-election", action="store_true", help="the fastest alive soldier replaces a dead commander")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--results", default="-", help="file to stream per-war results to as JSON lines, - for stdout")
+    args = parser.parse_args()
+
+    if args.soldiers > args.size * args.size:
+        parser.error("there are more soldiers than cells in the war zone")
+    missiles = engine.parse_missile_sequence(args.sequence) if args.sequence else None
+
+    run = functools.partial(
+        run_seeded_war,
+        size=args.size,
+        no_of_soldiers=args.soldiers,
+        max_speed=args.max_speed,
+        no_of_missiles=args.missiles,
+        missiles=missiles,
+        planner=args.planner,
+        ranked_election=args.ranked_election,
+    )
+    seeds = range(args.seed, args.seed + args.wars)
+    # Enough chunks per worker to balance the load, few enough to keep the inter-process overhead low
+    chunksize = max(1, args.wars // (args.workers * 16))
+
+    results = sys.stdout if args.results == "-" else open(args.results, "w")
+    # Keep stdout parseable when the results are streamed to it
+    report_out = sys.stderr if args.results == "-" else sys.stdout
+    summary = Summary()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for war in executor.map(run, seeds, chunksize=chunksize):
+                results.write(json.dumps(war) + "\n")
+                summary.add(war)
+    finally:
+        if results is not sys.stdout:
+            results.close()
+
+    summary.report(report_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Salvo rounds: several missiles landing at the same time, and the union of their red zones.
+
+A salvo is entered as missiles joined with "+", e.g. "M1:3,3+M4:8,8 M2:5,5" is a salvo of two missiles
+followed by a single missile. In missile_launches (and engine scenarios) the first missile of a salvo is the
+launch itself and the others are listed in its "salvo" key; on the wire they are MissileApproaching.missile
+and MissileApproaching.salvo.
+
+RedZones keeps an integral image (2D prefix sums) of the red cells of all missiles of the round, so whether a
+cell is in a red zone and how many red cells a rectangle (e.g. a straight escape path) has are O(1) queries,
+however many missiles the salvo has. Escape movements follow the rules of take_shelter: along each of the 8
+movements the number of moves is the distance to the first cell outside the red zones. Along a row or col it is
+found by bisecting on whether the path so far is all red, O(log speed) rectangle queries; the cells of a diagonal
+are not a rectangle, so they are looked up together.
+"""
+
+import numpy as np
+import escape
+
+
+# All missiles of a launch (the launch itself first), each {"position": [row, col], "type": ...}
+def round_missiles(launch):
+    return [launch] + list(launch.get("salvo", []))
+
+
+# Salvo (or single missile) of a launch in the format type:row,col+type:row,col
+def format_salvo(launch):
+    return "+".join(f"{missile['type']}:{missile['position'][0]},{missile['position'][1]}" for missile in round_missiles(launch))
+
+
+class RedZones():
+
+    '''
+    zones are the ([row, col], radius) of the missiles of a round.
+    Only the bounding box of the red zones is stored. Like in take_shelter, the parts of a red zone outside the
+    war zone count as well, so the number of moves along a movement is the same as for a single missile.
+    '''
+    def __init__(self, zones):
+        self.zones = [(list(position), radius) for position, radius in zones]
+        rows = np.array([position[0] for position, radius in self.zones], dtype=np.int64)
+        cols = np.array([position[1] for position, radius in self.zones], dtype=np.int64)
+        rads = np.array([radius - 1 for position, radius in self.zones], dtype=np.int64)
+
+        # Red zones as 0-indexed inclusive [row_start, row_end] x [col_start, col_end]
+        row_starts = rows - rads - 1
+        row_ends = rows + rads - 1
+        col_starts = cols - rads - 1
+        col_ends = cols + rads - 1
+        self.row_start = int(row_starts.min())
+        self.col_start = int(col_starts.min())
+        height = int(row_ends.max()) - self.row_start + 1
+        width = int(col_ends.max()) - self.col_start + 1
+
+        # Number of missiles covering each cell: +1/-1 at the corners of every zone, then summed along both axes
+        corners = np.zeros((height + 1, width + 1), dtype=np.int32)
+        np.add.at(corners, (row_starts - self.row_start, col_starts - self.col_start), 1)
+        np.add.at(corners, (row_starts - self.row_start, col_ends - self.col_start + 1), -1)
+        np.add.at(corners, (row_ends - self.row_start + 1, col_starts - self.col_start), -1)
+        np.add.at(corners, (row_ends - self.row_start + 1, col_ends - self.col_start + 1), 1)
+        coverage = corners.cumsum(axis=0).cumsum(axis=1)[:height, :width]
+
+        # Integral image of the red cells, with a row and col of zeros in front
+        self.integral = np.zeros((height + 1, width + 1), dtype=np.int64)
+        self.integral[1:, 1:] = (coverage > 0).cumsum(axis=0).cumsum(axis=1)
+        self.height = height
+        self.width = width
+
+    # Red zones of the missiles of a launch, `missile_details` giving the radius of each missile type
+    @classmethod
+    def of(cls, missiles, missile_details):
+        return cls([(missile["position"], missile_details[missile["type"]]["radius"]) for missile in missiles])
+
+    '''
+    Number of red cells in the rectangle of 1-indexed rows row_start..row_end and cols col_start..col_end (inclusive).
+    Works on arrays of rectangles as well.
+    '''
+    def red_cells(self, row_start, row_end, col_start, col_end):
+        # Clip to the bounding box, an empty rectangle counts zero
+        top = np.clip(np.asarray(row_start) - 1 - self.row_start, 0, self.height)
+        bottom = np.clip(np.asarray(row_end) - self.row_start, 0, self.height)
+        left = np.clip(np.asarray(col_start) - 1 - self.col_start, 0, self.width)
+        right = np.clip(np.asarray(col_end) - self.col_start, 0, self.width)
+        bottom = np.maximum(bottom, top)
+        right = np.maximum(right, left)
+        return (
+            self.integral[bottom, right] - self.integral[top, right]
+            - self.integral[bottom, left] + self.integral[top, left]
+        )
+
+    # Whether the cell [row, col] is in any red zone (arrays of rows and cols give an array)
+    def is_red(self, row, col):
+        return self.red_cells(row, row, col, col) > 0
+
+    # Whether every cell of the straight path between two cells on the same row or col is red
+    def is_all_red(self, start, end):
+        cells = abs(end[0] - start[0]) + abs(end[1] - start[1]) + 1
+        return self.red_cells(min(start[0], end[0]), max(start[0], end[0]), min(start[1], end[1]), max(start[1], end[1])) == cells
+
+    # Number of moves along a row or col (unit step) to the first cell outside the red zones, None if more than `speed`
+    def straight_distance(self, position, step, speed):
+        # The path of the first `low` moves is all red, the path of `high` moves is not
+        low, high = 0, speed + 1
+        while high - low > 1:
+            moves = (low + high) // 2
+            end = (position[0] + step[0] * moves, position[1] + step[1] * moves)
+            if self.is_all_red((position[0] + step[0], position[1] + step[1]), end):
+                low = moves
+            else:
+                high = moves
+        return high if high <= speed else None
+
+    # Number of moves along a diagonal to the first cell outside the red zones, None if more than `speed`
+    def diagonal_distance(self, position, step, speed):
+        moves = np.arange(1, speed + 1)
+        is_red = self.is_red(position[0] + step[0] * moves, position[1] + step[1] * moves)
+        outside = np.flatnonzero(~is_red)
+        return int(moves[outside[0]]) if len(outside) > 0 else None
+
+    '''
+    Movements out of the red zones for a soldier at `position` which can make at most `speed` moves,
+    in the same form as escape.escape_movements: groups of equally long (row_move, col_move) displacements, shortest first.
+    '''
+    def escape_movements(self, position, speed):
+        if not self.is_red(position[0], position[1]):
+            return ()
+        distances = {}
+        for movement, (row_step, col_step) in escape.movement_steps.items():
+            if row_step == 0 or col_step == 0:
+                moves = self.straight_distance(position, (row_step, col_step), speed)
+            else:
+                moves = self.diagonal_distance(position, (row_step, col_step), speed)
+            if moves is not None:
+                distances[movement] = moves
+
+        groups = []
+        for moves in sorted(set(distances.values())):
+            groups.append(tuple(
+                (row_step * moves, col_step * moves)
+                for movement, (row_step, col_step) in escape.movement_steps.items()
+                if distances.get(movement) == moves
+            ))
+        return tuple(groups)
@@ -0,0 +1,225 @@
+"""Scenario files: a complete war (N, soldier positions and speeds, T, t and the missile sequence) in one file,
+so commander.py, commander_aio.py and soldier.py can start without input prompts, and a generator for large wars.
+
+Two formats, chosen by the file extension:
+
+- .json, readable and easy to write by hand:
+      {"N": 6, "T": 4, "t": 1, "missiles": "M1:3,3 M1:6,6 M1:1,6 M1:6,1",
+       "positions": [[1, 1], [5, 5], [3, 3], [2, 2]], "speeds": [4, 4, 0, 4]}
+- anything else, a compact little-endian binary form: a header, the missiles, then the soldiers as fixed size
+  (row, col, speed) records, which are written and read in chunks (iter_soldier_chunks): soldier.py reads them
+  a chunk at a time, and a soldier host joins its soldiers in batches of chunk_size
+
+    python commander.py war.bin
+    python soldier.py war.bin
+    python scenarios.py war.bin --size 1000 --soldiers 10000 --missiles 10   # generate a random war
+"""
+
+import argparse
+import json
+import struct
+import numpy as np
+import engine
+import salvo
+import soldier
+
+binary_magic = b"MDSW"
+binary_version = 2
+# magic, version, N, M, T, t, number of missiles
+binary_header = struct.Struct("<4sHIIddI")
+# From version 2 on, followed by the first commander (0 if it is chosen randomly)
+binary_first_commander = struct.Struct("<I")
+# Missile types are stored as their index in missile_details
+binary_missile_dtype = np.dtype([("type", "u1"), ("row", "<u4"), ("col", "<u4")])
+binary_soldier_dtype = np.dtype([("row", "<u4"), ("col", "<u4"), ("speed", "<u4")])
+
+# Number of soldiers written or read at a time
+chunk_size = 65536
+
+
+# Seconds as an int if whole (so whole seconds are printed as such), otherwise as a float
+def whole_seconds(seconds):
+    return int(seconds) if float(seconds).is_integer() else seconds
+
+
+def is_json(path):
+    return path.lower().endswith(".json")
+
+
+# Missiles (and salvos) launched every t seconds, as in take_missile_seq_input of commander.py.
+# Times are rounded, so t=0.3 gives 0.9 and not 0.8999999999999999.
+def missile_launches(missiles, t):
+    return [dict(missile, time=whole_seconds(round(t*i, 9))) for i, missile in enumerate(missiles)]
+
+
+def check_missile_count(T, t, no_of_missiles):
+    if t <= 0 or abs(round(T/t) * t - T) > 1e-9 * T:
+        raise ValueError(f"T={T} is not a multiple of t={t}")
+    if round(T/t) != no_of_missiles:
+        raise ValueError(f"T/t={round(T/t)} missiles expected but {no_of_missiles} given")
+
+
+def load(path):
+    if is_json(path):
+        return load_json(path)
+    return load_binary(path)
+
+
+def save(scenario, path):
+    if is_json(path):
+        save_json(scenario, path)
+    else:
+        save_binary(scenario, path)
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    missiles = missile_launches(engine.parse_missile_sequence(data["missiles"]), data["t"])
+    check_missile_count(data["T"], data["t"], len(missiles))
+    return engine.Scenario(data["N"], data["positions"], data["speeds"], missiles, data.get("first_commander"), data["t"])
+
+
+def save_json(scenario, path):
+    data = {
+        "N": scenario.size,
+        "T": whole_seconds(round(scenario.T, 9)),
+        "t": scenario.t,
+        "missiles": " ".join(salvo.format_salvo(missile) for missile in scenario.missiles),
+        "positions": [list(position) for position in scenario.positions],
+        "speeds": list(scenario.speeds),
+    }
+    if scenario.first_commander is not None:
+        data["first_commander"] = scenario.first_commander
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def read_binary_header(f):
+    magic, version, size, no_of_soldiers, T, t, no_of_missiles = binary_header.unpack(f.read(binary_header.size))
+    if magic != binary_magic or not 1 <= version <= binary_version:
+        raise ValueError(f"Not a version 1 to {binary_version} scenario file")
+    first_commander = None
+    if version >= 2:
+        first_commander = binary_first_commander.unpack(f.read(binary_first_commander.size))[0] or None
+    check_missile_count(T, t, no_of_missiles)
+    t = whole_seconds(t)
+    missile_types = list(soldier.missile_details)
+    records = np.fromfile(f, dtype=binary_missile_dtype, count=no_of_missiles)
+    if len(records) != no_of_missiles:
+        raise ValueError("Scenario file is truncated")
+    missiles = [{"position": [row, col], "type": missile_types[missile_type]} for missile_type, row, col in records.tolist()]
+    return size, no_of_soldiers, t, missiles, first_commander
+
+
+# N, M, t, the missiles and the first commander of a binary scenario file, without its soldiers
+def load_binary_header(path):
+    with open(path, "rb") as f:
+        return read_binary_header(f)
+
+
+# Soldiers of a binary scenario file as arrays of (row, col, speed) records, at most `size` at a time
+def iter_soldier_chunks(path, size=chunk_size):
+    with open(path, "rb") as f:
+        no_of_soldiers = read_binary_header(f)[1]
+        for start in range(0, no_of_soldiers, size):
+            chunk = np.fromfile(f, dtype=binary_soldier_dtype, count=min(size, no_of_soldiers - start))
+            if len(chunk) == 0:
+                raise ValueError("Scenario file is truncated")
+            yield chunk
+
+
+def load_binary(path):
+    with open(path, "rb") as f:
+        size, no_of_soldiers, t, missiles, first_commander = read_binary_header(f)
+        soldiers = np.fromfile(f, dtype=binary_soldier_dtype, count=no_of_soldiers)
+    if len(soldiers) != no_of_soldiers:
+        raise ValueError("Scenario file is truncated")
+    positions = np.stack([soldiers["row"], soldiers["col"]], axis=1).astype(np.int64).tolist()
+    return engine.Scenario(size, positions, soldiers["speed"].tolist(), missile_launches(missiles, t), first_commander, t)
+
+
+def save_binary(scenario, path):
+    if any("salvo" in missile for missile in scenario.missiles):
+        raise ValueError("Salvos can only be saved in .json scenario files")
+    save_binary_chunks(
+        path,
+        scenario.size,
+        scenario.T,
+        scenario.t,
+        scenario.missiles,
+        scenario.no_of_soldiers,
+        (
+            (scenario.positions[start:start + chunk_size], scenario.speeds[start:start + chunk_size])
+            for start in range(0, scenario.no_of_soldiers, chunk_size)
+        ),
+        scenario.first_commander,
+    )
+
+
+# Write a binary scenario file from chunks of (positions, speeds), without holding all soldiers in memory
+def save_binary_chunks(path, size, T, t, missiles, no_of_soldiers, soldier_chunks, first_commander=None):
+    missile_types = list(soldier.missile_details)
+    records = np.array(
+        [(missile_types.index(missile["type"]), missile["position"][0], missile["position"][1]) for missile in missiles],
+        dtype=binary_missile_dtype,
+    )
+    written = 0
+    with open(path, "wb") as f:
+        f.write(binary_header.pack(binary_magic, binary_version, size, no_of_soldiers, T, t, len(missiles)))
+        f.write(binary_first_commander.pack(first_commander or 0))
+        records.tofile(f)
+        for positions, speeds in soldier_chunks:
+            positions = np.asarray(positions).reshape(-1, 2)
+            chunk = np.empty(len(positions), dtype=binary_soldier_dtype)
+            chunk["row"] = positions[:, 0]
+            chunk["col"] = positions[:, 1]
+            chunk["speed"] = speeds
+            chunk.tofile(f)
+            written += len(chunk)
+    if written != no_of_soldiers:
+        raise ValueError(f"{no_of_soldiers} soldiers announced but {written} written")
+
+
+'''
+Random war of `no_of_soldiers` soldiers on distinct cells of an NxN war zone, speeds uniform in 0..max_speed
+and `no_of_missiles` missiles of random types and positions, one every t seconds.
+'''
+def generate(size, no_of_soldiers, no_of_missiles, max_speed=4, t=1, seed=None):
+    if no_of_soldiers > size * size:
+        raise ValueError("There are more soldiers than cells in the war zone")
+    rng = np.random.default_rng(seed)
+    cells = rng.choice(size * size, no_of_soldiers, replace=False)
+    positions = np.stack([cells // size + 1, cells % size + 1], axis=1).tolist()
+    speeds = rng.integers(0, max_speed, no_of_soldiers, endpoint=True).tolist()
+
+    missile_types = list(soldier.missile_details)
+    missiles = [
+        {"position": [int(row), int(col)], "type": missile_types[missile_type]}
+        for missile_type, row, col in zip(
+            rng.integers(0, len(missile_types), no_of_missiles),
+            rng.integers(1, size, no_of_missiles, endpoint=True),
+            rng.integers(1, size, no_of_missiles, endpoint=True),
+        )
+    ]
+    return engine.Scenario(size, positions, speeds, missile_launches(missiles, t), t=t)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a random war scenario file (.json, or binary for any other extension).")
+    parser.add_argument("path", help="scenario file to write")
+    parser.add_argument("--size", type=int, default=100, help="N, where NxN is the size of the war zone")
+    parser.add_argument("--soldiers", type=int, default=1000, help="M, the number of soldiers")
+    parser.add_argument("--missiles", type=int, default=10, help="number of missiles, T is missiles * t")
+    parser.add_argument("--t", type=float, default=1, help="seconds between missiles")
+    parser.add_argument("--max-speed", type=int, default=4, help="speeds are drawn uniformly from 0..max-speed")
+    parser.add_argument("--seed", type=int, help="seed of the random war")
+    args = parser.parse_args()
+
+    scenario = generate(args.size, args.soldiers, args.missiles, args.max_speed, whole_seconds(args.t), args.seed)
+    save(scenario, args.path)
+    print(f"Wrote {args.path}: N={scenario.size}, M={scenario.no_of_soldiers}, T={scenario.T}, t={scenario.t}")
+
+
+if __name__ == "__main__":
+    main()
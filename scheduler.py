@@ -0,0 +1,87 @@
+"""Central missile scheduler: one timeline of missile launches and one clock for all the streams of the commander.
+
+Instead of every stream sleeping t seconds after its own round (which drifts a little more every round),
+all streams wait for the same launch times on a shared clock, counted from the first launch.
+The clock is virtual: with a time_scale of 60 a minute of war time passes every real second,
+so a T=3600 war replays in a minute during load tests. Launch times can be fractions of a second.
+"""
+
+from threading import Lock
+import asyncio
+import heapq
+import time
+
+
+class VirtualClock():
+
+    def __init__(self, time_scale=1.0):
+        if time_scale <= 0:
+            raise ValueError("time_scale has to be positive")
+        # Virtual seconds per real second
+        self.time_scale = time_scale
+        self.start_time = None
+        self.lock = Lock()
+
+    # Start counting from now, at the virtual time `at`, only the first call has an effect
+    def start(self, at=0.0):
+        with self.lock:
+            if self.start_time is None:
+                self.start_time = time.monotonic() - at / self.time_scale
+
+    # Virtual seconds since the clock was started
+    def now(self):
+        return (time.monotonic() - self.start_time) * self.time_scale
+
+    # Real seconds left until the virtual time `virtual_time`
+    def real_delay(self, virtual_time):
+        return max(0.0, (virtual_time - self.now()) / self.time_scale)
+
+
+class MissileScheduler():
+
+    def __init__(self, missiles, time_scale=1.0):
+        self.missiles = missiles
+        self.clock = VirtualClock(time_scale)
+        # Missiles which have not been launched yet, as (launch time, index in missiles), missiles with
+        # the same launch time keep their input order
+        self.timeline = [(missile["time"], i) for i, missile in enumerate(missiles)]
+        heapq.heapify(self.timeline)
+        # (launch time, index in missiles) in launch order, taken off the timeline as the first stream gets to them
+        self.launches = []
+        self.lock = Lock()
+        # Virtual time at which the clock starts, later than 0 when a war is resumed
+        self.start_at = 0.0
+
+    def __len__(self):
+        return len(self.missiles)
+
+    # The k-th launch of the war as (launch time, index in missiles)
+    def launch(self, k):
+        with self.lock:
+            while len(self.launches) <= k:
+                self.launches.append(heapq.heappop(self.timeline))
+            return self.launches[k]
+
+    # Index of the launch of missile i in the war, its missile has to be launched already
+    def launch_number(self, i):
+        with self.lock:
+            return next(k for k, (launch_time, j) in enumerate(self.launches) if j == i)
+
+    # Continue a war whose first k launches are over (see checkpoint.py): the clock starts so that the k-th launch
+    # is as far away as the first one was at the start of the war
+    def resume(self, k):
+        if k < len(self):
+            self.start_at = self.launch(k)[0] - self.launch(0)[0]
+
+    # Wait until the k-th launch is due, returns the index of its missile
+    def wait_for_launch(self, k):
+        self.clock.start(self.start_at)
+        launch_time, i = self.launch(k)
+        time.sleep(self.clock.real_delay(launch_time))
+        return i
+
+    async def async_wait_for_launch(self, k):
+        self.clock.start(self.start_at)
+        launch_time, i = self.launch(k)
+        await asyncio.sleep(self.clock.real_delay(launch_time))
+        return i
@@ -0,0 +1,494 @@
+"""Sharded commander: the war zone is split into tiles (see tiling.py), each served by its own commander process.
+
+A single commander process serves every soldier stream and owns the whole layout, so one Python interpreter
+bounds the throughput of a war. In sharded mode every tile is a TileCommander process on its own port, which
+owns the cells of its tile and serves the soldiers standing on them (one soldier host per tile, see SoldierHost).
+A coordinator drives the rounds of all tiles on one missile timeline:
+
+1. play_round: every tile takes the missile, its soldiers report, and the moves inside the tile are resolved as
+   on a single commander. Moves into another tile are returned as claims.
+2. claim_cells: the tile owning the target cell of a claim takes it if the cell is still empty (compare-and-set),
+   the soldier moves into that tile and its host is told before the next missile.
+3. settle: soldiers whose claim was accepted leave their old tile, the others stay (dead if inside a red zone).
+   Every tile reports its soldiers, casualties, and the changed cells near its edges.
+4. end_round: the coordinator merges the casualties, decides the outcome of the war and elects a new commander
+   if needed, and forwards the changed edge cells to the neighbouring tiles (halo exchange).
+
+The commander is the soldier promoted by the coordinator, played by the tile it stands on. It takes shelter only
+within its tile. Only soldier hosts (host_session) can join a sharded commander.
+
+    python sharding.py war.json    # coordinator, starts one process per tile
+    python soldier.py war.json     # with use_sharded_commander = True in soldier.py
+"""
+
+from concurrent import futures
+from datetime import datetime as dt
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import time
+import grpc
+import google.protobuf.empty_pb2
+import missiledefence_pb2
+import missiledefence_pb2_grpc
+import commander
+import logqueue
+import metrics
+import salvo
+import scenarios
+import warzone
+from commander import Commander, logger
+from scheduler import MissileScheduler
+from tiling import Tiling
+
+# Seconds the tiles keep serving after the war is over, so the last confirmations reach the soldier hosts
+tile_shutdown_grace = 5
+
+
+'''
+Commander of one tile. The rounds are started and finished by the coordinator, so the streams of the tile wait for
+those calls instead of for the missile timeline and the first stream of a round.
+'''
+class TileCommander(Commander, missiledefence_pb2_grpc.TileServicer):
+
+    def __init__(self, tiling, tile, no_of_soldiers):
+        super().__init__()
+        self.tiling = tiling
+        self.tile = tile
+        self.war_zone_size = tiling.size
+        self.no_of_soldiers = no_of_soldiers
+        self.layout = warzone.new_layout(tiling.size, commander.layout_dtype)
+        # The coordinator elects the commanders, a tile never starts an election itself (see apply_status)
+        self.commander_dead_sent = True
+        self.speeds = {}
+        # Tiles would interleave their rounds in one journal file, so only a single commander keeps a journal
+        self.journal = None
+
+        # Indices of the missiles played by the tile, in order
+        self.played_rounds = []
+        self.has_joined = False
+        self.has_war_started = False
+        # Hand-overs which the host of the tile is told before the next missile (soldier id -> WasHit)
+        self.arrivals = {}
+        self.departures = {}
+        self.promoted = []
+        # Moves of the round into cells of other tiles as (soldier id, target), claimed by the coordinator
+        self.outbound = []
+        # Cells near the edges of the tile changed since the last report to the coordinator
+        self.border_changes = []
+
+    # Soldiers of the tile join, the first commander is chosen by the coordinator
+    def soldier_ready(self, request, context):
+        with self.roster_lock:
+            self.soldier_details[request.soldier_id] = {
+                "position": list(request.position),
+                "is_alive": True
+            }
+            self.speeds[request.soldier_id] = request.speed
+            self.track_soldier(request.soldier_id, 0)
+            self.set_cell(request.position[0], request.position[1], request.soldier_id)
+        return missiledefence_pb2.NewCommanderFilter(soldier_id=-1)
+
+    # Caller holds layout_log_lock
+    def write_cells(self, cells):
+        super().write_cells(cells)
+        self.border_changes.extend(
+            missiledefence_pb2.LayoutCell(row=pos_x, col=pos_y, soldier_id=soldier_id)
+            for pos_x, pos_y, soldier_id in cells if self.tiling.in_border(self.tile, [pos_x, pos_y])
+        )
+
+    # Cells of the neighbouring tiles, changed in the last round
+    def apply_halo(self, cells):
+        self.set_cells([(cell.row, cell.col, cell.soldier_id) for cell in cells if not self.tiling.owns(self.tile, [cell.row, cell.col])])
+
+    def tile_status(self):
+        with self.roster_lock:
+            status = missiledefence_pb2.TileStatus(
+                no_of_soldiers=len(self.soldier_details),
+                casuality_count=self.casuality_count,
+                is_commander_alive=self.sid != -1 and self.is_alive,
+            )
+        with self.layout_log_lock:
+            status.border_changes.extend(self.border_changes)
+            self.border_changes = []
+        return status
+
+    def wait_for_commander(self):
+        with self.round_condition:
+            self.round_condition.wait_for(lambda: self.has_war_started)
+        self.print_initial_layout()
+
+    # Wait until the coordinator has started the k-th round of the tile, returns its missile (None once the war is over)
+    def wait_for_launch(self, k):
+        with self.round_condition:
+            self.round_condition.wait_for(lambda: len(self.played_rounds) > k or self.is_war_over)
+            return self.played_rounds[k] if len(self.played_rounds) > k else None
+
+    # Wait until the coordinator has finished round i, returns True once the war is over
+    def finish_round(self, i):
+        with self.round_condition:
+            self.round_condition.wait_for(lambda: i in self.finished_missiles)
+        return self.is_war_over
+
+    # Only the tile which has the commander takes shelter for it
+    def take_shelter(self, missile_position, time, missile_type, red_zones=None):
+        if self.sid == -1 or not self.is_alive:
+            return
+        super().take_shelter(missile_position, time, missile_type, red_zones)
+
+    # The commander stays in its tile, cells of other tiles count as taken
+    def move_by(self, row_move, col_move):
+        if not self.tiling.owns(self.tile, [self.position[0] + row_move, self.position[1] + col_move]):
+            return False
+        return super().move_by(row_move, col_move)
+
+    # Moves inside the tile are resolved as on a single commander, moves into other tiles are kept for the coordinator
+    def resolve_moves(self, missile):
+        local = []
+        self.outbound = []
+        for soldier_id, target in self.pending_moves():
+            if self.in_war_zone(target) and not self.tiling.owns(self.tile, target):
+                self.outbound.append((soldier_id, target))
+            else:
+                local.append((soldier_id, target))
+        self.reject_moves(self.claim_moves(local), missile)
+
+    def host_session(self, request_iterator, context):
+        host_soldiers = set()
+        more = True
+        while more:
+            join = next(request_iterator).join
+            more = join.more
+            for connection_request in join.soldiers:
+                self.soldier_ready(connection_request, context)
+                host_soldiers.add(connection_request.soldier_id)
+        with self.round_condition:
+            self.has_joined = True
+            self.wake_streams()
+        yield missiledefence_pb2.HostEvent(ready=missiledefence_pb2.NewCommanderFilter(soldier_id=-1))
+
+        self.wait_for_commander()
+
+        sent_version = -1
+        rounds_sent = 0
+        while True:
+            i = self.wait_for_launch(rounds_sent)
+            if i is None:
+                return
+
+            # Soldiers which moved in from other tiles, and soldiers promoted to commander, since the last round
+            with self.roster_lock:
+                arrived = list(self.arrivals.values())
+                promoted = self.promoted
+                self.arrivals = {}
+                self.promoted = []
+            if len(arrived) > 0:
+                host_soldiers.update(was_hit.soldier_id for was_hit in arrived)
+                yield missiledefence_pb2.HostEvent(arrived=missiledefence_pb2.WasHitBatch(statuses=arrived))
+            for soldier_id in promoted:
+                if soldier_id in host_soldiers:
+                    yield missiledefence_pb2.HostEvent(status=missiledefence_pb2.CommanderStatus(new_commander_id=soldier_id))
+                    # The host answers with the details of the soldier, which the coordinator has already promoted
+                    next(request_iterator, None)
+                    host_soldiers.discard(soldier_id)
+            host_soldiers = set(filter(self.is_soldier_alive, host_soldiers))
+
+            # Tiles keep their stream open without soldiers, some may move in later
+            reply = self.round_message(i, -1, sent_version)
+            sent_version = reply.layout_version
+            yield missiledefence_pb2.HostEvent(missile=reply)
+            rounds_sent+=1
+
+            update = next(request_iterator, None)
+            if update is None:
+                return
+            for was_hit in update.statuses.statuses:
+                if was_hit.soldier_id in host_soldiers:
+                    self.apply_status(was_hit)
+
+            war_over = self.finish_round(i)
+            confirmed = [self.confirmed_moves.pop(soldier_id) for soldier_id in host_soldiers if soldier_id in self.confirmed_moves]
+            departed = [self.departures.pop(soldier_id) for soldier_id in host_soldiers if soldier_id in self.departures]
+            host_soldiers.difference_update(was_hit.soldier_id for was_hit in departed)
+            if len(confirmed) > 0:
+                yield missiledefence_pb2.HostEvent(confirmed=missiledefence_pb2.WasHitBatch(statuses=confirmed))
+            if len(departed) > 0:
+                yield missiledefence_pb2.HostEvent(departed=missiledefence_pb2.WasHitBatch(statuses=departed))
+            if war_over:
+                return
+
+    # Calls of the coordinator
+
+    # Wait until the soldier host of the tile has joined
+    def tile_ready(self, request, context):
+        with self.round_condition:
+            self.round_condition.wait_for(lambda: self.has_joined)
+        return self.tile_status()
+
+    def promote(self, request, context):
+        with self.roster_lock:
+            soldier_id = request.soldier_id if request.soldier_id != -1 else sorted(self.soldier_details)[request.nth]
+            self.position = list(self.soldier_details.pop(soldier_id)["position"])
+            self.untrack_soldier(soldier_id)
+            self.sid = soldier_id
+            self.speed = self.speeds[soldier_id]
+            self.is_alive = True
+            self.promoted.append(soldier_id)
+        logger.info(f"Electing {soldier_id} as the new commander ...")
+        return missiledefence_pb2.NewCommanderFilter(soldier_id=soldier_id)
+
+    def begin_war(self, request, context):
+        self.apply_halo(request.halo)
+        with self.round_condition:
+            self.is_war_over = request.is_war_over
+            self.has_war_started = True
+            self.wake_streams()
+        return google.protobuf.empty_pb2.Empty()
+
+    # Play missile `index`: the commander takes shelter, the soldiers of the tile report, and their moves are resolved
+    def play_round(self, request, context):
+        i = request.index
+        self.start_round(i)
+        with self.round_condition:
+            self.played_rounds.append(i)
+            self.wake_streams()
+        self.wait_for_round(len(self.played_rounds))
+
+        with self.roster_lock:
+            self.resolve_moves(commander.missile_launches[i])
+            return missiledefence_pb2.ClaimBatch(claims=[
+                missiledefence_pb2.Claim(
+                    soldier_id=soldier_id, position=self.soldier_details[soldier_id]["position"], target=target, speed=self.speeds[soldier_id]
+                )
+                for soldier_id, target in self.outbound
+            ])
+
+    # Claims of soldiers of other tiles for cells of this tile, in order: a claim is accepted if the cell is empty
+    def claim_cells(self, request, context):
+        reply = missiledefence_pb2.ClaimBatch()
+        reply.CopyFrom(request)
+        with self.roster_lock:
+            for claim in reply.claims:
+                target = list(claim.target)
+                with self.layout_log_lock:
+                    claim.accepted = bool(self.layout[target[0]-1, target[1]-1] == 0)
+                    if claim.accepted:
+                        self.write_cells([(target[0], target[1], claim.soldier_id)])
+                if claim.accepted:
+                    logger.info(f"Soldier {claim.soldier_id} moves in from {claim.position[0]},{claim.position[1]} to {target[0]},{target[1]}...")
+                    self.soldier_details[claim.soldier_id] = {"position": target, "is_alive": True}
+                    self.speeds[claim.soldier_id] = claim.speed
+                    self.track_soldier(claim.soldier_id, len(self.played_rounds))
+                    self.arrivals[claim.soldier_id] = missiledefence_pb2.WasHit(soldier_id=claim.soldier_id, is_alive=True, position=target)
+        return reply
+
+    # Outcome of the claims of the tile's soldiers: they leave the tile, or stay where they are
+    def settle(self, request, context):
+        missile = commander.missile_launches[self.played_rounds[-1]]
+        with self.roster_lock:
+            rejected = []
+            for claim in request.claims:
+                if claim.accepted:
+                    position = self.soldier_details.pop(claim.soldier_id)["position"]
+                    self.set_cell(position[0], position[1], 0)
+                    self.untrack_soldier(claim.soldier_id)
+                    self.departures[claim.soldier_id] = missiledefence_pb2.WasHit(soldier_id=claim.soldier_id, is_alive=True, position=claim.target)
+                else:
+                    rejected.append((claim.soldier_id, list(claim.target)))
+            self.reject_moves(rejected, missile)
+        return self.tile_status()
+
+    def end_round(self, request, context):
+        i = request.index
+        self.apply_halo(request.halo)
+        commander.missile_launches[i]["sent"] = True
+        logger.info("Updated layout: ")
+        self.print_layout()
+        logger.info(f"Dead soldiers: {self.dead_soldiers}")
+        round_start_time = self.round_start_times.pop(i, None)
+        if round_start_time is not None:
+            metrics.inc("commander_rounds_total")
+            metrics.observe("commander_round_duration_seconds", time.perf_counter() - round_start_time)
+
+        with self.round_condition:
+            self.is_war_over = request.is_war_over
+            self.finished_missiles.add(i)
+            self.wake_streams()
+        if request.is_war_over:
+            logger.info("War over, final layout: ")
+            self.print_layout()
+        return google.protobuf.empty_pb2.Empty()
+
+    # Block until the war is over
+    def wait_for_war_over(self):
+        with self.round_condition:
+            self.round_condition.wait_for(lambda: self.is_war_over)
+
+
+'''
+Drives the rounds of all tiles on one missile timeline, merges their casualties and decides the outcome of the war,
+with the same checks and in the same order as Commander.finish_round.
+'''
+class Coordinator():
+
+    def __init__(self, scenario, tiling, rng=random):
+        self.scenario = scenario
+        self.tiling = tiling
+        self.rng = rng
+        self.stubs = [missiledefence_pb2_grpc.TileStub(grpc.insecure_channel(tiling.target(k))) for k in range(len(tiling))]
+        self.executor = futures.ThreadPoolExecutor(max_workers=len(tiling))
+        self.commander_tile = -1
+        self.is_commander_alive = False
+        # Commanders which died, the tiles only count their soldiers
+        self.dead_commanders = 0
+
+    # Call `method` of every tile at once, with requests[k] for tile k
+    def call_tiles(self, method, requests):
+        return list(self.executor.map(
+            lambda k: getattr(self.stubs[k], method)(requests[k], wait_for_ready=True),
+            range(len(self.tiling)),
+        ))
+
+    # Changed edge cells of every tile, sent to the tiles whose halo they are in
+    def halos(self, statuses):
+        halos = [[] for k in range(len(self.tiling))]
+        for k, status in enumerate(statuses):
+            for cell in status.border_changes:
+                for other in range(len(self.tiling)):
+                    if other != k and self.tiling.in_halo(other, [cell.row, cell.col]):
+                        halos[other].append(cell)
+        return halos
+
+    # Promote the soldier `soldier_id`, or a random one of all tiles if it is -1
+    def elect(self, statuses, soldier_id=-1):
+        if soldier_id != -1:
+            tile = self.tiling.tile_of(self.scenario.positions[soldier_id - 1])
+            nth = 0
+        else:
+            nth = self.rng.randrange(sum(status.no_of_soldiers for status in statuses))
+            for tile, status in enumerate(statuses):
+                if nth < status.no_of_soldiers:
+                    break
+                nth -= status.no_of_soldiers
+        self.commander_tile = tile
+        self.is_commander_alive = True
+        elected = self.stubs[tile].promote(missiledefence_pb2.Promotion(soldier_id=soldier_id, nth=nth))
+        logger.info(f"Soldier {elected.soldier_id} of tile {tile} elected as commander")
+
+    def run(self):
+        missiles = self.scenario.missiles
+        no_of_tiles = len(self.tiling)
+        statuses = self.call_tiles("tile_ready", [google.protobuf.empty_pb2.Empty()] * no_of_tiles)
+        logger.info(f"{sum(status.no_of_soldiers for status in statuses)} soldiers joined {no_of_tiles} tiles")
+
+        first_commander = self.scenario.first_commander
+        self.elect(statuses, first_commander if first_commander is not None else self.rng.randrange(1, self.scenario.no_of_soldiers + 1))
+
+        # Index of the last missile dropped inside the war zone, the war is won once it has been survived
+        in_war_zone = [
+            any(m["position"][0] <= self.tiling.size and m["position"][1] <= self.tiling.size for m in salvo.round_missiles(missile))
+            for missile in missiles
+        ]
+        last_round = max((i for i in range(len(missiles)) if in_war_zone[i]), default=-1)
+        halos = self.halos(statuses)
+        self.call_tiles("begin_war", [missiledefence_pb2.RoundEnd(index=-1, is_war_over=last_round == -1, halo=halos[k]) for k in range(no_of_tiles)])
+        if last_round == -1:
+            logger.info("No missile inside the war zone.. War won!")
+            return "won"
+
+        scheduler = MissileScheduler(missiles, commander.time_scale)
+        outcome = "won"
+        for k in range(len(missiles)):
+            i = scheduler.wait_for_launch(k)
+            if not in_war_zone[i]:
+                logger.info(f"Skipping missile {salvo.format_salvo(missiles[i])} at time {missiles[i]['time']} because it is outside the war zone..")
+                continue
+
+            reports = self.call_tiles("play_round", [missiledefence_pb2.RoundRequest(index=i)] * no_of_tiles)
+
+            # Claims go to the tile which owns the target cell, in soldier id order, and their outcome back to the tile they came from
+            claims = sorted((claim for report in reports for claim in report.claims), key=lambda claim: claim.soldier_id)
+            inbound = [missiledefence_pb2.ClaimBatch(claims=[claim for claim in claims if self.tiling.tile_of(claim.target) == k]) for k in range(no_of_tiles)]
+            results = self.call_tiles("claim_cells", inbound) if len(claims) > 0 else inbound
+            outcomes = [missiledefence_pb2.ClaimBatch() for k in range(no_of_tiles)]
+            for result in results:
+                for claim in result.claims:
+                    outcomes[self.tiling.tile_of(claim.position)].claims.append(claim)
+            statuses = self.call_tiles("settle", outcomes)
+
+            if self.is_commander_alive and not statuses[self.commander_tile].is_commander_alive:
+                logger.info("Commander dead..")
+                self.is_commander_alive = False
+                self.dead_commanders += 1
+            casuality_count = sum(status.casuality_count for status in statuses) + self.dead_commanders
+            no_of_soldiers = sum(status.no_of_soldiers for status in statuses)
+            logger.info(f"Missile {i+1}: {casuality_count} casualties, {no_of_soldiers} soldiers left, {len(claims)} moves across tiles")
+
+            is_war_over = True
+            if casuality_count >= 0.5 * self.scenario.no_of_soldiers:
+                logger.info("casuality_count >= 0.5*no_of_soldiers..")
+                logger.info("War lost!")
+                outcome = "lost"
+            elif i == last_round:
+                logger.info("War won!")
+            elif not self.is_commander_alive and no_of_soldiers == 0:
+                logger.info("Commander dead, No one to elect.. War lost")
+                outcome = "lost"
+            else:
+                is_war_over = False
+                if not self.is_commander_alive:
+                    self.elect(statuses)
+
+            halos = self.halos(statuses)
+            self.call_tiles("end_round", [missiledefence_pb2.RoundEnd(index=i, is_war_over=is_war_over, halo=halos[k]) for k in range(no_of_tiles)])
+            if is_war_over:
+                break
+        return outcome
+
+
+# Logs of the coordinator and of every tile go to their own file in commander.log_dir
+def configure_logging(name, console_log_level=commander.console_log_level):
+    start_time = dt.now().strftime("%Y-%m-%d %H_%M_%S")
+    logqueue.start(logger, os.path.join(commander.log_dir, f"{name}_{start_time}.log"), commander.file_log_level, console_log_level)
+
+
+# Serve tile k of the war in this process until the war is over, only warnings of the tiles are printed
+def serve_tile(scenario_file, k):
+    configure_logging(f"tile_{k}", logging.WARNING)
+    scenario = scenarios.load(scenario_file)
+    commander.missile_launches = commander.launches_of(scenario)
+
+    tiling = Tiling(scenario.size)
+    tile_commander = TileCommander(tiling, k, scenario.no_of_soldiers)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), options=commander.server_options)
+    missiledefence_pb2_grpc.add_CommanderServicer_to_server(tile_commander, server)
+    missiledefence_pb2_grpc.add_TileServicer_to_server(tile_commander, server)
+    server.add_insecure_port(f"[::]:{tiling.port(k)}")
+    server.start()
+    tile_commander.wait_for_war_over()
+    server.stop(tile_shutdown_grace).wait()
+
+
+def start_sharded_commander(scenario_file):
+    scenario = scenarios.load(scenario_file)
+    tiling = Tiling(scenario.size)
+
+    # Tiles are separate processes, started before this process opens any channel
+    context = multiprocessing.get_context("spawn")
+    tiles = [context.Process(target=serve_tile, args=(scenario_file, k)) for k in range(len(tiling))]
+    for tile in tiles:
+        tile.start()
+    logger.info(f"Started {len(tiles)} tiles of {tiling.grid[0]}x{tiling.grid[1]} on ports {tiling.port(0)}-{tiling.port(len(tiles) - 1)}")
+
+    outcome = Coordinator(scenario, tiling).run()
+    for tile in tiles:
+        tile.join()
+    return outcome
+
+
+if __name__ == "__main__":
+    configure_logging("coordinator")
+    # python sharding.py scenario_file
+    start_sharded_commander(sys.argv[1])
@@ -1,33 +1,40 @@
 """The Python implementation of the GRPC missile defence system."""
 
 from threading import Thread, Lock
+import itertools
 import logging
+import logqueue
+import os
+import queue
 import random
+import sys
+import time
 import grpc
+import numpy as np
 import missiledefence_pb2
 import missiledefence_pb2_grpc
+import blast
+import escape
+import evacuation
+import salvo
+import scenarios
+import warzone
+from tiling import Tiling
 from datetime import datetime as dt
 
-# Create and configure logger
+# Create the logger, handlers are only attached by configure_logging() so that importing this module
+# (e.g. from engine.py) neither creates log files nor prints
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
-fh_formatter = logging.Formatter("%(asctime)s %(message)s")
-ch_formatter = logging.Formatter("%(message)s")
+# Logs are written to <log_dir>/soldier_<start time>.log from a background thread (see logqueue.py).
+# Messages below console_log_level are only written to the file, below file_log_level nowhere.
+log_dir = "logs"
+file_log_level = logging.DEBUG
+console_log_level = logging.INFO
 
-start_time = dt.now().strftime("%Y-%m-%d %H_%M_%S")
-
-# File handler to output the log to file
-fh = logging.FileHandler(f'logs\soldier_{start_time}.log', mode='w', encoding='utf-8')
-fh.setLevel(logging.DEBUG)
-fh.setFormatter(fh_formatter)
-logger.addHandler(fh)
-
-# Console handler to output the log to console
-ch = logging.StreamHandler()
-ch.setLevel(logging.INFO)
-ch.setFormatter(ch_formatter)
-logger.addHandler(ch)
+def configure_logging():
+    start_time = dt.now().strftime("%Y-%m-%d %H_%M_%S")
+    logqueue.start(logger, os.path.join(log_dir, f"soldier_{start_time}.log"), file_log_level, console_log_level)
 
 missile_details = {
     "M1": {"radius": 1},
@@ -39,17 +46,154 @@ missile_details = {
 # commander_url="192.168.199.59:50050"
 commander_url="localhost:50050"
 
-layout_updates = 0
+# All soldier threads share a small pool of long-lived channels to the commander instead of opening one per call.
+# Each channel is one HTTP/2 connection which multiplexes the calls and streams of many soldiers.
+channel_pool_size = 4
+channel_options = [
+    # Keep idle connections alive between missiles (commander has to permit these pings, see commander.py)
+    ("grpc.keepalive_time_ms", 10000),
+    ("grpc.keepalive_timeout_ms", 5000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    # Without a local subchannel pool, channels with the same target and options share a single connection
+    ("grpc.use_local_subchannel_pool", 1),
+    # Reconnect within a fraction of a second to a commander which took over from a checkpoint (see reconnect_timeout)
+    ("grpc.initial_reconnect_backoff_ms", 100),
+    ("grpc.min_reconnect_backoff_ms", 100),
+    ("grpc.max_reconnect_backoff_ms", 1000),
+]
+
+# Soldiers whose commander is gone wait up to reconnect_timeout seconds for it to come back, e.g. a standby commander
+# which resumes the war from its checkpoint (see checkpoint_file in commander.py), and rejoin it. None ends them right away.
+reconnect_timeout = 30
+# Seconds between the attempts to rejoin a commander which accepts connections but is not serving yet
+reconnect_interval = 0.1
+
+# Exchange missiles, status updates and elections with the commander on one bidirectional war_session stream.
+# Set to False to use the separate missile_approaching stream and status calls instead.
+use_war_session = True
+
+# Drive all soldiers of this process from a single SoldierHost over one host_session stream,
+# instead of one thread and one stream per soldier
+use_soldier_host = False
+
+# Soldier hosts plan the evacuation of all their soldiers in a red zone together (see evacuation.py): a soldier may move
+# to any free cell outside the red zone within its speed, instead of only the straight-line movements of take_shelter
+use_evacuation_planner = False
+
+# Join a sharded commander (see sharding.py): the soldiers are driven by one SoldierHost per tile of the war zone,
+# which connects to the port of its tile (see tiling.py) instead of commander_url
+use_sharded_commander = False
+
+# The war zone is a contiguous NxN array of soldier ids, received as is in MissileApproaching.layout_cells
+# (very large war zones are stored sparse instead, see warzone.py)
+layout_dtype = np.dtype("<i4")
+
+# Version of the commander's layout which the shared `layout` reflects, -1 until the first snapshot arrives
+layout_version = -1
+
+# One lock per shared structure of the process, so soldiers moving do not wait on channel creation and vice versa
+# Guards the creation of channel_pool
+channel_pool_lock = Lock()
+# Guards `layout` and layout_version: replaying the commander's updates and soldiers moving in it
+layout_lock = Lock()
+
+class ChannelPool():
+
+    def __init__(self, target, size, options):
+        self.channels = [grpc.insecure_channel(target, options=options) for x in range(size)]
+        self.stubs = [missiledefence_pb2_grpc.CommanderStub(channel) for channel in self.channels]
+        self.next_stub = itertools.cycle(self.stubs)
+        self.lock = Lock()
+
+    # Hand out the stubs round robin so that calls are spread over all connections
+    def stub(self):
+        with self.lock:
+            return next(self.next_stub)
+
+    # Wait until every channel is connected, returns False if that takes more than `timeout` seconds
+    def wait_until_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        try:
+            for channel in self.channels:
+                grpc.channel_ready_future(channel).result(timeout=max(0.0, deadline - time.monotonic()))
+        except grpc.FutureTimeoutError:
+            return False
+        return True
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+
+channel_pool = None
+
+# Create the channel pool of the soldier process on first use
+def get_channel_pool():
+    global channel_pool
+    with channel_pool_lock:
+        if channel_pool is None:
+            channel_pool = ChannelPool(commander_url, channel_pool_size, channel_options)
+    return channel_pool
+
+# Run `session`, the connection of one soldier or soldier host to the commander, and run it again whenever the commander
+# is gone, once the commander is back (resumed from its checkpoint, see commander.py). The soldiers then rejoin the war.
+def rejoin_on_failover(session):
+    while True:
+        try:
+            return session()
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.UNAVAILABLE or reconnect_timeout is None:
+                raise
+            logger.info(f"Lost the commander ({e.details()}), waiting for it to come back..")
+            if not get_channel_pool().wait_until_ready(reconnect_timeout):
+                raise
+            time.sleep(reconnect_interval)
+
+# Update the shared layout of all soldiers in this process, returns True if it was behind the commander's layout
+def update_layout(missile):
+    with layout_lock:
+        global layout_version
+        if missile.layout_version <= layout_version:
+            return False
+        layout_version = replay_layout(layout, layout_version, missile)
+        return True
 
-# A simple mutex lock which helps to execute a block of code without interference from parallel threads (if needed)
-lock = Lock()
+# Bring `target`, a copy of the commander's layout at `version`, up to the version of `missile`, returns the new version
+# (caller holds layout_lock)
+def replay_layout(target, version, missile):
+    if missile.layout_version <= version:
+        return version
+    if missile.is_snapshot and len(missile.layout_cells) > 0:
+        target[:] = np.frombuffer(missile.layout_cells, dtype=layout_dtype).reshape(target.shape)
+    elif missile.is_snapshot:
+        # Sparse snapshot, only the occupied cells are sent
+        target.fill(0)
+        for cell in missile.occupied_cells:
+            target[cell.row-1, cell.col-1] = cell.soldier_id
+    else:
+        # All soldier threads share one layout, so only replay the changes it has not seen yet
+        for cell in missile.changes[version - missile.base_version:]:
+            target[cell.row-1, cell.col-1] = cell.soldier_id
+    return missile.layout_version
+
+# Red zones of all missiles of a salvo round (see salvo.py), None if only one missile is approaching
+def salvo_red_zones(missile):
+    if len(missile.salvo) == 0:
+        return None
+    return salvo.RedZones.of(
+        [{"position": list(m.position), "type": m.type} for m in [missile.missile, *missile.salvo]], missile_details
+    )
 
 class Soldier():
 
-    def __init__(self, sid, position, speed):
+    # layout is the war zone the soldier moves in (the shared `layout` of this process, or a simulated one, see engine.py)
+    # and rng the source of the random choices between equally short movements
+    def __init__(self, sid, position, speed, layout, rng=random):
         self.sid = sid
         self.position = position
         self.speed = speed
+        self.layout = layout
+        self.rng = rng
         self.is_commander = False
         self.is_alive = True
 
@@ -58,206 +202,256 @@ class Soldier():
         # Ping commander with READY, response will include if the current soldier has to become the first commander
         response = self.send_soldier_ready()
 
+        if response.HasField("rejoined"):
+            # Rejoined a commander which resumed the war from its checkpoint, take the position it has for this soldier
+            self.confirm_move(response.rejoined)
+            if self.is_alive == False:
+                return
+
         # If the current soldier has to be elected as the first commander, send election request.
         if response.soldier_id == self.sid:
             logger.info(f"electing commander.. {response.soldier_id}")
             self.request_elect_commander(self.sid)
             return
         
+        if use_war_session:
+            self.run_war_session()
+        else:
+            self.run_missile_stream()
+
+    # Update the current soldier's layout to match the layout sent by commander after his movement
+    def update_layout(self, missile, i):
+        if update_layout(missile):
+            logger.info(f"soldier {self.sid} updating layout to version {layout_version} for missile {i+1}")
+
+    # Missiles, status updates and election notices all travel on one bidirectional stream
+    def run_war_session(self):
+        # Requests are sent from a queue, the request stream ends once None is put in the queue
+        updates = queue.Queue()
+        updates.put(missiledefence_pb2.SessionUpdate(join=missiledefence_pb2.SoldierFilter(soldier_id=self.sid)))
+
+        stub = get_channel_pool().stub()
+        events = stub.war_session(iter(updates.get, None))
+
+        try:
+            self.play_war_session(events, updates)
+        finally:
+            # Also ends the request stream if the commander is gone
+            updates.put(None)
+
+    def play_war_session(self, events, updates):
         i = 0
-        # Establish gRPC Server streaming
-        with grpc.insecure_channel(
-            commander_url
-        ) as channel:
-            stub = missiledefence_pb2_grpc.CommanderStub(channel)
-            approaching_missiles = stub.missile_approaching(
-                missiledefence_pb2.SoldierFilter(soldier_id=self.sid)
-            )
-        
-            for missile in approaching_missiles:
-                # Update the current soldier's layout to match the layout sent by commander after his movement
-                with lock:
-                    global layout, layout_updates
-                    if layout_updates == i:
-                        layout = []
-                        for layoutRow in missile.layout:
-                            layout.append(list(layoutRow.row))
-                        logger.info(f"soldier {self.sid} updating layout for missile {i+1}")
-                        layout_updates += 1
+        for event in events:
+            if event.HasField("confirmed"):
+                self.confirm_move(event.confirmed)
+
+            elif event.HasField("missile"):
+                missile = event.missile
+                self.update_layout(missile, i)
 
                 # Move soldier (if possible)
                 self.take_shelter(
-                    missile.missile.position, missile.missile.time, missile.missile.type
+                    missile.missile.position, missile.missile.launch_time, missile.missile.type, salvo_red_zones(missile)
                 )
 
-                '''
-                Update ALIVE status and position after movement (if any)
-                If the current soldier is alive, but the commander is dead by this time,
-                Commander MIGHT ask the current soldier to be the new commander
-                '''
-                logger.info("Requesting status update")
-                response = self.status(self.sid)
-
-                # If the current soldier has been asked to become new commander, send election_request
-                if response.new_commander_id != -1 and self.sid == response.new_commander_id:
-                    logger.info(f"Commander dead, requesting to elect soldier {self.sid} as commander")
-                    response = self.request_elect_commander(self.sid)
-                    break
+                # Send ALIVE status and position after movement (if any) on the same stream
+                logger.info("Sending status update")
+                updates.put(missiledefence_pb2.SessionUpdate(
+                    status=missiledefence_pb2.WasHit(soldier_id=self.sid, is_alive=self.is_alive, position=self.position)
+                ))
                 if self.is_alive == False:
                     logger.info(f"Soldier {self.sid} dead..")
-
-                logger.info(f"Requesting next missile detail for soldier {self.sid}")
                 i+=1
 
-    def send_soldier_ready(self):
-        with grpc.insecure_channel(
-            commander_url
-        ) as channel:
-            stub = missiledefence_pb2_grpc.CommanderStub(channel)
-            response: missiledefence_pb2.NewCommanderFilter = stub.soldier_ready(
-                missiledefence_pb2.ConnectionRequest (
-                        soldier_id=self.sid, 
-                        position=self.position, 
-                        no_of_soldiers=M,
-                        warzone_size=N
-                    )
+            elif event.status.new_commander_id == self.sid and event.status.is_elected:
+                # Elected by the commander itself (ranked election), which ends the stream
+                logger.info(f"Commander dead, soldier {self.sid} elected as commander")
+                self.is_commander = True
+
+            elif event.status.new_commander_id == self.sid:
+                # Commander is dead and the current soldier has been asked to become the new commander.
+                # The commander ends the stream once it has received the details below.
+                logger.info(f"Commander dead, electing soldier {self.sid} as commander")
+                self.is_commander = True
+                updates.put(missiledefence_pb2.SessionUpdate(elect=self.commander_details()))
+
+    # Missiles arrive on the missile_approaching stream, status updates and elections are separate calls
+    def run_missile_stream(self):
+        i = 0
+        # Establish gRPC Server streaming
+        stub = get_channel_pool().stub()
+        approaching_missiles = stub.missile_approaching(
+            missiledefence_pb2.SoldierFilter(soldier_id=self.sid)
+        )
+        
+        for missile in approaching_missiles:
+            if missile.HasField("elected"):
+                # Elected by the commander itself (ranked election), which ends the stream
+                logger.info(f"Commander dead, soldier {self.sid} elected as commander")
+                self.is_commander = True
+                break
+            if not missile.HasField("missile"):
+                # Outcome of the last move, sent once the commander has resolved the moves of the round
+                self.confirm_move(missile.confirmed)
+                continue
+
+            self.update_layout(missile, i)
+
+            # Move soldier (if possible)
+            self.take_shelter(
+                missile.missile.position, missile.missile.launch_time, missile.missile.type, salvo_red_zones(missile)
             )
+
+            '''
+            Update ALIVE status and position after movement (if any)
+            If the current soldier is alive, but the commander is dead by this time,
+            Commander MIGHT ask the current soldier to be the new commander
+            '''
+            logger.info("Requesting status update")
+            response = self.status(self.sid)
+
+            # If the current soldier has been asked to become new commander, send election_request
+            if response.new_commander_id != -1 and self.sid == response.new_commander_id:
+                logger.info(f"Commander dead, requesting to elect soldier {self.sid} as commander")
+                response = self.request_elect_commander(self.sid)
+                break
+            if self.is_alive == False:
+                logger.info(f"Soldier {self.sid} dead..")
+
+            logger.info(f"Requesting next missile detail for soldier {self.sid}")
+            i+=1
+
+        # The pooled channel stays open, so release the stream explicitly if we stopped listening early
+        approaching_missiles.cancel()
+
+    def send_soldier_ready(self):
+        stub = get_channel_pool().stub()
+        response: missiledefence_pb2.NewCommanderFilter = stub.soldier_ready(
+            missiledefence_pb2.ConnectionRequest (
+                    soldier_id=self.sid, 
+                    position=self.position, 
+                    no_of_soldiers=M,
+                    warzone_size=N,
+                    speed=self.speed
+                )
+        )
         # logger.info(f"Sent soldier_ready of soldier {self.sid}")
         return response
 
     def request_elect_commander(self, new_commander_id):
         self.is_commander=True
-        with grpc.insecure_channel(
-            commander_url
-        ) as channel:
-            stub = missiledefence_pb2_grpc.CommanderStub(channel)
-
-            # The below election request contains the details of the current soldier which will be updated in commander
-            # Since the current soldier instance will stop from here and resume from commander side
-            stub.elect_commander(
-                missiledefence_pb2.NewCommanderDetails(soldier_id=new_commander_id, position=self.position, speed=self.speed)
-            )
+        stub = get_channel_pool().stub()
+
+        # The below election request contains the details of the current soldier which will be updated in commander
+        # Since the current soldier instance will stop from here and resume from commander side
+        stub.elect_commander(self.commander_details())
+
+    '''
+    The commander resolves the moves of all soldiers of a round at once and only confirms a move into a cell
+    which is still empty. If the move was rejected, go back to the position the commander has for this soldier
+    (dead if it was inside the red zone).
+    '''
+    def confirm_move(self, confirmed):
+        with layout_lock:
+            if self.layout[self.position[0]-1, self.position[1]-1] == self.sid:
+                self.layout[self.position[0]-1, self.position[1]-1] = 0
+            if confirmed.is_alive:
+                self.layout[confirmed.position[0]-1, confirmed.position[1]-1] = self.sid
+        if list(confirmed.position) != self.position:
+            logger.info(f"Move of soldier {self.sid} to {self.position} rejected by the commander, back at {list(confirmed.position)}")
+        self.position = list(confirmed.position)
+        self.is_alive = confirmed.is_alive
+        if self.is_alive == False:
+            logger.info(f"Soldier {self.sid} dead..")
+
+    def commander_details(self):
+        return missiledefence_pb2.NewCommanderDetails(soldier_id=self.sid, position=self.position, speed=self.speed)
     
     def status(self, soldier_id):
         if soldier_id == self.sid:
-            with grpc.insecure_channel(
-                commander_url
-            ) as channel:
-                stub = missiledefence_pb2_grpc.CommanderStub(channel)
-                response: missiledefence_pb2.NewCommanderFilter = stub.status(
-                    missiledefence_pb2.WasHit(soldier_id=self.sid, is_alive=self.is_alive, position=self.position)
-                )
+            stub = get_channel_pool().stub()
+            response: missiledefence_pb2.NewCommanderFilter = stub.status(
+                missiledefence_pb2.WasHit(soldier_id=self.sid, is_alive=self.is_alive, position=self.position)
+            )
         return response
 
     def move_soldier(self, selected_movement, no_of_moves):
+        row_step, col_step = escape.movement_steps[selected_movement]
+        return self.move_by(row_step * no_of_moves, col_step * no_of_moves)
+
+    # Move by a displacement of (row_move, col_move), returns False if the new position is outside the war zone or taken
+    def move_by(self, row_move, col_move):
         old_x = self.position[0]
         old_y = self.position[1]
-
-        # Update position according to the randomly chosen direction and number of moves
-        if selected_movement == "left":
-            self.position[1] = old_y - no_of_moves
-        elif selected_movement == "right":
-            self.position[1] = old_y + no_of_moves
-        elif selected_movement == "up":
-            self.position[0] = old_x - no_of_moves
-        elif selected_movement == "down":
-            self.position[0] = old_x + no_of_moves
-        elif selected_movement == "left_up":
-            self.position[0] = old_x - no_of_moves
-            self.position[1] = old_y - no_of_moves
-        elif selected_movement == "left_down":
-            self.position[0] = old_x + no_of_moves
-            self.position[1] = old_y - no_of_moves
-        elif selected_movement == "right_up":
-            self.position[0] = old_x - no_of_moves
-            self.position[1] = old_y + no_of_moves
-        else:  # right_down
-            self.position[0] = old_x + no_of_moves
-            self.position[1] = old_y + no_of_moves
+        self.position[0] = old_x + row_move
+        self.position[1] = old_y + col_move
 
         # Check if new position is going out of war zone boundary. If so, reset position and return FALSE.
-        if (
-            self.position[0] <= 0
-            or self.position[1] <= 0
-            or self.position[0] > len(layout)
-            or self.position[1] > len(layout[0])
-            or layout[self.position[0]-1][self.position[1]-1] != 0
-        ):
-            self.position[0] = old_x
-            self.position[1] = old_y
-            return False
-        layout[old_x-1][old_y-1] = 0
-        layout[self.position[0]-1][self.position[1]-1] = self.sid
+        # The check and the move are done under one lock, so two soldiers of this process never take the same cell
+        with layout_lock:
+            if (
+                self.position[0] <= 0
+                or self.position[1] <= 0
+                or self.position[0] > self.layout.shape[0]
+                or self.position[1] > self.layout.shape[1]
+                or self.layout[self.position[0]-1, self.position[1]-1] != 0
+            ):
+                self.position[0] = old_x
+                self.position[1] = old_y
+                return False
+            self.layout[old_x-1, old_y-1] = 0
+            self.layout[self.position[0]-1, self.position[1]-1] = self.sid
         return True
 
-    def take_shelter(self, missile_position, time, missile_type):
+    # red_zones are the red zones of all missiles of a salvo round (see salvo.py), None for a single missile
+    def take_shelter(self, missile_position, time, missile_type, red_zones=None):
         # Print current missile details
         logger.info("Time: {0}".format(time))
         logger.info("Missile type: {0}".format(missile_type))
-        rad = missile_details[missile_type]["radius"] - 1
-        logger.info("Radius: {0}".format(rad+1))
-
-        # Calculate red zone using missile drop location and radius
-        i_start = missile_position[0] - rad
-        i_end = missile_position[0] + rad
-        j_start = missile_position[1] - rad
-        j_end = missile_position[1] + rad
+        radius = missile_details[missile_type]["radius"]
+        logger.info("Radius: {0}".format(radius))
 
         has_moved = False
+        row_offset = self.position[0] - missile_position[0]
+        col_offset = self.position[1] - missile_position[1]
+        if red_zones is None:
+            in_red_zone = escape.in_red_zone(radius, row_offset, col_offset)
+        else:
+            logger.info("Salvo of {0} missiles".format(len(red_zones.zones)))
+            in_red_zone = red_zones.is_red(self.position[0], self.position[1])
 
         # If current soldier within red zone, try to move
-        if (
-            i_start <= self.position[0] <= i_end
-            and j_start <= self.position[1] <= j_end
-        ):
-            movements = {}
-            # Calculate basic movements - left, right, up down
-            movements["left"] = (self.position[1] - j_start) + 1
-            movements["right"] = (j_end - self.position[1]) + 1
-            movements["up"] = (self.position[0] - i_start) + 1
-            movements["down"] = (i_end - self.position[0]) + 1
-
-            # Deduce diagonal movements from basic movements
-            movements["left_up"] = min(movements["left"], movements["up"])
-            movements["left_down"] = min(movements["left"], movements["down"])
-            movements["right_up"] = min(movements["right"], movements["up"])
-            movements["right_down"] = min(movements["right"], movements["down"])
-
-            while len(movements) > 0 and not has_moved:
-                # Find the minimum of all the above calculated movements
-                min_move_calc = min(movements.values())
-
-                # Compare the above result with max speed of the soldier,
-                # If speed is lesser than what is needed, soldier can't escape the read zone (DEAD)
-                if self.speed >= min_move_calc:
-                    # Choose all possible direction where movement can be made with selected min no of moves
-                    possible_movements = [
-                        key for key in movements if movements[key] == min_move_calc
-                    ]
-                    selected_movement = random.choice(possible_movements)
-
-                    # Try to move as long as there are possible movements
-                    while (
-                        len(possible_movements) != 0
-                        and has_moved != True
-                    ):
-                        selected_movement = random.choice(possible_movements)
-                        has_moved = self.move_soldier(selected_movement, min_move_calc)
-                        if has_moved==False:
-                            del movements[selected_movement]
-                            possible_movements.remove(selected_movement)
-
-                    if len(movements) == 0 and not has_moved:
-                        layout[self.position[0]-1][self.position[1]-1] = 0
-                        self.is_alive = False
-                        break
-                else:
-                    self.is_alive = False
+        if in_red_zone:
+            # Movements out of the red zone within the speed of the soldier, by number of moves, shortest first (see escape.py),
+            # or out of the red zones of all missiles of a salvo (see salvo.py)
+            if red_zones is None:
+                escape_movements = escape.escape_movements(radius, row_offset, col_offset, self.speed)
+            else:
+                escape_movements = red_zones.escape_movements(self.position, self.speed)
+            for possible_movements in escape_movements:
+                possible_movements = list(possible_movements)
+                selected_movement = self.rng.choice(possible_movements)
+
+                # Try to move as long as there are possible movements
+                while (
+                    len(possible_movements) != 0
+                    and has_moved != True
+                ):
+                    selected_movement = self.rng.choice(possible_movements)
+                    has_moved = self.move_by(*selected_movement)
+                    if has_moved==False:
+                        possible_movements.remove(selected_movement)
+                if has_moved:
                     break
-                
+
+            # If no movement is possible within the speed of the soldier, soldier can't escape the red zone (DEAD)
+            if not has_moved:
+                self.is_alive = False
+
             # If soldier dead, make soldier position 0 in layout
             if self.is_alive == False:
-                layout[self.position[0] - 1][self.position[1] - 1] = 0
+                with layout_lock:
+                    self.layout[self.position[0]-1, self.position[1]-1] = 0
                 if self.is_commander == True:
                     self.is_commander = False
                     
@@ -265,6 +459,143 @@ class Soldier():
 
 
 
+'''
+Soldier host: drives many Soldier state machines from one thread over a single host_session stream.
+All soldiers join at once, take shelter together in one vectorized pass (see blast.py, or evacuation.py),
+and after every missile the status of all alive soldiers is sent as one batch.
+'''
+class SoldierHost():
+
+    '''
+    The soldiers take shelter in `layout`, the host's copy of the commander's layout (the shared layout of the process,
+    or one per tile of a sharded commander). With a sharded commander (see sharding.py) there is one host per tile,
+    each with the stub of its tile, and soldiers which move to another tile are handed over between the hosts:
+    all_soldiers are the soldiers of all hosts by soldier id.
+    '''
+    def __init__(self, soldiers, layout, stub=None, all_soldiers=None):
+        self.soldiers = {soldier.sid: soldier for soldier in soldiers}
+        self.layout = layout
+        self.layout_version = -1
+        self.stub = stub
+        self.all_soldiers = all_soldiers
+
+    # Replay the commander's layout updates into the host's layout
+    def update_layout(self, missile):
+        with layout_lock:
+            self.layout_version = replay_layout(self.layout, self.layout_version, missile)
+
+    # Hand a soldier over to the commander, it is no longer driven by this host
+    def elect(self, sid, updates):
+        soldier = self.soldiers.pop(sid)
+        logger.info(f"electing commander.. {sid}")
+        soldier.is_commander = True
+        updates.put(missiledefence_pb2.HostUpdate(elect=soldier.commander_details()))
+
+    def run(self):
+        updates = queue.Queue()
+        # Soldiers join a chunk at a time (at least one batch, also without soldiers), so no message has to hold all of them
+        soldiers = list(self.soldiers.values())
+        for start in range(0, max(len(soldiers), 1), scenarios.chunk_size):
+            updates.put(missiledefence_pb2.HostUpdate(join=missiledefence_pb2.ConnectionRequestBatch(
+                soldiers=[
+                    missiledefence_pb2.ConnectionRequest(soldier_id=soldier.sid, position=soldier.position, no_of_soldiers=M, warzone_size=N, speed=soldier.speed)
+                    for soldier in soldiers[start:start + scenarios.chunk_size]
+                ],
+                more=start + scenarios.chunk_size < len(soldiers),
+            )))
+
+        stub = self.stub if self.stub is not None else get_channel_pool().stub()
+        events = stub.host_session(iter(updates.get, None))
+        # The first layout of a session is a snapshot, also after rejoining a resumed commander
+        self.layout_version = -1
+        try:
+            self.play(events, updates)
+        finally:
+            updates.put(None)
+
+    def play(self, events, updates):
+        i = 0
+        for event in events:
+            if event.HasField("ready"):
+                # One of the host's soldiers may have to become the first commander
+                if event.ready.soldier_id in self.soldiers:
+                    self.elect(event.ready.soldier_id, updates)
+
+            elif event.HasField("missile"):
+                missile = event.missile
+                self.update_layout(missile)
+
+                logger.info("Time: {0}".format(missile.missile.launch_time))
+                logger.info("Missile type: {0}".format(missile.missile.type))
+
+                # All alive soldiers take shelter in one vectorized pass against the shared layout
+                soldiers = list(self.soldiers.values())
+                positions = [list(soldier.position) for soldier in soldiers]
+                speeds = [soldier.speed for soldier in soldiers]
+                red_zones = salvo_red_zones(missile)
+                if red_zones is None:
+                    resolve = evacuation.plan_evacuation if use_evacuation_planner else blast.resolve_blast
+                    new_positions, alive = resolve(
+                        positions, speeds, missile.missile.position, missile_details[missile.missile.type]["radius"], self.layout
+                    )
+                    blast.apply_blast(self.layout, [soldier.sid for soldier in soldiers], positions, new_positions, alive)
+                elif use_evacuation_planner:
+                    new_positions, alive = evacuation.plan_salvo_evacuation(positions, speeds, red_zones, self.layout)
+                    blast.apply_blast(self.layout, [soldier.sid for soldier in soldiers], positions, new_positions, alive)
+                else:
+                    # Salvo: the soldiers of the red zones take shelter one by one, each moving in the shared layout
+                    rows, cols = np.asarray(positions, dtype=np.int64).reshape(-1, 2).T
+                    for soldier, is_red in zip(soldiers, red_zones.is_red(rows, cols).tolist()):
+                        if is_red:
+                            soldier.take_shelter(missile.missile.position, missile.missile.launch_time, missile.missile.type, red_zones)
+                    new_positions = np.array([soldier.position for soldier in soldiers], dtype=np.int64).reshape(-1, 2)
+                    alive = np.array([soldier.is_alive for soldier in soldiers], dtype=bool)
+
+                statuses = []
+                for soldier, position, old_position, is_alive in zip(soldiers, new_positions.tolist(), positions, alive.tolist()):
+                    if position != old_position:
+                        logger.info(f"New position of soldier {soldier.sid}: {position}...")
+                    soldier.position = position
+                    soldier.is_alive = is_alive
+                    statuses.append(missiledefence_pb2.WasHit(soldier_id=soldier.sid, is_alive=soldier.is_alive, position=soldier.position))
+                    if soldier.is_alive == False:
+                        logger.info(f"Soldier {soldier.sid} dead..")
+                        del self.soldiers[soldier.sid]
+
+                logger.info(f"Sending status update of {len(statuses)} soldiers for missile {i+1}")
+                updates.put(missiledefence_pb2.HostUpdate(statuses=missiledefence_pb2.WasHitBatch(statuses=statuses)))
+                i+=1
+
+            elif event.HasField("confirmed"):
+                for confirmed in event.confirmed.statuses:
+                    if confirmed.soldier_id in self.soldiers:
+                        self.soldiers[confirmed.soldier_id].confirm_move(confirmed)
+                        if confirmed.is_alive == False:
+                            del self.soldiers[confirmed.soldier_id]
+
+            elif event.HasField("departed"):
+                # Moved to another tile of a sharded commander, the host of that tile drives them from now on
+                for departed in event.departed.statuses:
+                    self.soldiers.pop(departed.soldier_id, None)
+
+            elif event.HasField("arrived"):
+                # Moved into the tile of this host from another tile
+                for arrived in event.arrived.statuses:
+                    soldier = self.all_soldiers[arrived.soldier_id]
+                    soldier.position = list(arrived.position)
+                    soldier.layout = self.layout
+                    self.soldiers[soldier.sid] = soldier
+
+            elif event.status.new_commander_id in self.soldiers and event.status.is_elected:
+                # Commander is dead and one of the host's soldiers has been elected by the commander itself (ranked election)
+                soldier = self.soldiers.pop(event.status.new_commander_id)
+                logger.info(f"soldier {soldier.sid} elected as commander")
+                soldier.is_commander = True
+
+            elif event.status.new_commander_id in self.soldiers:
+                # Commander is dead and one of the host's soldiers has been asked to become the new commander
+                self.elect(event.status.new_commander_id, updates)
+
 def take_inputs():
     global N,M,S,layout
 
@@ -276,7 +607,7 @@ def take_inputs():
             break
     
     soldierwisePositions = [[-1,-1] for x in range(M)]
-    layout = [[0 for x in range(N)] for y in range(N)]
+    layout = warzone.new_layout(N, layout_dtype)
 
     logger.info("Note: Warzone indexing start from [1,1] for below inputs...")
     for i in range(M):
@@ -284,34 +615,91 @@ def take_inputs():
             pos_x = int(input(f"Enter row of soldier {i+1}: "))
             pos_y = int(input(f"Enter col of soldier {i+1}: "))
             logger.info("")
-            if pos_x<=len(layout) and pos_y<=len(layout[0]) and layout[pos_x-1][pos_y-1]==0:
+            if pos_x<=layout.shape[0] and pos_y<=layout.shape[1] and layout[pos_x-1, pos_y-1]==0:
                 soldierwisePositions[i][0]=pos_x
                 soldierwisePositions[i][1]=pos_y
                 break
 
-        layout[pos_x-1][pos_y-1] = i+1
+        layout[pos_x-1, pos_y-1] = i+1
 
     speedList = input("Please enter speed of all soldiers separated by commas (Si): ").split(',')
     S = [int(x) for x in speedList]
     return soldierwisePositions
 
+# Take N, M, soldier positions and speeds from a scenario file (see scenarios.py) instead of input prompts
+def load_inputs(scenario_file):
+    global N,M,S,layout
+    if scenarios.is_json(scenario_file):
+        scenario = scenarios.load(scenario_file)
+        N = scenario.size
+        S = scenario.speeds
+        soldierwisePositions = scenario.positions
+        layout = warzone.new_layout(N, layout_dtype)
+        positions = np.array(soldierwisePositions).reshape(-1, 2)
+        layout[positions[:, 0]-1, positions[:, 1]-1] = np.arange(1, len(positions)+1)
+    else:
+        # Binary scenarios are read a chunk of soldiers at a time, without holding all of their records at once
+        N = scenarios.load_binary_header(scenario_file)[0]
+        S = []
+        soldierwisePositions = []
+        layout = warzone.new_layout(N, layout_dtype)
+        for chunk in scenarios.iter_soldier_chunks(scenario_file):
+            positions = np.stack([chunk["row"], chunk["col"]], axis=1).astype(np.int64)
+            layout[positions[:, 0]-1, positions[:, 1]-1] = np.arange(len(soldierwisePositions)+1, len(soldierwisePositions)+len(chunk)+1)
+            soldierwisePositions += positions.tolist()
+            S += chunk["speed"].tolist()
+    M = len(soldierwisePositions)
+    logger.info(f"Loaded {M} soldiers on a {N}x{N} war zone from {scenario_file}")
+    return soldierwisePositions
+
 def start_soldier(sid, position, speed):
-    soldier = Soldier(sid, position, speed)
-    soldier.run()
+    soldier = Soldier(sid, position, speed, layout)
+    rejoin_on_failover(soldier.run)
 
 if __name__ == "__main__":
-    # Taking hyperparameters N,M,Si and soldier positions as inputs from user (T and t will be given at commander site)
-    soldierwisePositions = take_inputs()
-    threads = []
-    # Creating one thread per soldier
-    for i in range(M):
-        threads.append(Thread(target=start_soldier, args=(i+1, soldierwisePositions[i], S[i])))
+    configure_logging()
 
-    # Starting all the threads one by one
-    for t in threads:
-        t.start()
-    
-    # Waiting for all threads to finish
-    for t in threads:
-        t.join()
+    # Taking hyperparameters N,M,Si and soldier positions as inputs from user (T and t will be given at commander site)
+    # python soldier.py [scenario_file]
+    if len(sys.argv) > 1:
+        soldierwisePositions = load_inputs(sys.argv[1])
+    else:
+        soldierwisePositions = take_inputs()
+
+    if use_sharded_commander:
+        # One soldier host per tile of the sharded commander, each on its own thread and stream
+        tiling = Tiling(N)
+        soldiers = [Soldier(i+1, soldierwisePositions[i], S[i], layout) for i in range(M)]
+        all_soldiers = {soldier.sid: soldier for soldier in soldiers}
+        threads = []
+        for k in range(len(tiling)):
+            tile_layout = warzone.new_layout(N, layout_dtype)
+            tile_soldiers = [soldier for soldier in soldiers if tiling.tile_of(soldier.position) == k]
+            for soldier in tile_soldiers:
+                soldier.layout = tile_layout
+            stub = missiledefence_pb2_grpc.CommanderStub(grpc.insecure_channel(tiling.target(k), options=channel_options))
+            host = SoldierHost(tile_soldiers, tile_layout, stub, all_soldiers)
+            threads.append(Thread(target=host.run))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elif use_soldier_host:
+        # Driving all soldiers from this thread over one stream
+        rejoin_on_failover(SoldierHost([Soldier(i+1, soldierwisePositions[i], S[i], layout) for i in range(M)], layout).run)
+    else:
+        threads = []
+        # Creating one thread per soldier
+        for i in range(M):
+            threads.append(Thread(target=start_soldier, args=(i+1, soldierwisePositions[i], S[i])))
+
+        # Starting all the threads one by one
+        for t in threads:
+            t.start()
+        
+        # Waiting for all threads to finish
+        for t in threads:
+            t.join()
 
+    if channel_pool is not None:
+        channel_pool.close()
@@ -0,0 +1,97 @@
+"""Tests of the crash safety of checkpoints, run with "python -m pytest"."""
+
+import numpy as np
+import pytest
+import checkpoint
+from checkpoint import Checkpoint
+
+no_of_soldiers = 4
+
+
+# Commit a round which is `launches` launches into the war
+def commit_round(cp, launches, changes, new_dead):
+    fields = {"size": 5, "no_of_missiles": 4, "launches": launches, "layout_version": 10 * launches, "casuality_count": len(new_dead), "commander_id": 1}
+    cp.commit(fields, changes, new_dead)
+
+
+# Two rounds: soldier 2 moves, then soldier 3 dies and soldier 4 moves
+def two_rounds(path):
+    cp = Checkpoint.create(path, no_of_soldiers)
+    commit_round(cp, 1, [(soldier_id, soldier_id, soldier_id, 1) for soldier_id in range(1, no_of_soldiers + 1)] + [(2, 5, 5, 1)], [])
+    commit_round(cp, 2, [(3, 3, 3, 0), (4, 1, 4, 1)], [3])
+    return cp
+
+
+def roster(cp):
+    return [array.tolist() for array in cp.roster()]
+
+
+# The commander dies in the third round after writing its header, before the journal is applied to the soldier table
+def crash_after_header(cp, monkeypatch):
+    def crash(header):
+        raise RuntimeError("killed")
+    monkeypatch.setattr(cp, "apply_journal", crash)
+    with pytest.raises(RuntimeError):
+        commit_round(cp, 3, [(2, 2, 1, 1), (4, 4, 4, 0)], [4])
+
+
+# Bytes of the header slot of a generation in the file
+def header_slot(generation):
+    return (generation % 2) * checkpoint.header_dtype.itemsize
+
+
+def test_journal_slots_alternate(tmp_path):
+    path = str(tmp_path / "war.ckpt")
+    cp = two_rounds(path)
+    assert cp.headers["generation"].tolist() == [0, 1]
+    commit_round(cp, 3, [(2, 2, 1, 1)], [])
+    assert cp.headers["generation"].tolist() == [2, 1]
+
+    loaded = Checkpoint.load(path)
+    assert int(loaded.header["launches"]) == 3
+    assert roster(loaded) == [[1, 2, 4], [1, 2, 1], [1, 1, 4]]
+
+
+def test_committed_round_is_replayed_on_load(tmp_path, monkeypatch):
+    path = str(tmp_path / "war.ckpt")
+    crash_after_header(two_rounds(path), monkeypatch)
+
+    loaded = Checkpoint.load(path)
+    assert int(loaded.header["launches"]) == 3
+    assert roster(loaded) == [[1, 2], [1, 2], [1, 1]]
+    assert loaded.dead_soldiers() == [3, 4]
+
+
+def test_torn_header_falls_back_to_previous_round(tmp_path, monkeypatch):
+    path = str(tmp_path / "war.ckpt")
+    crash_after_header(two_rounds(path), monkeypatch)
+    # Only the first half of the newest header reached the file
+    with open(path, "r+b") as f:
+        f.seek(header_slot(2) + checkpoint.header_dtype.itemsize // 2)
+        f.write(bytes(checkpoint.header_dtype.itemsize // 2))
+
+    loaded = Checkpoint.load(path)
+    assert int(loaded.header["generation"]) == 1
+    assert int(loaded.header["launches"]) == 2
+    assert roster(loaded) == [[1, 2, 4], [1, 5, 1], [1, 5, 4]]
+    assert loaded.dead_soldiers() == [3]
+
+
+def test_crc_rejects_changed_header(tmp_path, monkeypatch):
+    path = str(tmp_path / "war.ckpt")
+    crash_after_header(two_rounds(path), monkeypatch)
+    # A single changed field of the newest header, with a complete magic and format
+    with open(path, "r+b") as f:
+        f.seek(header_slot(2) + checkpoint.header_dtype.fields["casuality_count"][1])
+        f.write(np.array([7], dtype="<u4").tobytes())
+
+    loaded = Checkpoint.load(path)
+    assert int(loaded.header["launches"]) == 2
+    assert loaded.dead_soldiers() == [3]
+
+
+def test_no_complete_checkpoint(tmp_path):
+    path = str(tmp_path / "war.ckpt")
+    Checkpoint.create(path, no_of_soldiers)
+    with pytest.raises(ValueError):
+        Checkpoint.load(path)
@@ -0,0 +1,168 @@
+"""Tests of the commander's round barrier, run with "python -m pytest"."""
+
+from threading import Thread
+import time
+import numpy as np
+import pytest
+import missiledefence_pb2
+import commander
+import journal
+from commander import Commander
+
+
+# Commander (soldier 0) and M soldiers on a row of the war zone, every soldier tracked by the round barrier
+def make_commander(no_of_soldiers):
+    cmd = Commander()
+    cmd.war_zone_size = no_of_soldiers + 1
+    cmd.no_of_soldiers = no_of_soldiers
+    cmd.layout = np.zeros((no_of_soldiers + 1, no_of_soldiers + 1), dtype=commander.layout_dtype)
+    cmd.sid = 0
+    cmd.position = [1, 1]
+    for soldier_id in range(1, no_of_soldiers + 1):
+        cmd.soldier_details[soldier_id] = {"position": [1, soldier_id + 1], "is_alive": True}
+        cmd.layout[0, soldier_id] = soldier_id
+        cmd.track_soldier(soldier_id, 0)
+    return cmd
+
+
+# Every soldier reports a round and waits for the others, without any delay between the rounds,
+# so soldiers report the next round while others have not seen the last one complete yet
+def test_barrier_many_zero_delay_rounds():
+    no_of_soldiers = 8
+    no_of_rounds = 300
+    cmd = make_commander(no_of_soldiers)
+
+    def play(soldier_id):
+        for rounds_sent in range(1, no_of_rounds + 1):
+            cmd.apply_status(missiledefence_pb2.WasHit(soldier_id=soldier_id, is_alive=True, position=[1, soldier_id + 1]))
+            cmd.wait_for_round(rounds_sent)
+
+    threads = [Thread(target=play, args=(soldier_id,), daemon=True) for soldier_id in range(1, no_of_soldiers + 1)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 30
+    for thread in threads:
+        thread.join(timeout=max(0, deadline - time.monotonic()))
+    assert not any(thread.is_alive() for thread in threads), "a soldier is stuck at the round barrier"
+    assert set(cmd.status_requests_received.values()) == {no_of_rounds}
+
+
+# A soldier which is ahead by a round does not hold back the streams still waiting for the round before
+def test_round_reported_with_soldier_ahead():
+    cmd = make_commander(3)
+    for soldier_id in (1, 2, 3):
+        cmd.apply_status(missiledefence_pb2.WasHit(soldier_id=soldier_id, is_alive=True, position=[1, soldier_id + 1]))
+    cmd.apply_status(missiledefence_pb2.WasHit(soldier_id=1, is_alive=True, position=[1, 2]))
+    with cmd.round_condition:
+        assert cmd.is_round_reported(1)
+        assert not cmd.is_round_reported(2)
+        # A soldier which starts being tracked late is counted from the rounds it has played
+        cmd.track_soldier(4, 0)
+        assert not cmd.is_round_reported(1)
+
+
+# Once the commander is dead, the soldier whose status finds it dead is asked to take over, so it is told on its own stream
+def test_reporting_soldier_is_asked_to_take_over():
+    cmd = make_commander(3)
+    cmd.is_alive = False
+    dead = cmd.apply_status(missiledefence_pb2.WasHit(soldier_id=1, is_alive=False, position=[1, 2]))
+    assert dead.new_commander_id == -1
+    reply = cmd.apply_status(missiledefence_pb2.WasHit(soldier_id=2, is_alive=True, position=[1, 3]))
+    assert reply.new_commander_id == 2
+    assert cmd.apply_status(missiledefence_pb2.WasHit(soldier_id=3, is_alive=True, position=[1, 4])).new_commander_id == -1
+    assert cmd.casuality_count == 2
+
+
+# A soldier joining on a taken cell is out of the war, and the war only starts once every soldier has joined
+def test_join_is_compare_and_set():
+    cmd = Commander()
+    def join(soldier_id, position):
+        request = missiledefence_pb2.ConnectionRequest(soldier_id=soldier_id, position=position, no_of_soldiers=3, warzone_size=4, speed=1)
+        return cmd.soldier_ready(request, None)
+
+    assert join(1, [1, 1]).soldier_id == 1
+    cmd.elect_commander(missiledefence_pb2.NewCommanderDetails(soldier_id=1, position=[1, 1], speed=1), None)
+    with cmd.round_condition:
+        assert not cmd.is_war_ready()
+    assert not join(2, [2, 2]).HasField("rejoined")
+    taken = join(3, [2, 2])
+    assert taken.HasField("rejoined") and not taken.rejoined.is_alive
+    assert cmd.layout[1, 1] == 2 and 3 not in cmd.soldier_details
+    with cmd.round_condition:
+        assert cmd.is_war_ready()
+
+
+# The round of an election is only over once the asked soldier has taken over, so its election is journaled in that round
+def test_election_is_journaled_in_its_round(tmp_path):
+    cmd = make_commander(3)
+    cmd.journal = journal.Journal(str(tmp_path / "war.journal"))
+    cmd.journal.open(cmd.war_zone_size, cmd.no_of_soldiers)
+    cmd.journal.begin_round(0, [{"type": "M1", "position": [1, 1]}], cmd.layout, (cmd.sid, cmd.position, True))
+    cmd.is_alive = False
+    cmd.apply_status(missiledefence_pb2.WasHit(soldier_id=1, is_alive=False, position=[1, 2]))
+    assert cmd.apply_status(missiledefence_pb2.WasHit(soldier_id=2, is_alive=True, position=[1, 3])).new_commander_id == 2
+    cmd.apply_status(missiledefence_pb2.WasHit(soldier_id=3, is_alive=True, position=[1, 4]))
+    with cmd.round_condition:
+        assert not cmd.is_round_reported(1)
+
+    cmd.elect_from(2, missiledefence_pb2.SessionUpdate(elect=missiledefence_pb2.NewCommanderDetails(soldier_id=2, position=[1, 3], speed=1)), None)
+    with cmd.round_condition:
+        assert cmd.is_round_reported(1)
+    cmd.journal.flush()
+
+    reader = journal.JournalReader(str(tmp_path / "war.journal"))
+    assert journal.ELECTED in reader.round_records(0)["kind"].tolist()
+    assert reader.layout_after(0)[1] == (2, [1, 3])
+
+
+# Without a thread for every soldier stream, the streams are refused instead of leaving soldiers waiting forever
+def test_streams_beyond_capacity_are_refused():
+    class Context():
+        def abort(self, code, details):
+            raise RuntimeError(details)
+
+    cmd = make_commander(14)
+    cmd.stream_capacity = 9
+    stream = cmd.missile_approaching(missiledefence_pb2.SoldierFilter(soldier_id=1), Context())
+    with pytest.raises(RuntimeError, match="commander_aio.py"):
+        next(stream)
+
+
+# Resolve the move intents `targets` of the round of an M1 missile at `position`
+def resolve(cmd, targets, position):
+    cmd.move_intents = {soldier_id: list(target) for soldier_id, target in targets.items()}
+    cmd.resolve_moves({"type": "M1", "position": position})
+
+
+# Two soldiers want the same cell: the lower soldier id gets it, the other one stays where it is
+def test_two_soldiers_target_one_cell():
+    cmd = make_commander(3)
+    resolve(cmd, {1: [3, 3], 2: [3, 3]}, [4, 1])
+    assert cmd.layout[2, 2] == 1 and cmd.layout[0, 1] == 0 and cmd.layout[0, 2] == 2
+    assert cmd.soldier_details[1]["position"] == [3, 3]
+    assert cmd.soldier_details[2]["position"] == [1, 3]
+    assert cmd.confirmed_moves[2] == missiledefence_pb2.WasHit(soldier_id=2, is_alive=True, position=[1, 3])
+    assert cmd.dead_soldiers == []
+
+
+# Soldier 1 moves into the cell soldier 2 leaves in the same batch, although soldier 1 is tried first
+def test_move_into_cell_vacated_in_batch():
+    cmd = make_commander(3)
+    with cmd.roster_lock:
+        assert cmd.claim_moves([(1, [1, 3]), (2, [2, 3])]) == []
+    assert cmd.layout[0, 1] == 0 and cmd.layout[0, 2] == 1 and cmd.layout[1, 2] == 2
+    assert cmd.soldier_details[1]["position"] == [1, 3]
+    assert cmd.confirmed_moves[1].position == [1, 3]
+
+
+# A soldier whose move is rejected stays in the red zone and dies there
+def test_rejected_soldier_dies_in_red_zone():
+    cmd = make_commander(3)
+    with cmd.roster_lock:
+        rejected = cmd.claim_moves([(1, [3, 3]), (2, [3, 3])])
+        assert rejected == [(2, [3, 3])]
+        cmd.reject_moves(rejected, {"type": "M1", "position": [1, 3]})
+    assert cmd.dead_soldiers == [2] and cmd.casuality_count == 1
+    assert 2 not in cmd.soldier_details and 2 not in cmd.status_requests_received
+    assert cmd.layout[0, 2] == 0 and cmd.layout[2, 2] == 1
+    assert cmd.confirmed_moves[2] == missiledefence_pb2.WasHit(soldier_id=2, is_alive=False, position=[1, 3])
@@ -0,0 +1,53 @@
+"""Tests of the evacuation planner, run with "python -m pytest"."""
+
+import numpy as np
+import evacuation
+import salvo
+
+
+# Every soldier which survives is on its own cell, outside the red zones and within its speed
+def check_plan(positions, speeds, red_zones, layout, new_positions, alive):
+    survivors = new_positions[alive]
+    assert len(set(map(tuple, survivors.tolist()))) == len(survivors)
+    assert not red_zones.is_red(survivors[:, 0], survivors[:, 1]).any()
+    moved = alive & (new_positions != positions).any(axis=1)
+    assert (np.abs(new_positions - positions).max(axis=1)[moved] <= speeds[moved]).all()
+    assert all(layout[row - 1, col - 1] == 0 for row, col in new_positions[moved].tolist())
+
+
+# A salvo with thousands of soldiers in its red zones, whose augmenting paths are far too long for recursion
+def test_salvo_with_thousands_of_soldiers():
+    rng = np.random.default_rng(0)
+    layout = np.zeros((300, 300), dtype=np.int32)
+    cells = rng.choice(100 * 100, 3700, replace=False)
+    rows, cols = cells // 100 + 100, cells % 100 + 100
+    layout[rows, cols] = np.arange(1, 3701)
+    positions = np.stack([rows + 1, cols + 1], axis=1)
+    speeds = np.full(3700, 40)
+    red_zones = salvo.RedZones([([110 + 20 * i, 110 + 20 * j], 4) for i in range(5) for j in range(5)] + [([150, 150], 40)])
+
+    new_positions, alive = evacuation.plan_salvo_evacuation(positions, speeds, red_zones, layout, rng)
+    check_plan(positions, speeds, red_zones, layout, new_positions, alive)
+    assert alive.all()
+
+
+# Lists cut short to a single cell still give a maximum matching, as many soldiers survive as with complete lists
+def test_short_lists_survivors(monkeypatch):
+    for seed in range(50):
+        rng = np.random.default_rng(seed)
+        size = int(rng.integers(5, 20))
+        no_of_soldiers = int(rng.integers(1, size * size // 2))
+        cells = rng.choice(size * size, no_of_soldiers, replace=False)
+        layout = np.zeros((size, size), dtype=np.int32)
+        layout.flat[cells] = np.arange(1, no_of_soldiers + 1)
+        positions = np.stack([cells // size + 1, cells % size + 1], axis=1)
+        speeds = rng.integers(0, 5, no_of_soldiers)
+        red_zones = salvo.RedZones([([int(rng.integers(1, size + 1)), int(rng.integers(1, size + 1))], int(rng.integers(1, 5)))])
+
+        survivors = []
+        for limit in (1, size * size):
+            monkeypatch.setattr(evacuation, "max_candidates", limit)
+            new_positions, alive = evacuation.plan_salvo_evacuation(positions, speeds, red_zones, layout, np.random.default_rng(seed))
+            check_plan(positions, speeds, red_zones, layout, new_positions, alive)
+            survivors.append(int(alive.sum()))
+        assert survivors[0] == survivors[1]
@@ -0,0 +1,32 @@
+"""Tests of replaying a war from its journal, run with "python -m pytest"."""
+
+import numpy as np
+import engine
+import journal
+import scenarios
+from journal import JournalReader
+
+# A war of 8 rounds in which 3 soldiers die and the commander is replaced
+seed = 4
+
+
+def test_layout_after_matches_the_war(tmp_path, monkeypatch):
+    # Keyframes in rounds 0, 3 and 6, so both rounds with a keyframe and rounds in between are replayed
+    monkeypatch.setattr(journal, "keyframe_interval", 3)
+    path = str(tmp_path / "war.journal")
+    scenario = scenarios.generate(12, 12, 8, seed=seed)
+    result = engine.run_war(scenario, seed=seed, journal_file=path)
+    assert result.elections == 1
+
+    reader = JournalReader(path)
+    assert len(reader) == result.rounds == len(scenario.missiles)
+    assert [int(reader.index[k]["keyframe"]) == int(reader.index[k]["start"]) for k in range(len(reader))] == [k % 3 == 0 for k in range(len(reader))]
+    for k in range(len(reader)):
+        # The same war up to missile k is the war after round k
+        scenario_k = engine.Scenario(scenario.size, scenario.positions, scenario.speeds, scenario.missiles[:k+1])
+        live = engine.run_war(scenario_k, seed=seed)
+
+        layout, (commander_id, position) = reader.layout_after(k)
+        assert np.array_equal(layout, live.layout), k
+        assert commander_id == live.commander_id
+        assert position == (np.argwhere(live.layout == commander_id)[0] + 1).tolist()
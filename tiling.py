@@ -0,0 +1,73 @@
+"""Tiles of a sharded war zone (see sharding.py): which commander process owns which cells.
+
+The NxN war zone is split into tile_grid rows x cols of tiles of (nearly) equal size. Tile k, counted row by row,
+is served on port tile_base_port + k. Every tile also keeps a copy of the halo around it, the cells of the
+neighbouring tiles at most halo_width away from its edges, which is updated after every round.
+"""
+
+import bisect
+
+# Rows x cols of tiles
+tile_grid = (2, 2)
+tile_host = "localhost"
+tile_base_port = 50060
+
+# Soldiers only see the cells of their tile and its halo up to date, so this should be at least the highest speed.
+# A move into a cell the soldier saw out of date is still checked by the tile which owns the cell.
+halo_width = 4
+
+
+class Tiling():
+
+    def __init__(self, size, grid=None):
+        rows, cols = grid if grid is not None else tile_grid
+        # Never more tiles than cells along a side
+        rows, cols = min(rows, size), min(cols, size)
+        self.size = size
+        self.grid = (rows, cols)
+        # 0-indexed first row (col) of every tile row (col), followed by the end of the war zone
+        self.row_starts = [r * size // rows for r in range(rows)] + [size]
+        self.col_starts = [c * size // cols for c in range(cols)] + [size]
+
+    def __len__(self):
+        return self.grid[0] * self.grid[1]
+
+    # Tile of the 1-indexed position [row, col]
+    def tile_of(self, position):
+        r = bisect.bisect_right(self.row_starts, position[0] - 1, hi=self.grid[0]) - 1
+        c = bisect.bisect_right(self.col_starts, position[1] - 1, hi=self.grid[1]) - 1
+        return r * self.grid[1] + c
+
+    # 1-indexed inclusive (row_start, row_end, col_start, col_end) of tile k
+    def bounds(self, k):
+        r, c = divmod(k, self.grid[1])
+        return self.row_starts[r] + 1, self.row_starts[r + 1], self.col_starts[c] + 1, self.col_starts[c + 1]
+
+    def owns(self, k, position):
+        row_start, row_end, col_start, col_end = self.bounds(k)
+        return row_start <= position[0] <= row_end and col_start <= position[1] <= col_end
+
+    # Whether a cell of tile k is in the halo of a neighbouring tile, i.e. at most halo_width from an edge of tile k
+    def in_border(self, k, position):
+        row_start, row_end, col_start, col_end = self.bounds(k)
+        return self.owns(k, position) and (
+            position[0] - row_start < halo_width
+            or row_end - position[0] < halo_width
+            or position[1] - col_start < halo_width
+            or col_end - position[1] < halo_width
+        )
+
+    # Whether a cell of another tile is in the halo of tile k
+    def in_halo(self, k, position):
+        row_start, row_end, col_start, col_end = self.bounds(k)
+        return (
+            row_start - halo_width <= position[0] <= row_end + halo_width
+            and col_start - halo_width <= position[1] <= col_end + halo_width
+            and not self.owns(k, position)
+        )
+
+    def port(self, k):
+        return tile_base_port + k
+
+    def target(self, k):
+        return f"{tile_host}:{self.port(k)}"
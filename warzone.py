@@ -0,0 +1,135 @@
+"""War zone layouts: a dense NumPy array for normal sizes, a sparse occupancy store for very large ones.
+
+Both are indexed the same way as the dense array, layout[row, col] with 0-indexed row and col,
+so move_soldier, take_shelter and blast.py work on either of them.
+"""
+
+import numpy as np
+
+# Dense layouts cost 4 bytes per cell, above this many cells only the occupied cells are stored
+max_dense_cells = 4096 * 4096
+
+# Side of the square tiles in which a sparse layout is rendered
+render_tile_size = 8
+
+
+class SparseWarZone():
+
+    def __init__(self, size):
+        self.shape = (size, size)
+        # row -> {col: soldier_id} for the occupied cells only
+        self.rows = {}
+        self.no_of_occupied = 0
+
+    def __len__(self):
+        return self.shape[0]
+
+    def get(self, row, col):
+        return self.rows.get(row, {}).get(col, 0)
+
+    def set(self, row, col, soldier_id):
+        cols = self.rows.get(row)
+        if soldier_id == 0:
+            if cols is not None and col in cols:
+                del cols[col]
+                self.no_of_occupied -= 1
+                if len(cols) == 0:
+                    del self.rows[row]
+        else:
+            if cols is None:
+                cols = self.rows[row] = {}
+            if col not in cols:
+                self.no_of_occupied += 1
+            cols[col] = soldier_id
+
+    # layout[row, col] for a single cell, or for arrays of rows and cols like NumPy fancy indexing
+    def __getitem__(self, index):
+        row, col = index
+        if np.ndim(row) == 0:
+            return self.get(int(row), int(col))
+        return np.array(
+            [self.get(r, c) for r, c in zip(np.asarray(row).tolist(), np.asarray(col).tolist())],
+            dtype=np.int64,
+        )
+
+    def __setitem__(self, index, soldier_id):
+        row, col = index
+        if np.ndim(row) == 0:
+            self.set(int(row), int(col), int(soldier_id))
+            return
+        soldier_ids = np.broadcast_to(soldier_id, np.shape(row))
+        for r, c, s in zip(np.asarray(row).tolist(), np.asarray(col).tolist(), soldier_ids.tolist()):
+            self.set(r, c, s)
+
+    # Only clearing is supported, same as ndarray.fill(0)
+    def fill(self, soldier_id):
+        if soldier_id != 0:
+            raise ValueError("A sparse war zone can only be filled with 0 (empty)")
+        self.rows = {}
+        self.no_of_occupied = 0
+
+    # All occupied cells as (row, col, soldier_id), in row-major order
+    def items(self):
+        for row in sorted(self.rows):
+            cols = self.rows[row]
+            for col in sorted(cols):
+                yield row, col, cols[col]
+
+    # Occupied cells inside the square [row_start, row_end] x [col_start, col_end] (inclusive)
+    def occupied_in(self, row_start, row_end, col_start, col_end):
+        if row_end - row_start + 1 <= len(self.rows):
+            rows = [row for row in range(row_start, row_end + 1) if row in self.rows]
+        else:
+            rows = sorted(row for row in self.rows if row_start <= row <= row_end)
+
+        cells = []
+        for row in rows:
+            cols = self.rows[row]
+            if col_end - col_start + 1 <= len(cols):
+                cells += [(row, col, cols[col]) for col in range(col_start, col_end + 1) if col in cols]
+            else:
+                cells += [(row, col, cols[col]) for col in sorted(cols) if col_start <= col <= col_end]
+        return cells
+
+    # Render only the occupied regions: the soldiers of each tile, cropped to the rows and cols they occupy
+    def render(self):
+        tiles = {}
+        for row, col, soldier_id in self.items():
+            tiles.setdefault((row // render_tile_size, col // render_tile_size), []).append((row, col, soldier_id))
+
+        layout_string = "\n"
+        for tile in sorted(tiles):
+            cells = tiles[tile]
+            row_start = min(row for row, col, soldier_id in cells)
+            row_end = max(row for row, col, soldier_id in cells)
+            col_start = min(col for row, col, soldier_id in cells)
+            col_end = max(col for row, col, soldier_id in cells)
+            grid = [[0] * (col_end - col_start + 1) for x in range(row_end - row_start + 1)]
+            for row, col, soldier_id in cells:
+                grid[row - row_start][col - col_start] = soldier_id
+
+            layout_string += f"Rows {row_start+1}-{row_end+1}, cols {col_start+1}-{col_end+1}:\n"
+            for grid_row in grid:
+                layout_string += "     ".join(map(str, grid_row)) + "     \n"
+        return layout_string
+
+
+# Create an empty NxN layout, sparse if a dense one would be too large
+def new_layout(size, dtype):
+    if size * size > max_dense_cells:
+        return SparseWarZone(size)
+    return np.zeros((size, size), dtype=dtype)
+
+
+# Occupied cells of a dense or sparse layout inside a square (0-indexed, inclusive), as (row, col, soldier_id)
+def occupied_in(layout, row_start, row_end, col_start, col_end):
+    row_start, col_start = max(row_start, 0), max(col_start, 0)
+    row_end, col_end = min(row_end, layout.shape[0] - 1), min(col_end, layout.shape[1] - 1)
+    if row_start > row_end or col_start > col_end:
+        return []
+    if isinstance(layout, SparseWarZone):
+        return layout.occupied_in(row_start, row_end, col_start, col_end)
+
+    block = layout[row_start:row_end + 1, col_start:col_end + 1]
+    rows, cols = np.nonzero(block)
+    return [(row + row_start, col + col_start, soldier_id) for row, col, soldier_id in zip(rows.tolist(), cols.tolist(), block[rows, cols].tolist())]